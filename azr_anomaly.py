@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""
+AZR Anomaly - proudová detekce anomálií v transakcích tokenů
+
+Transakce ve tvaru tabulky token_transactions (id, from_wallet_id,
+to_wallet_id, amount, type, created_at) se zpracovávají po jedné a každá
+aktualizuje jen malý stav dotčených peněženek, bez čtení historie:
+
+    burst      počet odchozích transakcí peněženky v klouzavém okně
+               (okno rozdělené na BURST_BUCKETS košů, staré koše se zahodí);
+               po nahlášení se peněženka hlásí znovu nejdříve po uplynutí
+               dalšího okna, trvající nápor tak dává jednu anomálii za okno
+    spending   odchozí částka vysoko nad klouzavým průměrem peněženky
+               (exponenciálně vážený průměr a rozptyl)
+    circular   kruhové převody A -> B -> A a A -> B -> C -> A v časovém okně
+               (omezený seznam posledních protistran každé peněženky)
+
+Zpracování transakce trvá amortizovaně O(1) (u kruhů O(maxEdges)), detekce
+tak může běžet přímo při zápisu transakcí. Stav peněženek je v paměti
+procesu (LRU podle počtu peněženek, AZR_ANOMALY_MAX_WALLETS); proud jedné
+aplikace proto posílejte stále stejnému procesu.
+
+V bridge dotazem token_anomaly s data.transactions, samostatně:
+    python azr_anomaly.py transakce.jsonl
+    tail -f transakce.jsonl | python azr_anomaly.py -
+"""
+
+import datetime
+import math
+import os
+import sys
+import threading
+from collections import OrderedDict, deque
+from typing import Dict, Any, Iterable, List, Optional
+
+# Výchozí počet peněženek, jejichž stav se drží v paměti
+DEFAULT_MAX_WALLETS = 100000
+
+# Počet košů klouzavého okna pro počítání odchozích transakcí
+BURST_BUCKETS = 10
+
+# Výchozí nastavení detektoru (klíče options u token_anomaly)
+DEFAULT_CONFIG: Dict[str, Any] = {
+    # Počet odchozích transakcí peněženky za burstWindowSeconds, od kterého se hlásí
+    "burstWindowSeconds": 60,
+    "burstCount": 10,
+    # Poločas klouzavého průměru odchozích částek (v počtu transakcí),
+    # počet transakcí před první detekcí a nutný odstup od průměru
+    "spendingHalfLife": 20,
+    "spendingWarmup": 5,
+    "spendingZ": 4.0,
+    "spendingRatio": 3.0,
+    # Okno pro kruhové převody a počet zapamatovaných protistran peněženky
+    "cycleWindowSeconds": 3600,
+    "maxEdges": 32
+}
+
+_EPOCH = datetime.datetime(1970, 1, 1)
+
+def event_seconds(value: Any) -> float:
+    """
+    Čas transakce v sekundách: ISO řetězec (s časovou zónou převedený na UTC)
+    nebo číslo v ms od epochy
+    """
+    if isinstance(value, bool) or value is None:
+        raise ValueError(f"Neplatný čas transakce: {value!r}")
+    if isinstance(value, (int, float)):
+        return value / 1000.0
+    moment = datetime.datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return (moment - _EPOCH).total_seconds()
+
+def anomaly_config(options: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Nastavení detektoru z options (chybějící klíče z DEFAULT_CONFIG), neplatné vyvolá ValueError
+    """
+    config = dict(DEFAULT_CONFIG)
+    for key in DEFAULT_CONFIG:
+        value = options.get(key)
+        if value is None:
+            continue
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or value <= 0:
+            raise ValueError(f"options.{key} musí být kladné číslo")
+        config[key] = value
+    return config
+
+class WalletState:
+    """
+    Stav jedné peněženky: koše klouzavého okna, průměr odchozích částek
+    a poslední protistrany
+    """
+    __slots__ = ("buckets", "burst_total", "burst_quiet_until", "spent_count", "spent_mean", "spent_var",
+                 "out_edges", "in_edges")
+
+    def __init__(self):
+        self.buckets: deque = deque()
+        self.burst_total = 0
+        self.burst_quiet_until = -math.inf
+        self.spent_count = 0
+        self.spent_mean = 0.0
+        self.spent_var = 0.0
+        self.out_edges: "OrderedDict[Any, float]" = OrderedDict()
+        self.in_edges: "OrderedDict[Any, float]" = OrderedDict()
+
+def _remember(edges: "OrderedDict[Any, float]", wallet: Any, seconds: float, limit: int) -> None:
+    """Zápis protistrany, při překročení limitu se zapomene nejdéle nepoužitá"""
+    edges[wallet] = seconds
+    edges.move_to_end(wallet)
+    if len(edges) > limit:
+        edges.popitem(last=False)
+
+class AnomalyDetector:
+    """
+    Detektor anomálií nad proudem transakcí se stavem peněženek v paměti
+    """
+    def __init__(self, config: Optional[Dict[str, Any]] = None, max_wallets: int = DEFAULT_MAX_WALLETS):
+        self.config = {**DEFAULT_CONFIG, **(config or {})}
+        self.max_wallets = max_wallets
+        self.wallets: "OrderedDict[Any, WalletState]" = OrderedDict()
+        self.processed = 0
+        self.flagged = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+        config = self.config
+        self.bucket_seconds = config["burstWindowSeconds"] / BURST_BUCKETS
+        self.smoothing = 1 - 0.5 ** (1 / config["spendingHalfLife"])
+
+    @classmethod
+    def from_env(cls, config: Optional[Dict[str, Any]] = None) -> "AnomalyDetector":
+        """
+        Detektor s limitem peněženek z AZR_ANOMALY_MAX_WALLETS
+        """
+        return cls(config, max_wallets=int(os.environ.get("AZR_ANOMALY_MAX_WALLETS", DEFAULT_MAX_WALLETS)))
+
+    def _wallet(self, wallet_id: Any) -> WalletState:
+        state = self.wallets.get(wallet_id)
+        if state is None:
+            state = self.wallets[wallet_id] = WalletState()
+            if len(self.wallets) > self.max_wallets:
+                self.wallets.popitem(last=False)
+                self.evictions += 1
+        else:
+            self.wallets.move_to_end(wallet_id)
+        return state
+
+    def _burst(self, state: WalletState, seconds: float) -> Optional[int]:
+        """
+        Přičtení odchozí transakce do klouzavého okna, vrací počet, pokud
+        dosahuje limitu a peněženka nebyla nahlášena v posledním okně
+        """
+        bucket = math.floor(seconds / self.bucket_seconds)
+        buckets = state.buckets
+        while buckets and buckets[0][0] <= bucket - BURST_BUCKETS:
+            state.burst_total -= buckets.popleft()[1]
+        # Opožděná transakce se započítá do posledního koše
+        if buckets and buckets[-1][0] >= bucket:
+            buckets[-1][1] += 1
+        else:
+            buckets.append([bucket, 1])
+        state.burst_total += 1
+        if state.burst_total < self.config["burstCount"] or seconds < state.burst_quiet_until:
+            return None
+        state.burst_quiet_until = seconds + self.config["burstWindowSeconds"]
+        return state.burst_total
+
+    def _spending(self, state: WalletState, amount: float) -> Optional[Dict[str, Any]]:
+        """Porovnání částky s klouzavým průměrem peněženky a jeho aktualizace"""
+        config = self.config
+        anomaly = None
+        if state.spent_count >= config["spendingWarmup"]:
+            std = max(math.sqrt(state.spent_var), 0.1 * state.spent_mean, 1.0)
+            score = (amount - state.spent_mean) / std
+            if score >= config["spendingZ"] and amount >= config["spendingRatio"] * state.spent_mean:
+                anomaly = {"amount": amount, "baseline": round(state.spent_mean, 3), "score": round(score, 3)}
+        if state.spent_count == 0:
+            state.spent_mean = amount
+        else:
+            difference = amount - state.spent_mean
+            increment = self.smoothing * difference
+            state.spent_mean += increment
+            state.spent_var = (1 - self.smoothing) * (state.spent_var + difference * increment)
+        state.spent_count += 1
+        return anomaly
+
+    def _cycles(self, sender: Any, receiver: Any, sender_state: WalletState, receiver_state: WalletState,
+                seconds: float) -> List[List[Any]]:
+        """Kruhy uzavřené převodem sender -> receiver (délky 2 a 3) v časovém okně"""
+        since = seconds - self.config["cycleWindowSeconds"]
+        cycles = []
+        back = receiver_state.out_edges.get(sender)
+        if back is not None and back >= since:
+            cycles.append([sender, receiver, sender])
+        # receiver -> third -> sender, průnik klíčů počítá dict v C
+        for third in receiver_state.out_edges.keys() & sender_state.in_edges.keys():
+            if third == receiver or third == sender:
+                continue
+            if receiver_state.out_edges[third] >= since and sender_state.in_edges[third] >= since:
+                cycles.append([sender, receiver, third, sender])
+        return cycles
+
+    def _prepare(self, transaction: Dict[str, Any]) -> tuple:
+        """
+        Kontrola a převod polí transakce bez změny stavu, neplatná vyvolá ValueError
+        """
+        if not isinstance(transaction, dict):
+            raise ValueError(f"Transakce musí být objekt, ne {type(transaction).__name__}")
+        seconds = event_seconds(transaction.get("created_at"))
+        sender = transaction.get("from_wallet_id")
+        receiver = transaction.get("to_wallet_id")
+        amount = transaction.get("amount")
+        for wallet in (sender, receiver):
+            if wallet is not None and not isinstance(wallet, (str, int)):
+                raise ValueError(f"Neplatné ID peněženky: {wallet!r}")
+        if amount is not None:
+            if isinstance(amount, bool) or not isinstance(amount, (int, float)):
+                raise ValueError(f"Neplatná částka transakce: {amount!r}")
+            amount = float(amount) if amount == amount else None
+        return seconds, sender, receiver, amount, transaction
+
+    def _apply(self, event: tuple) -> List[Dict[str, Any]]:
+        """Aktualizace stavu zkontrolovanou transakcí, vrací nalezené anomálie"""
+        seconds, sender, receiver, amount, transaction = event
+        self.processed += 1
+        if sender is None:
+            return []
+
+        anomalies = []
+        base = {"transactionId": transaction.get("id"), "walletId": sender, "createdAt": transaction.get("created_at")}
+        sender_state = self._wallet(sender)
+        count = self._burst(sender_state, seconds)
+        if count is not None:
+            anomalies.append({"kind": "burst", **base, "count": count,
+                              "windowSeconds": self.config["burstWindowSeconds"]})
+        if amount is not None:
+            spending = self._spending(sender_state, amount)
+            if spending is not None:
+                anomalies.append({"kind": "spending", **base, **spending})
+
+        if receiver is not None and receiver != sender:
+            receiver_state = self._wallet(receiver)
+            for cycle in self._cycles(sender, receiver, sender_state, receiver_state, seconds):
+                anomalies.append({"kind": "circular", **base, "wallets": cycle,
+                                  "windowSeconds": self.config["cycleWindowSeconds"]})
+            limit = self.config["maxEdges"]
+            _remember(sender_state.out_edges, receiver, seconds, limit)
+            _remember(receiver_state.in_edges, sender, seconds, limit)
+
+        self.flagged += len(anomalies)
+        return anomalies
+
+    def observe(self, transaction: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Zpracování jedné transakce, vrací nalezené anomálie (typicky žádné);
+        neplatná transakce vyvolá ValueError a stav nezmění
+        """
+        event = self._prepare(transaction)
+        with self.lock:
+            return self._apply(event)
+
+    def observe_many(self, transactions: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Zpracování transakcí v pořadí, vrací všechny nalezené anomálie
+
+        Celá dávka se zkontroluje před první změnou stavu, takže po chybě
+        (ValueError s pořadím transakce) ji lze opravenou poslat znovu bez
+        dvojího započtení.
+        """
+        events = []
+        for index, transaction in enumerate(transactions):
+            try:
+                events.append(self._prepare(transaction))
+            except ValueError as e:
+                raise ValueError(f"Transakce {index}: {str(e)}")
+        anomalies = []
+        with self.lock:
+            for event in events:
+                anomalies.extend(self._apply(event))
+        return anomalies
+
+    def stats(self) -> Dict[str, Any]:
+        """Počítadla detektoru"""
+        return {
+            "wallets": len(self.wallets),
+            "processed": self.processed,
+            "flagged": self.flagged,
+            "evictions": self.evictions
+        }
+
+def _read_events(source) -> Iterable[Dict[str, Any]]:
+    """Transakce z JSONL (po řádcích, vhodné i pro tail -f) nebo CSV"""
+    import csv
+
+    from azr_codec import get_codec
+
+    first = source.readline()
+    if not first:
+        return
+    if first.lstrip().startswith("{"):
+        codec = get_codec("auto")
+        yield codec.decode(first)
+        for number, line in enumerate(source, 2):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield codec.decode(line)
+            except ValueError as e:
+                raise ValueError(f"Neplatný JSON na řádku {number}: {str(e)}")
+        return
+    # CSV exportu token_transactions: prázdné hodnoty jsou NULL, částka je číslo
+    columns = next(csv.reader([first]))
+    for row in csv.DictReader(source, fieldnames=columns):
+        event = {key: (value if value != "" else None) for key, value in row.items()}
+        if event.get("amount") is not None:
+            event["amount"] = float(event["amount"])
+        yield event
+
+def main():
+    """
+    Detekce anomálií z příkazové řádky, anomálie jako JSONL na stdout
+    """
+    import argparse
+    import json
+    import time
+
+    parser = argparse.ArgumentParser(description='AZR anomaly - proudová detekce anomálií v transakcích tokenů')
+    parser.add_argument('path', help='Soubor s transakcemi token_transactions (JSONL nebo CSV), "-" pro stdin')
+    for key, value in DEFAULT_CONFIG.items():
+        flag = "".join(f"-{char.lower()}" if char.isupper() else char for char in key)
+        parser.add_argument(f'--{flag}', dest=key, type=float, default=value,
+                            help=f'Nastavení {key} detektoru (default: {value})')
+    args = parser.parse_args()
+
+    detector = AnomalyDetector.from_env(anomaly_config(vars(args)))
+    started = time.perf_counter()
+    source = sys.stdin if args.path == "-" else open(args.path, encoding="utf-8")
+    try:
+        for event in _read_events(source):
+            for anomaly in detector.observe(event):
+                print(json.dumps(anomaly, ensure_ascii=False), flush=True)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+    stats = detector.stats()
+    elapsed = time.perf_counter() - started
+    print(f"{stats['processed']} transakcí, {stats['flagged']} anomálií, {elapsed:.1f} s", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+Benchmark procesorů AZR dotazů
+
+Spouští každý procesor AZRProcessor se syntetickými vstupy rostoucí
+velikosti (10 až 10^6 transakcí, rezervací nebo dokumentů) a pro každou
+velikost měří latenci (p50/p95/p99), propustnost a špičku alokované paměti
+(tracemalloc, v samostatném běhu, aby neovlivnila latenci). Z latencí
+jednotlivých velikostí se odhaduje exponent škálování (1.0 = lineární).
+
+Výsledky lze uložit jako baseline do benchmarks/handlers_baseline.json
+a při dalších bězích s ní porovnat; regrese ukončí benchmark s kódem 1.
+Procesory se volají přímo, bez mezipaměti a kódování odpovědi.
+"""
+
+import json
+import math
+import os
+import random
+import sys
+import time
+import tracemalloc
+from typing import Dict, Any, Callable, List, Optional
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(BASE_DIR, "benchmarks", "handlers_baseline.json")
+
+# Výchozí velikosti vstupů, --max-size je omezuje (10^6 jen na vyžádání)
+DEFAULT_SIZES = [10, 100, 1000, 10000, 100000, 1000000]
+DEFAULT_MAX_SIZE = 100000
+
+CATEGORIES = ["sports", "challenges", "rewards", "reservations", "events", "transfers", "purchases"]
+DAYS = ["pondělí", "úterý", "středa", "čtvrtek", "pátek", "sobota", "neděle"]
+WORDS = [
+    "tenis", "fotbal", "squash", "badminton", "hala", "kurt", "hřiště", "bazén", "posilovna",
+    "trenér", "turnaj", "rezervace", "večer", "ráno", "víkend", "sleva", "tokeny", "Praha", "Brno"
+]
+
+def make_suggestions(size: int, rng: random.Random) -> List[Dict[str, Any]]:
+    return [
+        {"suggestion": {
+            "startTime": f"{rng.randint(6, 22)}:00",
+            "date": rng.choice(DAYS),
+            "price": rng.choice([200, 300, 400, 500]),
+            "tokenPrice": rng.randint(1, 10)
+        }}
+        for _ in range(size)
+    ]
+
+def make_conflicts(size: int, rng: random.Random) -> List[Dict[str, Any]]:
+    return [
+        {"reservation1": {"type": rng.choice(["facility", "trainer"])},
+         "reservation2": {"type": rng.choice(["facility", "tournament"])}}
+        for _ in range(size)
+    ]
+
+def make_reservations(size: int, rng: random.Random) -> Dict[str, Any]:
+    return {
+        "userId": 1,
+        "reservations": [{"type": rng.choice(["facility", "trainer", "tournament"])} for _ in range(size)]
+    }
+
+def make_transactions(size: int, rng: random.Random) -> Dict[str, Any]:
+    start = time.mktime((2024, 1, 1, 0, 0, 0, 0, 0, 0))
+    transactions = []
+    for _ in range(size):
+        timestamp = time.localtime(start + rng.randint(0, 365 * 86400))
+        transactions.append({
+            "amount": rng.randint(1, 100),
+            "type": "earned" if rng.random() < 0.6 else "spent",
+            "transactionDate": time.strftime("%Y-%m-%dT%H:%M:%S", timestamp),
+            "category": rng.choice(CATEGORIES)
+        })
+    return {"userId": "bench", "transactions": transactions}
+
+def make_documents(size: int, rng: random.Random) -> Dict[str, Any]:
+    return {
+        "texts": [" ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 12))) for _ in range(size)],
+        "query": "tenis kurt večer Praha"
+    }
+
+def _run_each(method: Callable) -> Callable:
+    """Procesor pracující s jednou položkou se volá pro každou položku vstupu"""
+    def run(processor, items):
+        for item in items:
+            method(processor, item, {})
+    return run
+
+# Procesory, generátory vstupu a velikosti, pro které má měření smysl
+HANDLERS: Dict[str, Dict[str, Any]] = {
+    "reservation_analysis": {
+        "make": make_suggestions,
+        "run": _run_each(lambda processor, data, options: processor.process_reservation_analysis(data, options))
+    },
+    "conflict_resolution": {
+        "make": make_conflicts,
+        "run": _run_each(lambda processor, data, options: processor.process_conflict_resolution(data, options))
+    },
+    "user_reservation_analysis": {
+        "make": make_reservations,
+        "run": lambda processor, data: processor.process_user_reservation_analysis(data, {})
+    },
+    "token_analysis": {
+        "make": make_transactions,
+        "run": lambda processor, data: processor.process_token_analysis(data, {})
+    },
+    "text_vectorization": {
+        "make": make_documents,
+        "run": lambda processor, data: processor.process_text_vectorization(data, {})
+    },
+    # Analýza aplikace prochází zdrojové soubory repozitáře, velikost vstupu
+    # na ni nemá vliv, měří se proto jen jednou velikostí
+    "app_analysis": {
+        "make": lambda size, rng: "Jaký je stav české lokalizace?",
+        "run": lambda processor, data: processor.process_app_analysis(data, {}),
+        "sizes": [1]
+    }
+}
+
+def percentile(samples: List[float], q: float) -> float:
+    """
+    Percentil metodou nejbližšího pořadí
+    """
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, math.ceil(q * len(ordered)) - 1))
+    return ordered[index]
+
+def runs_for(size: int, runs: int) -> int:
+    """
+    Počet opakování pro velikost, u velkých vstupů se snižuje
+    """
+    if size >= 1000000:
+        return max(1, min(runs, 2))
+    if size >= 100000:
+        return max(1, min(runs, 3))
+    return runs
+
+def measure(processor, spec: Dict[str, Any], size: int, runs: int, seed: int) -> Dict[str, float]:
+    """
+    Měření jednoho procesoru s jednou velikostí vstupu
+    """
+    data = spec["make"](size, random.Random(seed))
+    run = spec["run"]
+
+    # Zahřátí (importy, inicializace knihoven)
+    run(processor, data)
+
+    samples = []
+    for _ in range(runs_for(size, runs)):
+        started = time.perf_counter()
+        run(processor, data)
+        samples.append((time.perf_counter() - started) * 1000)
+
+    tracemalloc.start()
+    try:
+        run(processor, data)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    median_ms = percentile(samples, 0.5)
+    return {
+        "runs": len(samples),
+        "p50Ms": round(median_ms, 3),
+        "p95Ms": round(percentile(samples, 0.95), 3),
+        "p99Ms": round(percentile(samples, 0.99), 3),
+        "throughputPerSec": round(size / (median_ms / 1000), 1) if median_ms > 0 else 0.0,
+        "peakMemoryMb": round(peak / (1024 * 1024), 3)
+    }
+
+def scaling_exponent(results: Dict[str, Dict[str, float]]) -> Optional[float]:
+    """
+    Sklon log(latence) vůči log(velikost) metodou nejmenších čtverců
+
+    Malé vstupy (pod 100) se vynechávají, jejich latenci určuje režie volání.
+    """
+    points = [
+        (math.log(int(size)), math.log(values["p50Ms"]))
+        for size, values in results.items()
+        if int(size) >= 100 and values["p50Ms"] > 0
+    ]
+    if len(points) < 2:
+        return None
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    denominator = sum((x - mean_x) ** 2 for x, _ in points)
+    if denominator == 0:
+        return None
+    return round(sum((x - mean_x) * (y - mean_y) for x, y in points) / denominator, 3)
+
+def run_benchmark(handlers: List[str], sizes: List[int], runs: int, seed: int) -> Dict[str, Any]:
+    """
+    Provedení měření všech vybraných procesorů
+    """
+    from azr_bridge import AZRProcessor
+
+    processor = AZRProcessor()
+    results: Dict[str, Any] = {}
+    for name in handlers:
+        spec = HANDLERS[name]
+        handler_results = {}
+        for size in spec.get("sizes", sizes):
+            print(f"{name}: velikost {size}...", file=sys.stderr)
+            handler_results[str(size)] = measure(processor, spec, size, runs, seed)
+        results[name] = {"sizes": handler_results, "scalingExponent": scaling_exponent(handler_results)}
+    return results
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float,
+            min_delta_ms: float, min_delta_mb: float) -> List[str]:
+    """
+    Porovnání s baseline, vrací seznam regresí
+
+    Regrese je zpomalení mediánu nebo nárůst špičky paměti o více než
+    `threshold` (relativně) a zároveň o více než absolutní minimum, aby šum
+    u rychlých měření nevedl k chybám. Velikosti chybějící v baseline se
+    přeskakují.
+    """
+    regressions = []
+    for name, handler_results in results.items():
+        reference_sizes = baseline.get(name, {}).get("sizes", {})
+        for size, values in handler_results["sizes"].items():
+            reference = reference_sizes.get(size)
+            if reference is None:
+                continue
+            checks = [("p50Ms", "ms", min_delta_ms), ("peakMemoryMb", "MB", min_delta_mb)]
+            for key, unit, min_delta in checks:
+                value, expected = values[key], reference.get(key)
+                if expected is None or expected <= 0:
+                    continue
+                if value > expected * (1 + threshold) and value - expected > min_delta:
+                    regressions.append(f"{name}[{size}].{key}: {value:.1f} {unit} (baseline {expected:.1f} {unit})")
+    return regressions
+
+def print_table(results: Dict[str, Any]) -> None:
+    """
+    Přehledová tabulka výsledků na stderr
+    """
+    print(f"{'procesor':<26}{'velikost':>10}{'p50 ms':>12}{'p95 ms':>12}{'p99 ms':>12}"
+          f"{'položek/s':>14}{'paměť MB':>11}", file=sys.stderr)
+    for name, handler_results in results.items():
+        for size, values in handler_results["sizes"].items():
+            print(f"{name:<26}{size:>10}{values['p50Ms']:>12.2f}{values['p95Ms']:>12.2f}{values['p99Ms']:>12.2f}"
+                  f"{values['throughputPerSec']:>14.0f}{values['peakMemoryMb']:>11.2f}", file=sys.stderr)
+        if handler_results["scalingExponent"] is not None:
+            print(f"{name:<26}{'exponent škálování':>36} {handler_results['scalingExponent']}", file=sys.stderr)
+
+def main():
+    """
+    Hlavní funkce benchmarku procesorů
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Benchmark procesorů AZR dotazů')
+    parser.add_argument('--handlers', type=str, default=",".join(HANDLERS),
+                        help='Měřené procesory oddělené čárkou (default: všechny)')
+    parser.add_argument('--sizes', type=str, default=None,
+                        help='Velikosti vstupů oddělené čárkou (default: 10 až --max-size po řádech)')
+    parser.add_argument('--max-size', type=int, default=DEFAULT_MAX_SIZE,
+                        help=f'Největší výchozí velikost vstupu (default: {DEFAULT_MAX_SIZE})')
+    parser.add_argument('--runs', type=int, default=5, help='Počet opakování měření (default: 5)')
+    parser.add_argument('--seed', type=int, default=42, help='Semínko generátoru vstupů (default: 42)')
+    parser.add_argument('--baseline', type=str, default=DEFAULT_BASELINE,
+                        help='Soubor s baseline (default: benchmarks/handlers_baseline.json)')
+    parser.add_argument('--update-baseline', action='store_true', help='Uloží výsledky jako novou baseline')
+    parser.add_argument('--threshold', type=float, default=0.3,
+                        help='Povolené relativní zhoršení oproti baseline (default: 0.3)')
+    parser.add_argument('--min-delta-ms', type=float, default=5.0,
+                        help='Minimální absolutní zpomalení považované za regresi (default: 5 ms)')
+    parser.add_argument('--min-delta-mb', type=float, default=1.0,
+                        help='Minimální absolutní nárůst paměti považovaný za regresi (default: 1 MB)')
+    args = parser.parse_args()
+
+    handlers = [name for name in args.handlers.split(",") if name]
+    unknown = [name for name in handlers if name not in HANDLERS]
+    if unknown:
+        parser.error(f"Neznámé procesory: {', '.join(unknown)} (dostupné: {', '.join(HANDLERS)})")
+    if args.sizes:
+        sizes = [int(size) for size in args.sizes.split(",") if size]
+    else:
+        sizes = [size for size in DEFAULT_SIZES if size <= args.max_size]
+
+    results = run_benchmark(handlers, sizes, args.runs, args.seed)
+    print_table(results)
+    print(json.dumps(results, indent=2))
+
+    if args.update_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, "r", encoding="utf-8") as f:
+                baseline = json.load(f)
+        # Měřené procesory se v baseline nahradí, ostatní zůstanou
+        baseline.update(results)
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=2)
+            f.write("\n")
+        print(f"Baseline uložena do {args.baseline}", file=sys.stderr)
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"Baseline {args.baseline} neexistuje, porovnání přeskočeno", file=sys.stderr)
+        return
+
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+
+    regressions = compare(results, baseline, args.threshold, args.min_delta_ms, args.min_delta_mb)
+    if regressions:
+        print("Regrese výkonu procesorů:", file=sys.stderr)
+        for regression in regressions:
+            print(f"  {regression}", file=sys.stderr)
+        sys.exit(1)
+
+    print("Bez regresí oproti baseline", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,384 @@
+"""
+AZR Cache - mezipaměť výsledků AZR dotazů
+
+Klíčem je hash kanonické podoby dotazu (typ, data, options a text dotazu)
+se seřazenými klíči a jednotným formátem čísel, takže stejné dotazy
+poslané z Node.js v jiném pořadí klíčů sdílí jednu položku.
+Položky se vyřazují podle LRU při překročení počtu i přibližné velikosti
+v bajtech a každý typ dotazu má vlastní dobu platnosti (TTL).
+
+Volitelně lze pod paměťovou mezipaměť připojit perzistentní SQLite soubor
+(SQLiteCacheBackend), který sdílí více současně běžících procesů bridge.
+"""
+
+import importlib.util
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+from azr_codec import to_builtin
+
+# Doba platnosti výsledků podle typu dotazu v sekundách, 0 = neukládat
+DEFAULT_TTLS = {
+    "azr_capabilities": 3600,
+    "analysis": 900,
+    "app_analysis": 900,
+    "text_vectorization": 300,
+    "reservation_analysis": 120,
+    "conflict_resolution": 120,
+    "user_reservation_analysis": 30,
+    "token_analysis": 5,
+    "token_analysis_bulk": 0,
+    "token_cube_refresh": 0,
+    "token_anomaly": 0,
+    "token_reconcile": 0,
+    "batch": 0,
+    "metrics": 0
+}
+
+# Volby, které neovlivňují výsledek a nejsou proto součástí klíče
+NON_KEY_OPTIONS = {"cache", "profile", "deadlineMs"}
+
+# Verze formátu uložených odpovědí, zvýšit při změně jejich struktury
+CACHE_FORMAT_VERSION = 1
+
+# Moduly s kódem procesorů, jejichž změna zneplatní perzistentní mezipaměť
+HANDLER_MODULES = [
+    "azr_bridge", "azr_processor", "azr_token_kernel", "azr_forecast", "azr_cube", "azr_reducer",
+    "azr_rollups", "azr_columnar", "app_analysis"
+]
+
+# Položky jiné verze kódu, které nikdo nepoužil déle než tuto dobu (s), se mažou
+STALE_VERSION_SECONDS = 600
+
+_handler_version: Optional[str] = None
+
+def handler_version() -> str:
+    """
+    Verze kódu procesorů pro klíče perzistentní mezipaměti
+
+    Hash zdrojových souborů modulů z HANDLER_MODULES spolu s CACHE_FORMAT_VERSION.
+    Moduly se pouze vyhledají, neimportují se.
+    """
+    global _handler_version
+    if _handler_version is None:
+        import hashlib
+
+        digest = hashlib.sha256(str(CACHE_FORMAT_VERSION).encode("ascii"))
+        for name in HANDLER_MODULES:
+            spec = importlib.util.find_spec(name)
+            if spec is not None and spec.origin and os.path.exists(spec.origin):
+                with open(spec.origin, "rb") as f:
+                    digest.update(f.read())
+        _handler_version = digest.hexdigest()[:16]
+    return _handler_version
+
+def _normalize(value: Any) -> Any:
+    """
+    Sjednocení hodnot pro kanonický klíč
+
+    Celočíselné floaty se převádí na int (1.0 a 1 dávají stejný klíč),
+    ostatní floaty json zapisuje nejkratší přesnou reprezentací (repr).
+    """
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, float):
+        if value.is_integer():
+            return int(value)
+        return value
+    if isinstance(value, dict):
+        return {str(k): _normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    return value
+
+def canonical_key(query: Dict[str, Any]) -> str:
+    """
+    Kanonický klíč dotazu pro mezipaměť
+    """
+    import hashlib
+
+    options = query.get("options") or {}
+    if isinstance(options, dict):
+        options = {k: v for k, v in options.items() if k not in NON_KEY_OPTIONS}
+
+    canonical = json.dumps(
+        [query.get("type", "unknown"), _normalize(query.get("data", {})),
+         _normalize(options), query.get("query", "")],
+        sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=to_builtin
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+class ResultCache:
+    """
+    LRU mezipaměť odpovědí s limitem počtu položek, velikosti a TTL podle typu
+    """
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 64 * 1024 * 1024,
+                 ttls: Optional[Dict[str, float]] = None, default_ttl: float = 60,
+                 backend: Optional["SQLiteCacheBackend"] = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttls = dict(DEFAULT_TTLS)
+        if ttls:
+            self.ttls.update(ttls)
+        self.default_ttl = default_ttl
+        self.entries: "OrderedDict[str, Tuple[float, int, Dict[str, Any]]]" = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.backend = backend
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "ResultCache":
+        """
+        Vytvoření mezipaměti podle proměnných prostředí
+
+        AZR_CACHE_MAX_ENTRIES (0 mezipaměť vypne) a AZR_CACHE_MAX_BYTES.
+        AZR_CACHE_PATH připojí perzistentní SQLite mezipaměť s limity
+        AZR_CACHE_DB_MAX_ENTRIES a AZR_CACHE_DB_MAX_BYTES.
+        """
+        backend = None
+        cache_path = os.environ.get("AZR_CACHE_PATH")
+        if cache_path:
+            backend = SQLiteCacheBackend(
+                cache_path,
+                max_entries=int(os.environ.get("AZR_CACHE_DB_MAX_ENTRIES", 100000)),
+                max_bytes=int(os.environ.get("AZR_CACHE_DB_MAX_BYTES", 512 * 1024 * 1024))
+            )
+        return cls(
+            max_entries=int(os.environ.get("AZR_CACHE_MAX_ENTRIES", 1024)),
+            max_bytes=int(os.environ.get("AZR_CACHE_MAX_BYTES", 64 * 1024 * 1024)),
+            backend=backend
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return (self.max_entries > 0 and self.max_bytes > 0) or self.backend is not None
+
+    def ttl_for(self, query_type: str) -> float:
+        """Doba platnosti výsledku pro daný typ dotazu"""
+        return self.ttls.get(query_type, self.default_ttl)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Vyhledání odpovědi, prošlé položky se rovnou odstraní
+
+        Při nenalezení v paměti se zkusí perzistentní backend a nalezená
+        odpověď se uloží i do paměti.
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                expires_at, size, response = entry
+                if expires_at > time.monotonic():
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return response
+                del self.entries[key]
+                self.total_bytes -= size
+
+        if self.backend is not None:
+            found = self.backend.get(key)
+            if found is not None:
+                response, remaining_ttl = found
+                self._put_memory(key, response, remaining_ttl)
+                with self.lock:
+                    self.hits += 1
+                return response
+
+        with self.lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, query_type: str, response: Dict[str, Any]) -> None:
+        """
+        Uložení odpovědi a vyřazení nejdéle nepoužitých položek nad limity
+        """
+        ttl = self.ttl_for(query_type)
+        if ttl <= 0 or not self.enabled:
+            return
+
+        self._put_memory(key, response, ttl)
+        if self.backend is not None:
+            self.backend.put(key, response, ttl)
+
+    def _put_memory(self, key: str, response: Dict[str, Any], ttl: float) -> None:
+        """Uložení odpovědi do paměťové části mezipaměti"""
+        if self.max_entries <= 0 or self.max_bytes <= 0:
+            return
+
+        size = len(json.dumps(response, default=to_builtin))
+        if size > self.max_bytes:
+            return
+
+        with self.lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.total_bytes -= previous[1]
+            self.entries[key] = (time.monotonic() + ttl, size, response)
+            self.total_bytes += size
+
+            while self.entries and (len(self.entries) > self.max_entries or self.total_bytes > self.max_bytes):
+                _, (_, evicted_size, _) = self.entries.popitem(last=False)
+                self.total_bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Vyprázdnění mezipaměti"""
+        with self.lock:
+            self.entries.clear()
+            self.total_bytes = 0
+        if self.backend is not None:
+            self.backend.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Počítadla mezipaměti"""
+        with self.lock:
+            stats = {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self.entries),
+                "bytes": self.total_bytes
+            }
+        if self.backend is not None:
+            stats["backend"] = self.backend.stats()
+        return stats
+
+class SQLiteCacheBackend:
+    """
+    Perzistentní mezipaměť odpovědí v SQLite souboru
+
+    Soubor mohou současně používat jednorázové procesy bridge, pracovní procesy
+    poolu i servery (WAL režim, čekání na zámek). Klíče obsahují verzi kódu
+    procesorů, takže každá verze čte jen své položky; při postupném nasazení
+    tak souběžně běžící starší a novější procesy soubor sdílí bez mazání
+    položek té druhé. Prošlé, nejdéle nepoužité a položky jiné verze nepoužité
+    déle než `stale_after` sekund se mažou průběžně po každých `evict_every` zápisech.
+    """
+    def __init__(self, path: str, max_entries: int = 100000, max_bytes: int = 512 * 1024 * 1024,
+                 evict_every: int = 32, version: Optional[str] = None,
+                 stale_after: float = STALE_VERSION_SECONDS):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.evict_every = max(1, evict_every)
+        self.version = version or handler_version()
+        self.stale_after = stale_after
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.writes = 0
+        self.lock = threading.Lock()
+
+        # sqlite3 se importuje jen s perzistentní mezipamětí
+        import sqlite3
+
+        self.database_errors = sqlite3.OperationalError
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=5.0, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            " key TEXT PRIMARY KEY,"
+            " version TEXT NOT NULL,"
+            " expires_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " response TEXT NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS results_accessed_at ON results (accessed_at)")
+
+    def _versioned(self, key: str) -> str:
+        return f"{self.version}:{key}"
+
+    def get(self, key: str) -> Optional[Tuple[Dict[str, Any], float]]:
+        """
+        Vyhledání odpovědi, vrací dvojici (odpověď, zbývající TTL)
+        """
+        now = time.time()
+        with self.lock:
+            try:
+                row = self.conn.execute(
+                    "SELECT expires_at, response FROM results WHERE key = ?", (self._versioned(key),)
+                ).fetchone()
+                if row is None or row[0] <= now:
+                    self.misses += 1
+                    return None
+                self.conn.execute(
+                    "UPDATE results SET accessed_at = ? WHERE key = ?", (now, self._versioned(key))
+                )
+            except self.database_errors:
+                # Zamčená nebo poškozená databáze nesmí zastavit zpracování dotazu
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(row[1]), row[0] - now
+
+    def put(self, key: str, response: Dict[str, Any], ttl: float) -> None:
+        """
+        Uložení odpovědi s danou dobou platnosti
+        """
+        payload = json.dumps(response, default=to_builtin)
+        if len(payload) > self.max_bytes:
+            return
+
+        now = time.time()
+        with self.lock:
+            try:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO results (key, version, expires_at, accessed_at, size, response)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    (self._versioned(key), self.version, now + ttl, now, len(payload), payload)
+                )
+                self.writes += 1
+                if self.writes % self.evict_every == 0:
+                    self._evict(now)
+            except self.database_errors:
+                pass
+
+    def _evict(self, now: float) -> None:
+        """Odstranění prošlých a opuštěných položek a nejdéle nepoužitých položek nad limity"""
+        self.conn.execute("DELETE FROM results WHERE expires_at <= ?", (now,))
+        self.conn.execute(
+            "DELETE FROM results WHERE version != ? AND accessed_at <= ?", (self.version, now - self.stale_after)
+        )
+        count, total_bytes = self.conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results"
+        ).fetchone()
+
+        while count > self.max_entries or total_bytes > self.max_bytes:
+            batch = max(1, count // 10, count - self.max_entries)
+            deleted = self.conn.execute(
+                "DELETE FROM results WHERE key IN"
+                " (SELECT key FROM results ORDER BY accessed_at ASC LIMIT ?)", (batch,)
+            ).rowcount
+            self.evictions += deleted
+            count, total_bytes = self.conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results"
+            ).fetchone()
+            if deleted == 0:
+                break
+
+    def clear(self) -> None:
+        """Vyprázdnění perzistentní mezipaměti"""
+        with self.lock:
+            self.conn.execute("DELETE FROM results")
+
+    def stats(self) -> Dict[str, Any]:
+        """Počítadla perzistentní mezipaměti"""
+        with self.lock:
+            return {
+                "path": self.path,
+                "version": self.version,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
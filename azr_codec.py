@@ -0,0 +1,225 @@
+"""
+AZR Codec - kódování dotazů a odpovědí AZR bridge
+
+Kodeky:
+    "orjson"    rychlý JSON (pokud je orjson k dispozici)
+    "json"      standardní knihovna, záložní varianta
+    "msgpack"   binární MessagePack (pokud je msgpack k dispozici)
+    "auto"      orjson, pokud je k dispozici, jinak json
+
+Textové kodeky se v proudu oddělují novým řádkem (NDJSON), binární
+délkovou hlavičkou (4 bajty big-endian). Jeden velký dotaz (soubor, stdin)
+se čte po blocích metodou decode_stream, msgpack ho dekóduje průběžně. Skaláry a pole numpy/pandas
+i datumy se serializují přímo, procesory je nemusí převádět přes float(...).
+Bajty označené jako BinaryData (např. typovaná pole sloupcových výstupů)
+zapisují binární kodeky beze změny a textové kodeky jako řetězec base64.
+"""
+
+import base64
+import datetime
+import json
+import os
+import struct
+from typing import Any, Callable, Dict, Iterator, Optional
+
+# Hlavička binárně rámcované zprávy: délka těla jako unsigned 32-bit big-endian
+FRAME_HEADER = struct.Struct(">I")
+
+# Velikost bloku při čtení velkých dotazů z proudu
+READ_CHUNK_SIZE = 1024 * 1024
+
+def read_all(stream, chunk_size: int = READ_CHUNK_SIZE) -> bytearray:
+    """
+    Načtení celého binárního proudu po blocích do jednoho bufferu
+
+    Na rozdíl od read() bez omezení nevznikají mezilehlé kopie bloků.
+    """
+    buffer = bytearray()
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            return buffer
+        buffer += chunk
+
+class BinaryData(bytes):
+    """
+    Binární obsah odpovědi: msgpack ho zapíše jako bin, JSON jako base64
+    """
+
+def to_builtin(value: Any) -> Any:
+    """
+    Převod hodnot, které json neumí serializovat, na vestavěné typy
+
+    Používá se jako `default` pro všechny kodeky (i pro mezipaměť).
+    """
+    # pandas Timestamp i datetime
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    # numpy/pandas skaláry (np.int64, np.float64, np.bool_ ...) mají item()
+    item = getattr(value, "item", None)
+    if callable(item) and getattr(value, "ndim", 1) == 0:
+        return item()
+    # numpy pole, pandas Series a Index
+    tolist = getattr(value, "tolist", None)
+    if callable(tolist):
+        return tolist()
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    if isinstance(value, BinaryData):
+        return base64.b64encode(value).decode("ascii")
+    if isinstance(value, bytes):
+        return value.decode("utf-8", errors="replace")
+    raise TypeError(f"Objekt typu {type(value).__name__} nelze serializovat")
+
+class JSONCodec:
+    """
+    Kodek nad standardní knihovnou json
+    """
+    name = "json"
+    binary = False
+
+    def encode(self, message: Any) -> bytes:
+        return json.dumps(message, default=to_builtin).encode("utf-8")
+
+    def decode(self, payload) -> Any:
+        if isinstance(payload, memoryview):
+            payload = payload.tobytes()
+        return json.loads(payload)
+
+    def decode_stream(self, stream, chunk_size: int = READ_CHUNK_SIZE) -> Any:
+        return json.loads(read_all(stream, chunk_size))
+
+class OrjsonCodec:
+    """
+    Kodek nad knihovnou orjson s nativní serializací numpy
+    """
+    name = "orjson"
+    binary = False
+
+    def __init__(self):
+        import orjson
+
+        self.orjson = orjson
+        self.options = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+    def encode(self, message: Any) -> bytes:
+        return self.orjson.dumps(message, default=to_builtin, option=self.options)
+
+    def decode(self, payload) -> Any:
+        return self.orjson.loads(payload)
+
+    def decode_stream(self, stream, chunk_size: int = READ_CHUNK_SIZE) -> Any:
+        return self.orjson.loads(read_all(stream, chunk_size))
+
+class MsgpackCodec:
+    """
+    Binární kodek MessagePack
+    """
+    name = "msgpack"
+    binary = True
+
+    def __init__(self):
+        import msgpack
+
+        self.msgpack = msgpack
+
+    def encode(self, message: Any) -> bytes:
+        return self.msgpack.packb(message, default=to_builtin, use_bin_type=True)
+
+    def decode(self, payload) -> Any:
+        return self.msgpack.unpackb(payload, raw=False, strict_map_key=False)
+
+    def decode_stream(self, stream, chunk_size: int = READ_CHUNK_SIZE) -> Any:
+        """Průběžné dekódování, objekty se skládají už během čtení bloků"""
+        unpacker = self.msgpack.Unpacker(raw=False, strict_map_key=False, max_buffer_size=0)
+        while True:
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                break
+            unpacker.feed(chunk)
+            for message in unpacker:
+                return message
+        raise ValueError("Neúplná zpráva msgpack")
+
+_CODEC_FACTORIES: Dict[str, Callable[[], Any]] = {
+    "json": JSONCodec,
+    "orjson": OrjsonCodec,
+    "msgpack": MsgpackCodec
+}
+
+def available_codecs() -> list:
+    """
+    Seznam kodeků, jejichž knihovny jsou k dispozici (bez importu)
+    """
+    import importlib.util
+
+    names = ["json"]
+    for name in ("orjson", "msgpack"):
+        if importlib.util.find_spec(name) is not None:
+            names.append(name)
+    return names
+
+_codec_cache: Dict[str, Any] = {}
+
+def default_codec_name() -> str:
+    """
+    Název výchozího kodeku z proměnné prostředí AZR_CODEC
+    """
+    return os.environ.get("AZR_CODEC", "auto")
+
+def get_codec(name: Optional[str] = "auto") -> Any:
+    """
+    Vytvoření kodeku podle názvu
+
+    "auto" zvolí orjson, pokud je k dispozici, jinak json. Pro neznámý nebo
+    nedostupný kodek vyvolá ValueError.
+    """
+    name = (name or "auto").lower()
+    if name == "auto":
+        name = "orjson" if "orjson" in available_codecs() else "json"
+
+    codec = _codec_cache.get(name)
+    if codec is not None:
+        return codec
+
+    factory = _CODEC_FACTORIES.get(name)
+    if factory is None:
+        raise ValueError(f"Neznámý kodek: {name} (dostupné: {', '.join(available_codecs())})")
+    try:
+        codec = factory()
+    except ImportError:
+        raise ValueError(f"Kodek {name} není k dispozici (dostupné: {', '.join(available_codecs())})")
+    _codec_cache[name] = codec
+    return codec
+
+def frame(codec, payload: bytes) -> bytes:
+    """
+    Orámování zakódované zprávy pro zápis do proudu
+    """
+    if codec.binary:
+        return FRAME_HEADER.pack(len(payload)) + payload
+    return payload + b"\n"
+
+def read_messages(stream, codec) -> Iterator[bytes]:
+    """
+    Čtení zakódovaných zpráv z binárního proudu podle rámcování kodeku
+
+    Textové kodeky čtou po řádcích (prázdné řádky přeskočí), binární podle
+    délkové hlavičky. Končí na konci proudu.
+    """
+    if not codec.binary:
+        for line in stream:
+            line = line.strip()
+            if line:
+                yield line
+        return
+
+    while True:
+        header = stream.read(FRAME_HEADER.size)
+        if len(header) < FRAME_HEADER.size:
+            return
+        (length,) = FRAME_HEADER.unpack(header)
+        payload = stream.read(length)
+        if len(payload) < length:
+            return
+        yield payload
@@ -0,0 +1,193 @@
+"""
+AZR Columnar - sloupcové vstupy a výstupy analytických dotazů
+
+Místo pole transakcí (řádek = objekt) lze sloupce poslat přímo ve zprávě
+v data.columnar, ve stejném tvaru jako popisovač oblasti sdílené paměti
+(viz azr_shm), jen s hodnotami místo offsetů:
+
+    {"length": 3,
+     "columns": {"timestamp": {"dtype": "int64", "data": <bajty>},
+                 "amount": [10, 5, 7],
+                 "type": ["earned", "spent", "earned"]},
+     "typeCodes": [...], "categoryCodes": [...]}
+
+Sloupec je pole hodnot (čísla i řetězce), nebo typované pole: dtype
+a little-endian data jako bajty (binární kodeky) nebo base64 (textové
+kodeky). Místo "columns" může popisovač obsahovat "arrow" s tabulkou ve
+formátu Arrow IPC stream; ten vyžaduje pyarrow, které je volitelné.
+
+Výstup řídí options.format: výchozí "rows" ponechává odpovědi beze změny,
+"columns" a "arrow" vracejí pole výsledků (časové řady, rozložení, vektory
+podobnosti) jako tabulky {"length", "columns"} nebo {"length", "arrow"}.
+"""
+
+import base64
+import importlib.util
+from typing import Dict, Any, List
+
+from azr_codec import BinaryData
+
+FORMAT_ROWS = "rows"
+FORMAT_COLUMNS = "columns"
+FORMAT_ARROW = "arrow"
+
+def arrow_available() -> bool:
+    """
+    Dostupnost pyarrow bez jeho importu
+    """
+    try:
+        return importlib.util.find_spec("pyarrow") is not None
+    except (ImportError, ValueError):
+        return False
+
+def available_formats() -> List[str]:
+    """
+    Formáty výstupu, které lze v options.format zvolit
+    """
+    formats = [FORMAT_ROWS, FORMAT_COLUMNS]
+    if arrow_available():
+        formats.append(FORMAT_ARROW)
+    return formats
+
+def output_format(options: Dict[str, Any]) -> str:
+    """
+    Formát výstupu z options.format, pro neznámý nebo nedostupný vyvolá ValueError
+    """
+    name = options.get("format") or FORMAT_ROWS
+    if name not in (FORMAT_ROWS, FORMAT_COLUMNS, FORMAT_ARROW):
+        raise ValueError(f"Neznámý formát výstupu: {name} (dostupné: {', '.join(available_formats())})")
+    if name == FORMAT_ARROW and not arrow_available():
+        raise ValueError("Formát arrow vyžaduje knihovnu pyarrow")
+    return name
+
+def is_columnar_output(options: Dict[str, Any]) -> bool:
+    """
+    Zda dotaz žádá sloupcový výstup (odpověď pak obsahuje binární data)
+    """
+    return (options.get("format") or FORMAT_ROWS) != FORMAT_ROWS
+
+def _binary(payload: Any) -> bytes:
+    """Bajty z binárního kodeku, nebo base64 řetězec z textového"""
+    if isinstance(payload, str):
+        return base64.b64decode(payload)
+    if isinstance(payload, (bytes, bytearray, memoryview)):
+        return payload
+    raise ValueError("Binární data musí být bajty nebo řetězec base64")
+
+def decode_column(name: str, value: Any):
+    """
+    Sloupec ze zprávy jako numpy pole
+
+    Pole řetězců (a dalších nečíselných hodnot) je pole objektů, typované
+    pole se čte pohledem do přijatých bajtů bez kopírování.
+    """
+    import numpy as np
+    from azr_shm import _column_dtype
+
+    if isinstance(value, dict):
+        dtype = _column_dtype(value.get("dtype", "float64"))
+        payload = _binary(value.get("data", b""))
+        if len(payload) % dtype.itemsize:
+            raise ValueError(f"Délka dat sloupce {name} není násobkem velikosti typu {dtype.name}")
+        return np.frombuffer(payload, dtype=dtype)
+    if isinstance(value, list):
+        values = np.asarray(value) if value else np.zeros(0)
+        if values.dtype.kind not in "iufb":
+            values = np.asarray(value, dtype=object)
+        return values
+    raise ValueError(f"Sloupec {name} musí být pole hodnot nebo typované pole (dtype, data)")
+
+def encode_column(values: Any) -> Any:
+    """
+    Sloupec pro odpověď: číselná pole jako typovaná pole, ostatní jako seznam
+    """
+    import numpy as np
+    from azr_shm import _column_dtype
+
+    values = np.asarray(values)
+    if values.dtype.kind == "b":
+        values = values.astype(np.uint8)
+    if values.dtype.kind not in "iuf":
+        return values.tolist()
+    dtype = _column_dtype(values.dtype.name)
+    return {"dtype": dtype.name, "data": BinaryData(values.astype(dtype, copy=False).tobytes())}
+
+def read_arrow(payload: Any) -> Dict[str, Any]:
+    """
+    Sloupce tabulky ve formátu Arrow IPC stream jako numpy pole
+    """
+    if not arrow_available():
+        raise ValueError("Vstup ve formátu Arrow vyžaduje knihovnu pyarrow")
+    import pyarrow as pa
+
+    table = pa.ipc.open_stream(pa.py_buffer(_binary(payload))).read_all()
+    return {name: table.column(name).to_numpy() for name in table.column_names}
+
+def write_arrow(columns: Dict[str, Any]) -> BinaryData:
+    """
+    Tabulka ve formátu Arrow IPC stream
+    """
+    import pyarrow as pa
+
+    table = pa.table({name: pa.array(values) for name, values in columns.items()})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return BinaryData(sink.getvalue().to_pybytes())
+
+def encode_table(columns: Dict[str, Any], fmt: str) -> Dict[str, Any]:
+    """
+    Tabulka výsledků (sloupce stejné délky) ve formátu "columns" nebo "arrow"
+    """
+    length = len(next(iter(columns.values()))) if columns else 0
+    if fmt == FORMAT_ARROW:
+        return {"length": length, "arrow": write_arrow(columns)}
+    return {"length": length, "columns": {name: encode_column(values) for name, values in columns.items()}}
+
+class InlineColumns:
+    """
+    Sloupcová data předaná přímo ve zprávě (typovaná pole nebo Arrow)
+
+    Má stejné rozhraní jako azr_shm.ColumnarRegion, zpracování tak nemusí
+    rozlišovat, odkud sloupce pocházejí.
+    """
+    def __init__(self, descriptor: Dict[str, Any]):
+        if descriptor.get("arrow") is not None:
+            self.columns = read_arrow(descriptor["arrow"])
+        else:
+            self.columns = {
+                name: decode_column(name, value) for name, value in (descriptor.get("columns") or {}).items()
+            }
+
+        lengths = {len(values) for values in self.columns.values()}
+        if len(lengths) > 1:
+            raise ValueError("Sloupce ve zprávě nemají stejnou délku")
+        self.length = lengths.pop() if lengths else 0
+        if descriptor.get("length") is not None and int(descriptor["length"]) != self.length:
+            raise ValueError(f"Délka sloupců ({self.length}) neodpovídá length ({descriptor['length']})")
+
+    def close(self) -> None:
+        self.columns = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+def is_inline(descriptor: Dict[str, Any]) -> bool:
+    """
+    Zda popisovač nese sloupce přímo ve zprávě (ne oblast shm/path)
+    """
+    return not descriptor.get("shm") and not descriptor.get("path")
+
+def open_columns(descriptor: Dict[str, Any]):
+    """
+    Otevření sloupcových dat podle popisovače: oblast sdílené paměti,
+    mapovaný soubor, nebo sloupce přímo ve zprávě
+    """
+    if is_inline(descriptor):
+        return InlineColumns(descriptor)
+    from azr_shm import ColumnarRegion
+
+    return ColumnarRegion(descriptor)
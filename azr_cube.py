@@ -0,0 +1,485 @@
+#!/usr/bin/env python3
+"""
+AZR Cube - předpočítaná kostka součtů tokenů uživatel × měsíc × kategorie × typ
+
+Kostka je adresář s poli numpy mapovanými do paměti:
+
+    cells-<generace>.npy    neprázdné buňky (měsíc, kategorie, typ, součet,
+                            počet) seřazené podle uživatele, měsíce a kategorie
+    offsets-<generace>.npy  začátky buněk jednotlivých uživatelů (index)
+    profile-<generace>.npy  součty po hodinách a dnech v týdnu, počty,
+                            maximum a čas poslední transakce pro každou
+                            dvojici uživatel × měsíc
+    profile_offsets-<generace>.npy
+                            začátky profilů jednotlivých uživatelů (index)
+    index.json              uživatelé, kategorie, započítané dny a generace
+
+token_analysis s data.cube = {"path", "userId"} sestaví TokenRollup jen
+z buněk daného uživatele (počet měsíců × kategorií), bez čtení transakcí,
+a vrátí stejný výsledek jako analýza nad všemi jeho transakcemi. Časové
+okno (options.timeframe, from, to) se v kostce uplatní po celých měsících.
+Čas nejnovější transakce je bez časové zóny; celočíselnost součtů platí
+pro celou kostku.
+
+Kostka se obnovuje po dnech: refresh přičte transakce nových dnů a odmítne
+den, který už v kostce je. Nová generace souborů se zapíše vedle staré
+a přepne se atomickou výměnou index.json, čtenáři s otevřenou starší
+generací tak dočtou bez přerušení.
+
+Použití:
+    python azr_cube.py build /data/cube export.jsonl --shape sql
+    python azr_cube.py refresh /data/cube 2024-06-01.jsonl --shape sql
+    python azr_cube.py stats /data/cube
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Dict, Any, Iterator, List
+
+import numpy as np
+
+# Verze formátu kostky, zvýšit při změně polí
+CUBE_FORMAT_VERSION = 2
+
+INDEX_FILE = "index.json"
+LOCK_FILE = ".lock"
+
+# Měsíc buňky pro transakce bez platného času
+NO_MONTH = np.iinfo(np.int32).min
+
+CELL_DTYPE = np.dtype([
+    ("month", "<i4"), ("category", "<i4"), ("type", "i1"), ("sum", "<f8"), ("count", "<i8")
+])
+
+PROFILE_DTYPE = np.dtype([
+    ("month", "<i4"), ("count", "<i8"), ("amount_count", "<i8"), ("amount_max", "<f8"), ("last_ns", "<i8"),
+    ("hour_sum", "<f8", (24,)), ("hour_count", "<i8", (24,)),
+    ("weekday_sum", "<f8", (7,)), ("weekday_count", "<i8", (7,))
+])
+
+def _empty_profiles(count: int) -> np.ndarray:
+    from azr_token_kernel import NAT
+
+    profiles = np.zeros(count, dtype=PROFILE_DTYPE)
+    profiles["amount_max"] = np.nan
+    profiles["last_ns"] = NAT
+    return profiles
+
+def _aggregate_cells(users: np.ndarray, months: np.ndarray, categories: np.ndarray, types: np.ndarray,
+                     sums: np.ndarray, counts: np.ndarray):
+    """
+    Sečtení buněk se stejným klíčem, vrací (uživatelé, buňky) seřazené podle klíče
+    """
+    from azr_token_kernel import TYPE_COUNT
+
+    valid = months != NO_MONTH
+    base = int(months[valid].min()) if valid.any() else 0
+    month_slots = np.where(valid, months.astype(np.int64) - base + 1, 0)
+    month_span = int(month_slots.max()) + 1 if len(month_slots) else 1
+    category_span = int(categories.max()) + 2 if len(categories) else 1
+
+    keys = ((users.astype(np.int64) * month_span + month_slots) * category_span + categories + 1) * TYPE_COUNT + types
+    unique, inverse = np.unique(keys, return_inverse=True)
+    cells = np.zeros(len(unique), dtype=CELL_DTYPE)
+    cells["sum"] = np.bincount(inverse, sums, minlength=len(unique))
+    cells["count"] = np.rint(np.bincount(inverse, counts, minlength=len(unique))).astype(np.int64)
+
+    rest, cells["type"] = np.divmod(unique, TYPE_COUNT)
+    rest, category_slots = np.divmod(rest, category_span)
+    cell_users, month_slots = np.divmod(rest, month_span)
+    cells["category"] = category_slots - 1
+    cells["month"] = np.where(month_slots > 0, month_slots - 1 + base, NO_MONTH)
+    return cell_users, cells
+
+def _aggregate_profiles(users: np.ndarray, months: np.ndarray, timestamps: np.ndarray, weights: np.ndarray,
+                        present: np.ndarray):
+    """
+    Profily dvojic uživatel × měsíc z transakcí bloku, vrací (uživatelé, profily)
+    """
+    from azr_token_kernel import EPOCH_WEEKDAY, NS_PER_DAY, NS_PER_HOUR
+
+    valid = months != NO_MONTH
+    base = int(months[valid].min()) if valid.any() else 0
+    month_slots = np.where(valid, months.astype(np.int64) - base + 1, 0)
+    month_span = int(month_slots.max()) + 1
+    unique, inverse = np.unique(users * month_span + month_slots, return_inverse=True)
+    size = len(unique)
+    profiles = _empty_profiles(size)
+    profile_users, month_slots = np.divmod(unique, month_span)
+    profiles["month"] = np.where(month_slots > 0, month_slots - 1 + base, NO_MONTH)
+    profiles["count"] = np.bincount(inverse, minlength=size)
+    profiles["amount_count"] = np.bincount(inverse[present], minlength=size)
+    np.fmax.at(profiles["amount_max"], inverse[present], weights[present])
+    np.maximum.at(profiles["last_ns"], inverse[valid], timestamps[valid])
+
+    timed_rows = inverse[valid]
+    timed = timestamps[valid]
+    timed_weights = weights[valid]
+    hours = timed_rows * 24 + (timed // NS_PER_HOUR) % 24
+    profiles["hour_sum"] = np.bincount(hours, timed_weights, minlength=size * 24).reshape(size, 24)
+    profiles["hour_count"] = np.bincount(hours, minlength=size * 24).reshape(size, 24)
+    weekdays = timed_rows * 7 + (timed // NS_PER_DAY + EPOCH_WEEKDAY) % 7
+    profiles["weekday_sum"] = np.bincount(weekdays, timed_weights, minlength=size * 7).reshape(size, 7)
+    profiles["weekday_count"] = np.bincount(weekdays, minlength=size * 7).reshape(size, 7)
+    return profile_users, profiles
+
+def _merge_profiles(users: np.ndarray, profiles: np.ndarray):
+    """
+    Sloučení profilů se stejným uživatelem a měsícem, vrací (uživatelé, profily)
+    seřazené podle uživatele a měsíce
+    """
+    order = np.lexsort((profiles["month"], users))
+    users = users[order]
+    profiles = profiles[order]
+    if not len(users):
+        return users, profiles
+    changed = np.ones(len(users), dtype=bool)
+    changed[1:] = (users[1:] != users[:-1]) | (profiles["month"][1:] != profiles["month"][:-1])
+    starts = np.flatnonzero(changed)
+    merged = np.zeros(len(starts), dtype=PROFILE_DTYPE)
+    merged["month"] = profiles["month"][starts]
+    for name in ("count", "amount_count", "hour_sum", "hour_count", "weekday_sum", "weekday_count"):
+        merged[name] = np.add.reduceat(profiles[name], starts, axis=0)
+    merged["amount_max"] = np.fmax.reduceat(profiles["amount_max"], starts)
+    merged["last_ns"] = np.maximum.reduceat(profiles["last_ns"], starts)
+    return users[starts], merged
+
+class CubeBuilder:
+    """
+    Sestavení nové generace kostky v paměti (stavba nebo obnova po dnech)
+    """
+    def __init__(self):
+        self.users: List[Any] = []
+        self.user_index: Dict[Any, int] = {}
+        self.categories: List[Any] = []
+        self.category_index: Dict[Any, int] = {}
+        self.days: set = set()
+        self.known_days: set = set()
+        self.integer = True
+        self.generation = 0
+        self.cell_users = np.zeros(0, dtype=np.int64)
+        self.cells = np.zeros(0, dtype=CELL_DTYPE)
+        self.profile_users = np.zeros(0, dtype=np.int64)
+        self.profiles = _empty_profiles(0)
+        self.added_rows = 0
+
+    @classmethod
+    def from_cube(cls, cube: "TokenCube") -> "CubeBuilder":
+        """Pokračování z existující kostky (data se načtou do paměti)"""
+        builder = cls()
+        builder.users = list(cube.users)
+        builder.user_index = dict(cube.user_index)
+        builder.categories = list(cube.categories)
+        builder.category_index = {label: index for index, label in enumerate(builder.categories)}
+        builder.days = set(cube.days)
+        builder.known_days = set(cube.days)
+        builder.integer = cube.integer
+        builder.generation = cube.generation
+        builder.cell_users = np.repeat(np.arange(len(cube.users)), np.diff(cube.offsets))
+        builder.cells = np.array(cube.cells)
+        builder.profile_users = np.repeat(np.arange(len(cube.users)), np.diff(cube.profile_offsets))
+        builder.profiles = np.array(cube.profiles)
+        return builder
+
+    def _codes(self, values: Any, labels: List[Any], index: Dict[Any, int]) -> np.ndarray:
+        """Globální kódy hodnot, nové hodnoty se připojí na konec"""
+        import pandas as pd
+
+        local_codes, uniques = pd.factorize(values)
+        mapping = np.empty(len(uniques) + 1, dtype=np.int64)
+        mapping[-1] = -1
+        for position, label in enumerate(uniques.tolist()):
+            code = index.get(label)
+            if code is None:
+                code = index[label] = len(labels)
+                labels.append(label)
+            mapping[position] = code
+        return mapping[local_codes]
+
+    def add(self, chunk: Any) -> None:
+        """
+        Přičtení bloku transakcí (DataFrame se sloupci TRANSACTION_COLUMNS a userId)
+
+        Den transakce, který už byl v kostce před začátkem obnovy, vyvolá ValueError.
+        """
+        from azr_token_kernel import NAT, frame_arrays
+
+        if not len(chunk):
+            return
+        if chunk["userId"].isna().any():
+            raise ValueError("Transakce bez userId nelze přiřadit uživateli")
+        arrays = frame_arrays(chunk)
+        timestamps = arrays["timestamps_ns"]
+        valid = timestamps != NAT
+
+        days = set(np.unique(timestamps[valid].view("datetime64[ns]").astype("datetime64[D]")).astype(str).tolist())
+        repeated = sorted(days & self.known_days)
+        if repeated:
+            raise ValueError(f"Dny {', '.join(repeated[:5])} už jsou v kostce započítány")
+        self.days |= days
+
+        users = self._codes(chunk["userId"].to_numpy(), self.users, self.user_index)
+        categories = self._codes(chunk["category"].to_numpy(), self.categories, self.category_index)
+        types = arrays["types"]
+        amounts = arrays["amounts"]
+        if amounts.dtype.kind not in "iub":
+            self.integer = False
+        weights = amounts.astype(np.float64)
+        present = ~np.isnan(weights)
+        weights = np.where(present, weights, 0.0)
+        months = np.where(
+            valid, timestamps.view("datetime64[ns]").astype("datetime64[M]").view(np.int64), NO_MONTH
+        ).astype(np.int32)
+
+        self.cell_users, self.cells = _aggregate_cells(
+            np.concatenate([self.cell_users, users]),
+            np.concatenate([self.cells["month"], months]),
+            np.concatenate([self.cells["category"], categories]),
+            np.concatenate([self.cells["type"].astype(np.int64), types]),
+            np.concatenate([self.cells["sum"], weights]),
+            np.concatenate([self.cells["count"].astype(np.float64), np.ones(len(users))])
+        )
+
+        # Profil dvojic uživatel × měsíc: počty, maximum, poslední čas, hodiny a dny v týdnu
+        profile_users, profiles = _aggregate_profiles(users, months, timestamps, weights, present)
+        self.profile_users, self.profiles = _merge_profiles(
+            np.concatenate([self.profile_users, profile_users]),
+            np.concatenate([self.profiles, profiles])
+        )
+        self.added_rows += len(chunk)
+
+    def write(self, path: str) -> Dict[str, Any]:
+        """
+        Zápis nové generace a přepnutí index.json, starší generace se smažou
+        """
+        os.makedirs(path, exist_ok=True)
+        generation = self.generation + 1
+        offsets = np.searchsorted(self.cell_users, np.arange(len(self.users) + 1)).astype(np.int64)
+        profile_offsets = np.searchsorted(self.profile_users, np.arange(len(self.users) + 1)).astype(np.int64)
+        for name, values in (("cells", self.cells), ("offsets", offsets), ("profile", self.profiles),
+                             ("profile_offsets", profile_offsets)):
+            np.save(os.path.join(path, f"{name}-{generation}.npy"), values)
+
+        index = {
+            "version": CUBE_FORMAT_VERSION,
+            "generation": generation,
+            "integer": self.integer,
+            "users": self.users,
+            "categories": self.categories,
+            "days": sorted(self.days),
+            "cells": int(len(self.cells)),
+            "updatedAt": time.time()
+        }
+        from azr_codec import to_builtin
+
+        tmp_path = os.path.join(path, f"{INDEX_FILE}.{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(index, f, default=to_builtin, ensure_ascii=False)
+        os.replace(tmp_path, os.path.join(path, INDEX_FILE))
+
+        for entry in os.listdir(path):
+            stem, _, suffix = entry.rpartition("-")
+            if stem in ("cells", "offsets", "profile", "profile_offsets") and suffix != f"{generation}.npy":
+                os.unlink(os.path.join(path, entry))
+        self.generation = generation
+        return cube_stats(index)
+
+def cube_stats(index: Dict[str, Any]) -> Dict[str, Any]:
+    """Souhrn kostky pro odpovědi a výpis"""
+    days = index.get("days") or []
+    return {
+        "generation": index["generation"],
+        "users": len(index["users"]),
+        "categories": len(index["categories"]),
+        "cells": index["cells"],
+        "days": len(days),
+        "firstDay": days[0] if days else None,
+        "lastDay": days[-1] if days else None
+    }
+
+class TokenCube:
+    """
+    Otevřená generace kostky, pole jsou mapovaná do paměti jen pro čtení
+    """
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, INDEX_FILE), encoding="utf-8") as f:
+            index = json.load(f)
+        if index.get("version") != CUBE_FORMAT_VERSION:
+            raise ValueError(f"Kostka {path} má nepodporovanou verzi formátu {index.get('version')}")
+        self.index = index
+        self.generation = index["generation"]
+        self.integer = index["integer"]
+        self.users = index["users"]
+        self.user_index = {user: position for position, user in enumerate(self.users)}
+        self.categories = index["categories"]
+        self.days = index["days"]
+        generation = self.generation
+        self.cells = np.load(os.path.join(path, f"cells-{generation}.npy"), mmap_mode="r")
+        self.offsets = np.load(os.path.join(path, f"offsets-{generation}.npy"), mmap_mode="r")
+        self.profiles = np.load(os.path.join(path, f"profile-{generation}.npy"), mmap_mode="r")
+        self.profile_offsets = np.load(os.path.join(path, f"profile_offsets-{generation}.npy"), mmap_mode="r")
+
+    def rollup(self, user_id: Any, window: Any = None):
+        """
+        TokenRollup uživatele z jeho buněk a profilů (prázdný pro neznámého uživatele)
+
+        S `window` (TimeWindow) jen z měsíců, do kterých okno zasahuje.
+        """
+        from azr_token_kernel import NAT, TYPE_COUNT, TokenRollup
+
+        rollup = TokenRollup(integer=self.integer)
+        position = self.user_index.get(user_id)
+        if position is None:
+            return rollup
+        cells = self.cells[self.offsets[position]:self.offsets[position + 1]]
+        profiles = self.profiles[self.profile_offsets[position]:self.profile_offsets[position + 1]]
+        if window is not None:
+            # Buňky i profily uživatele jsou seřazené podle měsíce (NO_MONTH první)
+            first, last = window.month_bounds()
+            low = first if first is not None else NO_MONTH + 1
+            high = last + 1 if last is not None else np.iinfo(np.int32).max
+            cells = cells[np.searchsorted(cells["month"], low):np.searchsorted(cells["month"], high)]
+            profiles = profiles[np.searchsorted(profiles["month"], low):np.searchsorted(profiles["month"], high)]
+        cells = np.array(cells)
+        profiles = np.array(profiles)
+        rollup.count = int(profiles["count"].sum())
+        if rollup.count == 0:
+            return rollup
+
+        types = cells["type"].astype(np.int64)
+        sums = cells["sum"]
+        rollup.amount_count = int(profiles["amount_count"].sum())
+        rollup.amount_total = float(sums.sum())
+        if rollup.amount_count:
+            amount_max = np.nanmax(profiles["amount_max"])
+            rollup.amount_max = int(amount_max) if self.integer else float(amount_max)
+        else:
+            rollup.amount_max = np.nan
+        rollup.type_sum = np.bincount(types, sums, minlength=TYPE_COUNT)
+        rollup.hour_sum = profiles["hour_sum"].sum(axis=0)
+        rollup.hour_count = profiles["hour_count"].sum(axis=0)
+        rollup.weekday_sum = profiles["weekday_sum"].sum(axis=0)
+        rollup.weekday_count = profiles["weekday_count"].sum(axis=0)
+        last_ns = int(profiles["last_ns"].max())
+        if last_ns != NAT:
+            rollup.last_ns = last_ns
+            rollup.last_iso = np.datetime64(rollup.last_ns, "ns").astype("datetime64[us]").item().isoformat()
+
+        timed = cells["month"] != NO_MONTH
+        if timed.any():
+            months = cells["month"][timed].astype(np.int64)
+            rollup.month_base = int(months.min())
+            offsets = months - rollup.month_base
+            span = int(offsets.max()) + 1
+            rollup.month_sum = np.bincount(types[timed] * span + offsets, sums[timed],
+                                           minlength=TYPE_COUNT * span).reshape(TYPE_COUNT, span)
+            rollup.month_count = np.rint(
+                np.bincount(offsets, cells["count"][timed], minlength=span)
+            ).astype(np.int64)
+
+        categorized = cells["category"] >= 0
+        if categorized.any():
+            codes, local = np.unique(cells["category"][categorized], return_inverse=True)
+            size = len(codes)
+            keys = types[categorized] * size + local
+            rollup.categories = [self.categories[code] for code in codes.tolist()]
+            rollup.category_sum = np.bincount(keys, sums[categorized],
+                                              minlength=TYPE_COUNT * size).reshape(TYPE_COUNT, size)
+            rollup.category_count = np.rint(
+                np.bincount(keys, cells["count"][categorized], minlength=TYPE_COUNT * size)
+            ).astype(np.int64).reshape(TYPE_COUNT, size)
+        return rollup
+
+    def stats(self) -> Dict[str, Any]:
+        return {"path": self.path, **cube_stats(self.index)}
+
+_open_cubes: Dict[str, Any] = {}
+_open_lock = threading.Lock()
+
+def open_cube(path: str) -> TokenCube:
+    """
+    Otevřená kostka z mezipaměti procesu, po obnově (změna index.json) se otevře znovu
+    """
+    key = os.path.abspath(path)
+    modified = os.stat(os.path.join(key, INDEX_FILE)).st_mtime_ns
+    with _open_lock:
+        cached = _open_cubes.get(key)
+        if cached is not None and cached[0] == modified:
+            return cached[1]
+    try:
+        cube = TokenCube(key)
+    except FileNotFoundError:
+        # Obnova mezitím přepnula generaci a smazala soubory té předchozí
+        cube = TokenCube(key)
+    with _open_lock:
+        _open_cubes[key] = (modified, cube)
+    return cube
+
+def update_cube(path: str, chunks: Iterator[Any], rebuild: bool = False) -> Dict[str, Any]:
+    """
+    Stavba (rebuild nebo neexistující kostka) nebo obnova kostky po dnech
+
+    Obnovu chrání zámek souboru, souběžné obnovy z více procesů se tak
+    nepřepíší. Při chybě zůstane kostka beze změny.
+    """
+    import fcntl
+
+    os.makedirs(path, exist_ok=True)
+    with open(os.path.join(path, LOCK_FILE), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        exists = os.path.exists(os.path.join(path, INDEX_FILE))
+        if exists and not rebuild:
+            builder = CubeBuilder.from_cube(TokenCube(path))
+        else:
+            builder = CubeBuilder()
+            if exists:
+                with open(os.path.join(path, INDEX_FILE), encoding="utf-8") as f:
+                    builder.generation = json.load(f).get("generation", 0)
+        for chunk in chunks:
+            builder.add(chunk)
+        return {**builder.write(path), "addedRows": builder.added_rows, "rebuilt": rebuild or not exists}
+
+def transaction_chunks(transactions: List[Dict[str, Any]]) -> Iterator[Any]:
+    """Transakce ve tvaru JSON (s userId) jako jeden blok pro update_cube"""
+    import pandas as pd
+    from azr_token_kernel import TRANSACTION_COLUMNS
+
+    if transactions:
+        yield pd.DataFrame(transactions, columns=TRANSACTION_COLUMNS + ["userId"])
+
+def main():
+    """
+    Stavba, obnova a výpis kostky z příkazové řádky
+    """
+    import argparse
+
+    from azr_reducer import DEFAULT_CHUNK_ROWS, EXPORT_FORMATS, EXPORT_SHAPES, export_chunks
+
+    parser = argparse.ArgumentParser(description='AZR cube - předpočítaná kostka součtů tokenů')
+    parser.add_argument('command', choices=["build", "refresh", "stats"], help='Akce s kostkou')
+    parser.add_argument('cube', help='Adresář kostky')
+    parser.add_argument('export', nargs='?', default=None, help='Export transakcí (build, refresh)')
+    parser.add_argument('--format', choices=EXPORT_FORMATS, default=None,
+                        help='Formát exportu (default: podle přípony, jinak jsonl)')
+    parser.add_argument('--shape', choices=list(EXPORT_SHAPES), default="bridge",
+                        help='Tvar záznamů: bridge (token_analysis) nebo sql (token_transactions)')
+    parser.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS,
+                        help=f'Počet řádků v bloku (default: {DEFAULT_CHUNK_ROWS})')
+    args = parser.parse_args()
+
+    if args.command == "stats":
+        print(json.dumps(TokenCube(args.cube).stats(), ensure_ascii=False))
+        return
+    if args.export is None:
+        parser.error("build a refresh vyžadují soubor s exportem")
+
+    chunks = (chunk for chunk, _ in export_chunks(args.export, args.format, args.shape,
+                                                  args.chunk_rows, with_users=True))
+    stats = update_cube(args.cube, chunks, rebuild=args.command == "build")
+    print(json.dumps(stats, ensure_ascii=False))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,529 @@
+#!/usr/bin/env python3
+"""
+AZR Datagen - deterministický generátor syntetických dat SportMatch
+
+Generuje uživatele, transakce tokenů, rezervace, sportoviště, turnaje
+a zápasy ve tvaru, který přijímají procesory AZR bridge a který definuje
+final_supabase_script.sql (transakce ve tvaru "bridge" i "sql"). Sportoviště
+mají stejnou strukturu jako slovníky z FacilityScraper.
+
+Data mají realistické rozložení: několik velmi aktivních uživatelů
+(Zipfovo rozdělení), večerní špičku a vyšší zátěž o víkendech. Vše se
+generuje po blocích a zapisuje průběžně (JSONL, u transakcí i sloupcově
+do souboru kompatibilního s data.columnar), takže i desítky milionů řádků
+nevyžadují víc paměti než jeden blok. Stejné semínko a velikost bloku
+dávají vždy stejná data.
+
+Použití:
+    python azr_datagen.py transactions --count 10000000 --users 100000 --output tx.jsonl
+    python azr_datagen.py transactions --count 10000000 --format columnar --output tx.bin
+    python azr_datagen.py facilities --count 500 --output -
+"""
+
+import datetime
+import json
+import os
+import random
+import sys
+import uuid
+from typing import Dict, Any, Iterator, List, Optional
+
+# Počet řádků generovaných najednou
+CHUNK_SIZE = 100000
+
+# Jmenný prostor pro deterministická UUID
+UUID_NAMESPACE = uuid.UUID("6f1c8f8e-2d6a-4f43-9a55-3b1d0c9e7a21")
+
+# Kategorie transakcí (stejné jako v token_analysis), jejich četnost
+# a podíl připsaných (earned) transakcí v kategorii
+CATEGORIES = ["sports", "challenges", "rewards", "reservations", "events", "transfers", "purchases"]
+CATEGORY_WEIGHTS = [0.22, 0.10, 0.14, 0.30, 0.08, 0.06, 0.10]
+CATEGORY_EARNED_SHARE = [0.85, 0.95, 1.0, 0.05, 0.40, 0.50, 0.90]
+
+# Kódy typu transakce ve sloupcovém výstupu
+TYPE_CODES = ["earned", "spent"]
+
+# Relativní zátěž hodin dne: ranní vrchol, večerní špička 17-20 h
+HOUR_WEIGHTS = [
+    0.1, 0.05, 0.02, 0.02, 0.02, 0.1, 0.6, 1.0, 0.9, 0.6, 0.6, 0.7,
+    0.9, 0.8, 0.7, 0.8, 1.2, 2.0, 2.6, 2.6, 2.2, 1.4, 0.7, 0.3
+]
+
+# Relativní zátěž dnů v týdnu (pondělí-neděle)
+WEEKDAY_WEIGHTS = [0.9, 0.9, 1.0, 1.0, 1.1, 1.6, 1.5]
+
+# Kódy sportů shodné se SPORT_MAPPINGS ve scrape_facilities.py
+SPORT_CODES = ["TEN", "BAD", "SQU", "PAD", "TTP", "VOL", "FOO", "BAS", "SWI", "ICE", "GOL", "FIT", "ATH", "BVO", "BOW"]
+
+CITIES = [
+    ("Praha", "110 00", 0.30), ("Brno", "602 00", 0.14), ("Ostrava", "702 00", 0.09),
+    ("Plzeň", "301 00", 0.07), ("Liberec", "460 01", 0.05), ("Olomouc", "779 00", 0.05),
+    ("České Budějovice", "370 01", 0.04), ("Hradec Králové", "500 02", 0.04),
+    ("Pardubice", "530 02", 0.04), ("Zlín", "760 01", 0.03), ("Jihlava", "586 01", 0.03),
+    ("Karlovy Vary", "360 01", 0.03), ("Ústí nad Labem", "400 01", 0.04), ("Kladno", "272 01", 0.05)
+]
+AMENITIES = ["showers", "equipment_rental", "restaurant", "parking", "locker_room", "sauna", "wifi"]
+FIRST_NAMES = ["Jan", "Petr", "Lucie", "Tereza", "Martin", "Eva", "Tomáš", "Jana", "Jakub", "Kateřina", "David", "Anna"]
+LAST_NAMES = ["Novák", "Svoboda", "Dvořák", "Černý", "Procházka", "Kučera", "Veselý", "Horák", "Němec", "Marek"]
+STREETS = ["Sportovní", "Nádražní", "Školní", "Husova", "Zahradní", "Palackého", "Masarykova", "Tyršova"]
+
+RESERVATION_TYPES = ["facility", "trainer", "tournament"]
+RESERVATION_TYPE_WEIGHTS = [0.75, 0.18, 0.07]
+TOURNAMENT_STATUSES = ["created", "registration_open", "registration_closed", "in_progress", "completed", "cancelled"]
+TOURNAMENT_FORMATS = ["knockout", "groups", "round_robin", "swiss", "league", "custom"]
+ENTITIES = ["users", "transactions", "reservations", "facilities", "tournaments", "matches"]
+
+DEFAULT_START = "2024-01-01"
+
+def entity_id(seed: int, entity: str, index: int) -> str:
+    """
+    Deterministické UUID entity podle semínka a pořadí
+    """
+    return str(uuid.uuid5(UUID_NAMESPACE, f"{seed}:{entity}:{index}"))
+
+def _normalized(weights: List[float]):
+    import numpy as np
+
+    values = np.asarray(weights, dtype=np.float64)
+    return values / values.sum()
+
+def zipf_weights(count: int, exponent: float, seed: int):
+    """
+    Pravděpodobnosti výběru entit podle Zipfova rozdělení
+
+    Pořadí aktivity je náhodně promíchané, nejaktivnější tedy není vždy
+    entita s indexem 0.
+    """
+    import numpy as np
+
+    ranks = np.arange(1, count + 1, dtype=np.float64)
+    weights = 1.0 / ranks ** exponent
+    np.random.default_rng([seed, 0x5A]).shuffle(weights)
+    return weights / weights.sum()
+
+def _start_datetime(start: str) -> datetime.datetime:
+    return datetime.datetime.strptime(start, "%Y-%m-%d")
+
+def _day_weights(start: str, days: int):
+    first_weekday = _start_datetime(start).weekday()
+    return _normalized([WEEKDAY_WEIGHTS[(first_weekday + day) % 7] for day in range(days)])
+
+def _timestamps_ms(rng, size: int, start: str, days: int, day_weights):
+    """
+    Časy událostí v ms od epochy (UTC) s víkendovou zátěží a večerní špičkou
+    """
+    import numpy as np
+
+    start_ms = int(_start_datetime(start).replace(tzinfo=datetime.timezone.utc).timestamp() * 1000)
+    day = rng.choice(days, size=size, p=day_weights)
+    hour = rng.choice(24, size=size, p=_normalized(HOUR_WEIGHTS))
+    seconds = rng.integers(0, 3600, size=size)
+    return start_ms + (day.astype(np.int64) * 86400 + hour * 3600 + seconds) * 1000
+
+def _iso(timestamps_ms) -> List[str]:
+    """Převod ms od epochy na ISO 8601 bez časové zóny (UTC)"""
+    return timestamps_ms.astype("datetime64[ms]").astype("datetime64[s]").astype(str).tolist()
+
+def transaction_chunks(count: int, users: int = 10000, seed: int = 42, start: str = DEFAULT_START,
+                       days: int = 365, zipf: float = 1.1, chunk_size: int = CHUNK_SIZE) -> Iterator[Dict[str, Any]]:
+    """
+    Transakce tokenů po blocích jako sloupce numpy
+
+    Sloupce: timestamp (ms, int64), amount (celé tokeny, int32), type (kód do TYPE_CODES,
+    uint8), category (kód do CATEGORIES, int16) a user (index uživatele, int32).
+    """
+    import numpy as np
+
+    user_weights = zipf_weights(users, zipf, seed)
+    day_weights = _day_weights(start, days)
+    category_weights = _normalized(CATEGORY_WEIGHTS)
+    earned_share = np.asarray(CATEGORY_EARNED_SHARE)
+
+    for index, offset in enumerate(range(0, count, chunk_size)):
+        size = min(chunk_size, count - offset)
+        rng = np.random.default_rng([seed, 1, index])
+        category = rng.choice(len(CATEGORIES), size=size, p=category_weights)
+        spent = rng.random(size) >= earned_share[category]
+        # Připsané tokeny jsou menší částky, platby za rezervace větší
+        amount = np.where(spent, rng.lognormal(3.3, 0.7, size), rng.lognormal(2.8, 0.6, size))
+        yield {
+            "timestamp": _timestamps_ms(rng, size, start, days, day_weights),
+            "amount": np.clip(np.rint(amount), 1, 1000).astype(np.int32),
+            "type": spent.astype(np.uint8),
+            "category": category.astype(np.int16),
+            "user": rng.choice(users, size=size, p=user_weights).astype(np.int32)
+        }
+
+def transaction_records(chunk: Dict[str, Any], seed: int, shape: str = "bridge",
+                        user_ids: Optional[List[str]] = None, offset: int = 0) -> List[Dict[str, Any]]:
+    """
+    Převod bloku transakcí na záznamy
+
+    Tvar "bridge" odpovídá transakcím pro token_analysis, tvar "sql" tabulce
+    token_transactions (peněženky mají UUID odvozené od uživatele).
+    """
+    dates = _iso(chunk["timestamp"])
+    amounts = chunk["amount"].tolist()
+    spent = chunk["type"].tolist()
+    categories = chunk["category"].tolist()
+    users = chunk["user"].tolist()
+    user_ids = user_ids or [entity_id(seed, "user", index) for index in range(max(users) + 1)]
+
+    if shape == "bridge":
+        return [
+            {"userId": user_ids[user], "amount": amount, "type": TYPE_CODES[kind],
+             "transactionDate": date, "category": CATEGORIES[category]}
+            for user, amount, kind, date, category in zip(users, amounts, spent, dates, categories)
+        ]
+
+    records = []
+    for position, (user, amount, kind, date, category) in enumerate(zip(users, amounts, spent, dates, categories)):
+        wallet = entity_id(seed, "wallet", user)
+        name = CATEGORIES[category]
+        if kind:
+            sql_type, from_wallet, to_wallet = "payment", wallet, None
+        elif name == "purchases":
+            sql_type, from_wallet, to_wallet = "purchase", None, wallet
+        elif name == "transfers":
+            sql_type, from_wallet, to_wallet = "donation", entity_id(seed, "wallet", (user + 1) % len(user_ids)), wallet
+        else:
+            sql_type, from_wallet, to_wallet = "reward", None, wallet
+        records.append({
+            "id": entity_id(seed, "transaction", offset + position),
+            "from_wallet_id": from_wallet,
+            "to_wallet_id": to_wallet,
+            "amount": amount,
+            "type": sql_type,
+            "description": name,
+            "tournament_id": (offset + position) % 500 + 1 if name == "events" else None,
+            "match_id": None,
+            "created_at": date
+        })
+    return records
+
+def reservation_chunks(count: int, users: int = 10000, facilities: int = 500, seed: int = 42,
+                       start: str = DEFAULT_START, days: int = 365, zipf: float = 1.1,
+                       chunk_size: int = CHUNK_SIZE) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Rezervace po blocích ve tvaru pro reservation_analysis a user_reservation_analysis
+    """
+    import numpy as np
+
+    user_weights = zipf_weights(users, zipf, seed)
+    facility_weights = zipf_weights(facilities, 0.8, seed + 1)
+    day_weights = _day_weights(start, days)
+    user_ids = [entity_id(seed, "user", index) for index in range(users)]
+    day_names = ["pondělí", "úterý", "středa", "čtvrtek", "pátek", "sobota", "neděle"]
+
+    for index, offset in enumerate(range(0, count, chunk_size)):
+        size = min(chunk_size, count - offset)
+        rng = np.random.default_rng([seed, 2, index])
+        timestamps = _timestamps_ms(rng, size, start, days, day_weights)
+        moments = timestamps.astype("datetime64[ms]")
+        dates = moments.astype("datetime64[D]")
+        hours = ((moments - dates).astype("timedelta64[h]").astype(int)).tolist()
+        weekdays = ((dates.astype(np.int64) + 3) % 7).tolist()
+        kinds = rng.choice(len(RESERVATION_TYPES), size=size, p=_normalized(RESERVATION_TYPE_WEIGHTS)).tolist()
+        user = rng.choice(users, size=size, p=user_weights).tolist()
+        facility = rng.choice(facilities, size=size, p=facility_weights).tolist()
+        price = (rng.integers(2, 9, size=size) * 50).tolist()
+        token_price = rng.integers(1, 11, size=size).tolist()
+        cancelled = (rng.random(size) < 0.08).tolist()
+        date_strings = dates.astype(str).tolist()
+
+        yield [
+            {
+                "id": offset + position + 1,
+                "userId": user_ids[user[position]],
+                "facilityId": entity_id(seed, "facility", facility[position]),
+                "type": RESERVATION_TYPES[kinds[position]],
+                "date": date_strings[position],
+                "day": day_names[weekdays[position]],
+                "startTime": f"{hours[position]}:00",
+                "price": price[position],
+                "tokenPrice": token_price[position],
+                "status": "cancelled" if cancelled[position] else "confirmed"
+            }
+            for position in range(size)
+        ]
+
+def generate_users(count: int, seed: int = 42, start: str = DEFAULT_START) -> Iterator[Dict[str, Any]]:
+    """
+    Uživatelé ve tvaru tabulky users
+    """
+    rng = random.Random(f"{seed}:users")
+    base = _start_datetime(start) - datetime.timedelta(days=730)
+    for index in range(count):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        created = (base + datetime.timedelta(seconds=rng.randint(0, 730 * 86400))).isoformat()
+        yield {
+            "id": entity_id(seed, "user", index),
+            "email": f"{first.lower()}.{last.lower()}.{index}@example.cz",
+            "name": f"{first} {last}",
+            "avatar": None,
+            "preferred_language": rng.choices(["cs", "en", "de"], weights=[0.7, 0.25, 0.05])[0],
+            "is_organizer": rng.random() < 0.05,
+            "created_at": created,
+            "updated_at": created
+        }
+
+def generate_facilities(count: int, seed: int = 42) -> Iterator[Dict[str, Any]]:
+    """
+    Sportoviště ve stejném tvaru jako slovníky z FacilityScraper
+    """
+    rng = random.Random(f"{seed}:facilities")
+    cities = [city for city in CITIES]
+    for index in range(count):
+        city, postal_code, _ = rng.choices(cities, weights=[weight for _, _, weight in cities])[0]
+        sports = rng.sample(SPORT_CODES, rng.randint(1, 4))
+        amenities = sorted(rng.sample(AMENITIES, rng.randint(0, 4)))
+        is_indoor = rng.random() < 0.6
+        yield {
+            "name": f"Sportcentrum {rng.choice(LAST_NAMES)} {index + 1}",
+            "description": f"Sportoviště v lokalitě {city} nabízí {len(sports)} sportů.",
+            "address": f"{rng.choice(STREETS)} {rng.randint(1, 200)}",
+            "city": city,
+            "postalCode": postal_code,
+            "country": "Czech Republic",
+            "phone": f"+420 {rng.randint(600, 799)} {rng.randint(100, 999)} {rng.randint(100, 999)}",
+            "email": f"info{index + 1}@sportoviste.example.cz",
+            "website": f"https://sportoviste{index + 1}.example.cz",
+            "sports": sports,
+            "amenities": amenities,
+            "properties": {"courts": rng.randint(1, 8), "capacity": rng.randint(10, 300)},
+            "isIndoor": is_indoor,
+            "isOutdoor": not is_indoor or rng.random() < 0.2,
+            "hasParking": "parking" in amenities,
+            "hasShowers": "showers" in amenities,
+            "hasEquipmentRental": "equipment_rental" in amenities,
+            "hasRestaurant": "restaurant" in amenities,
+            "images": [],
+            "source": "Synthetic",
+            "sourceUrl": f"https://sportoviste{index + 1}.example.cz",
+            "id": entity_id(seed, "facility", index)
+        }
+
+def generate_tournaments(count: int, seed: int = 42, start: str = DEFAULT_START,
+                         days: int = 365) -> Iterator[Dict[str, Any]]:
+    """
+    Turnaje ve tvaru tabulky tournaments
+    """
+    rng = random.Random(f"{seed}:tournaments")
+    base = _start_datetime(start)
+    for index in range(count):
+        start_date = base + datetime.timedelta(days=rng.randrange(days), hours=rng.choice([9, 10, 14, 17]))
+        price = rng.choice([0, 100, 200, 300, 500])
+        allow_tokens = rng.random() < 0.6
+        yield {
+            "id": index + 1,
+            "sport_id": rng.choice(SPORT_CODES),
+            "organizer_id": entity_id(seed, "organizer", rng.randrange(max(1, count // 10))),
+            "venue_id": None,
+            "status": rng.choice(TOURNAMENT_STATUSES),
+            "format": rng.choices(TOURNAMENT_FORMATS, weights=[0.5, 0.15, 0.15, 0.05, 0.1, 0.05])[0],
+            "capacity": rng.choice([8, 16, 32, 64]),
+            "start_date": start_date.isoformat(),
+            "end_date": (start_date + datetime.timedelta(days=rng.randint(0, 2), hours=8)).isoformat(),
+            "registration_start_date": (start_date - datetime.timedelta(days=30)).isoformat(),
+            "registration_end_date": (start_date - datetime.timedelta(days=2)).isoformat(),
+            "price": price,
+            "allow_tokens": allow_tokens,
+            "token_price": price // 50 if allow_tokens else 0,
+            "custom_rules": None,
+            "banner_image": None,
+            "created_at": (start_date - datetime.timedelta(days=45)).isoformat(),
+            "updated_at": (start_date - datetime.timedelta(days=45)).isoformat()
+        }
+
+def generate_matches(count: int, users: int = 10000, tournaments: int = 500, seed: int = 42,
+                     start: str = DEFAULT_START, days: int = 365, zipf: float = 1.1) -> Iterator[Dict[str, Any]]:
+    """
+    Zápasy ve tvaru tabulky matches, aktivnější hráči hrají častěji
+    """
+    import numpy as np
+
+    weights = zipf_weights(users, zipf, seed)
+    cumulative = np.cumsum(weights)
+    rng = random.Random(f"{seed}:matches")
+    base = _start_datetime(start)
+
+    def pick_player() -> int:
+        return min(int(np.searchsorted(cumulative, rng.random(), side="right")), users - 1)
+
+    for index in range(count):
+        player1 = pick_player()
+        player2 = pick_player()
+        if player2 == player1:
+            player2 = (player1 + 1) % users
+        completed = rng.random() < 0.7
+        sets = [(6, rng.randint(0, 4)) if rng.random() < 0.5 else (rng.randint(0, 4), 6) for _ in range(rng.choice([2, 3]))]
+        first_wins = sum(1 for a, b in sets if a > b) * 2 > len(sets)
+        scheduled = base + datetime.timedelta(days=rng.randrange(days), hours=rng.choice(range(8, 21)))
+        yield {
+            "id": entity_id(seed, "match", index),
+            "tournament_id": rng.randint(1, tournaments),
+            "phase_id": None,
+            "round_number": rng.randint(1, 6),
+            "match_number": index % 32 + 1,
+            "next_match_id": None,
+            "player1_id": entity_id(seed, "user", player1),
+            "player2_id": entity_id(seed, "user", player2),
+            "winner": entity_id(seed, "user", player1 if first_wins else player2) if completed else None,
+            "completed": completed,
+            "scheduled_time": scheduled.isoformat(),
+            "result": {"sets": [f"{a}:{b}" for a, b in sets]} if completed else None,
+            "created_at": (scheduled - datetime.timedelta(days=7)).isoformat(),
+            "updated_at": scheduled.isoformat()
+        }
+
+def record_chunks(entity: str, count: int, seed: int = 42, users: int = 10000, facilities: int = 500,
+                  tournaments: int = 500, start: str = DEFAULT_START, days: int = 365, zipf: float = 1.1,
+                  shape: str = "bridge", chunk_size: int = CHUNK_SIZE) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Záznamy libovolné entity po blocích
+    """
+    if entity == "transactions":
+        user_ids = [entity_id(seed, "user", index) for index in range(users)]
+        offset = 0
+        for chunk in transaction_chunks(count, users, seed, start, days, zipf, chunk_size):
+            records = transaction_records(chunk, seed, shape, user_ids, offset)
+            offset += len(records)
+            yield records
+        return
+    if entity == "reservations":
+        yield from reservation_chunks(count, users, facilities, seed, start, days, zipf, chunk_size)
+        return
+
+    generators = {
+        "users": lambda: generate_users(count, seed, start),
+        "facilities": lambda: generate_facilities(count, seed),
+        "tournaments": lambda: generate_tournaments(count, seed, start, days),
+        "matches": lambda: generate_matches(count, users, tournaments, seed, start, days, zipf)
+    }
+    if entity not in generators:
+        raise ValueError(f"Neznámá entita: {entity} (dostupné: {', '.join(ENTITIES)})")
+
+    chunk = []
+    for record in generators[entity]():
+        chunk.append(record)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def write_jsonl(chunks: Iterator[List[Dict[str, Any]]], stream) -> int:
+    """
+    Průběžný zápis bloků záznamů jako JSONL do binárního proudu
+    """
+    from azr_codec import get_codec
+
+    codec = get_codec("auto")
+    written = 0
+    for chunk in chunks:
+        stream.write(b"\n".join(codec.encode(record) for record in chunk) + b"\n")
+        written += len(chunk)
+    return written
+
+def write_columnar_transactions(path: str, count: int, seed: int = 42, users: int = 10000,
+                                start: str = DEFAULT_START, days: int = 365, zipf: float = 1.1,
+                                chunk_size: int = CHUNK_SIZE) -> Dict[str, Any]:
+    """
+    Průběžný zápis transakcí do sloupcového souboru
+
+    Soubor obsahuje sloupce za sebou, vedle něj se uloží popisovač
+    (<soubor>.json), který lze přímo předat jako data.columnar do
+    token_analysis. Vrací popisovač.
+    """
+    import numpy as np
+
+    dtypes = {"timestamp": "int64", "amount": "int32", "type": "uint8", "category": "int16", "user": "int32"}
+    columns = {}
+    size = 0
+    for name, dtype in dtypes.items():
+        size += -size % 8
+        columns[name] = {"offset": size, "dtype": dtype}
+        size += count * np.dtype(dtype).itemsize
+
+    with open(path, "wb") as f:
+        f.truncate(size)
+
+    if count > 0:
+        mapped = {
+            name: np.memmap(path, dtype=np.dtype(dtype).newbyteorder("<"), mode="r+",
+                            offset=columns[name]["offset"], shape=(count,))
+            for name, dtype in dtypes.items()
+        }
+        position = 0
+        for chunk in transaction_chunks(count, users, seed, start, days, zipf, chunk_size):
+            length = len(chunk["timestamp"])
+            for name, column in mapped.items():
+                column[position:position + length] = chunk[name]
+            position += length
+        for column in mapped.values():
+            column.flush()
+        del mapped
+
+    descriptor = {
+        "path": os.path.abspath(path),
+        "length": count,
+        "columns": columns,
+        "typeCodes": TYPE_CODES,
+        "categoryCodes": CATEGORIES,
+        "userIds": {"seed": seed, "count": users}
+    }
+    with open(f"{path}.json", "w", encoding="utf-8") as f:
+        json.dump(descriptor, f, indent=2)
+        f.write("\n")
+    return descriptor
+
+def main():
+    """
+    Hlavní funkce generátoru
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Generátor syntetických dat SportMatch')
+    parser.add_argument('entity', choices=ENTITIES, help='Generovaná entita')
+    parser.add_argument('--count', type=int, default=1000, help='Počet záznamů (default: 1000)')
+    parser.add_argument('--seed', type=int, default=42, help='Semínko generátoru (default: 42)')
+    parser.add_argument('--users', type=int, default=10000, help='Počet uživatelů (default: 10000)')
+    parser.add_argument('--facilities', type=int, default=500, help='Počet sportovišť (default: 500)')
+    parser.add_argument('--tournaments', type=int, default=500, help='Počet turnajů (default: 500)')
+    parser.add_argument('--start', type=str, default=DEFAULT_START, help=f'Počáteční datum (default: {DEFAULT_START})')
+    parser.add_argument('--days', type=int, default=365, help='Délka období ve dnech (default: 365)')
+    parser.add_argument('--zipf', type=float, default=1.1,
+                        help='Exponent Zipfova rozdělení aktivity uživatelů (default: 1.1)')
+    parser.add_argument('--shape', choices=["bridge", "sql"], default="bridge",
+                        help='Tvar transakcí: bridge (token_analysis) nebo sql (token_transactions)')
+    parser.add_argument('--format', choices=["jsonl", "columnar"], default="jsonl",
+                        help='Výstupní formát, columnar jen pro transakce (default: jsonl)')
+    parser.add_argument('--output', type=str, default="-", help='Výstupní soubor, "-" pro stdout (default: -)')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE,
+                        help=f'Počet řádků v bloku (default: {CHUNK_SIZE})')
+    args = parser.parse_args()
+
+    if args.format == "columnar":
+        if args.entity != "transactions":
+            parser.error("Sloupcový výstup je k dispozici jen pro transakce")
+        if args.output == "-":
+            parser.error("Sloupcový výstup vyžaduje --output se souborem")
+        descriptor = write_columnar_transactions(
+            args.output, args.count, args.seed, args.users, args.start, args.days, args.zipf, args.chunk_size
+        )
+        print(f"Zapsáno {args.count} transakcí do {descriptor['path']} (popisovač {args.output}.json)", file=sys.stderr)
+        return
+
+    chunks = record_chunks(
+        args.entity, args.count, args.seed, args.users, args.facilities, args.tournaments,
+        args.start, args.days, args.zipf, args.shape, args.chunk_size
+    )
+    if args.output == "-":
+        written = write_jsonl(chunks, sys.stdout.buffer)
+    else:
+        with open(args.output, "wb") as f:
+            written = write_jsonl(chunks, f)
+    print(f"Zapsáno {written} záznamů ({args.entity})", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
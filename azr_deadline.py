@@ -0,0 +1,133 @@
+"""
+AZR Deadline - časové limity dotazů a kooperativní přerušení
+
+Dotaz s options.deadlineMs musí být zpracován do daného počtu milisekund.
+Procesor si limit ověřuje na hranicích bloků práce voláním check_deadline;
+po jeho překročení vyvolá DeadlineExceeded a dotaz skončí odpovědí
+s příznakem "deadlineExceeded" a časy dosažených kontrolních bodů.
+
+DeadlineExceeded dědí z BaseException (stejně jako asyncio.CancelledError),
+aby ho nezachytily obecné bloky `except Exception` uvnitř procesorů.
+"""
+
+import contextlib
+import contextvars
+import time
+from typing import Dict, Any, Iterator, List, Optional
+
+# Chybová zpráva odpovědi po překročení limitu
+DEADLINE_ERROR = "Překročen časový limit dotazu (deadline exceeded)"
+
+# Jak často (v položkách) procesory ve smyčkách ověřují limit
+DEADLINE_CHECK_INTERVAL = 10000
+
+class DeadlineExceeded(BaseException):
+    """
+    Výjimka ukončující zpracování dotazu po překročení limitu
+    """
+    def __init__(self, timing: Dict[str, Any]):
+        super().__init__(DEADLINE_ERROR)
+        self.timing = timing
+
+class Deadline:
+    """
+    Časový limit jednoho dotazu a záznam dosažených kontrolních bodů
+    """
+    def __init__(self, deadline_ms: float, started: Optional[float] = None):
+        self.deadline_ms = float(deadline_ms)
+        self.started = started if started is not None else time.perf_counter()
+        self.checkpoints: List[Dict[str, Any]] = []
+        self.stages: Dict[str, Dict[str, Any]] = {}
+
+    @staticmethod
+    def ms_from_options(options: Any) -> Optional[float]:
+        """
+        Limit z options.deadlineMs, None pokud není zadán nebo je neplatný
+        """
+        if not isinstance(options, dict):
+            return None
+        value = options.get("deadlineMs")
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or value <= 0:
+            return None
+        return float(value)
+
+    @classmethod
+    def from_options(cls, options: Any) -> Optional["Deadline"]:
+        deadline_ms = cls.ms_from_options(options)
+        return cls(deadline_ms) if deadline_ms is not None else None
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000
+
+    def remaining_ms(self) -> float:
+        return self.deadline_ms - self.elapsed_ms()
+
+    def expired(self) -> bool:
+        return self.remaining_ms() <= 0
+
+    def check(self, stage: str) -> None:
+        """
+        Kontrolní bod: zaznamená čas a po překročení limitu vyvolá DeadlineExceeded
+
+        Opakovaně dosažený bod (smyčky, procesory volané pro každou položku)
+        si ponechá své místo v pořadí a aktualizuje jen čas.
+        """
+        elapsed = self.elapsed_ms()
+        checkpoint = self.stages.get(stage)
+        if checkpoint is not None:
+            checkpoint["elapsedMs"] = round(elapsed, 3)
+        else:
+            checkpoint = {"stage": stage, "elapsedMs": round(elapsed, 3)}
+            self.stages[stage] = checkpoint
+            self.checkpoints.append(checkpoint)
+        if elapsed >= self.deadline_ms:
+            raise DeadlineExceeded(self.timing(stage))
+
+    def timing(self, stage: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Časové údaje pro odpověď
+        """
+        return {
+            "deadlineMs": self.deadline_ms,
+            "elapsedMs": round(self.elapsed_ms(), 3),
+            "stage": stage,
+            "checkpoints": [dict(checkpoint) for checkpoint in self.checkpoints]
+        }
+
+_current_deadline: contextvars.ContextVar = contextvars.ContextVar("azr_deadline", default=None)
+
+@contextlib.contextmanager
+def active_deadline(deadline: Optional[Deadline]) -> Iterator[Optional[Deadline]]:
+    """
+    Nastavení limitu pro procesory volané v tomto bloku
+    """
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+
+def current_deadline() -> Optional[Deadline]:
+    """
+    Aktuálně platný limit, None bez aktivního limitu
+    """
+    return _current_deadline.get()
+
+def check_deadline(stage: str) -> None:
+    """
+    Kontrolní bod pro procesory, bez aktivního limitu nedělá nic
+    """
+    deadline = _current_deadline.get()
+    if deadline is not None:
+        deadline.check(stage)
+
+def deadline_response(timing: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Odpověď pro dotaz ukončený po překročení limitu
+    """
+    return {
+        "success": False,
+        "error": DEADLINE_ERROR,
+        "deadlineExceeded": True,
+        "timing": timing
+    }
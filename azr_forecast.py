@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""
+AZR Forecast - dávkové predikce příjmů a výdajů tokenů
+
+Měsíční řady příjmů a výdajů mnoha uživatelů se skládají do matice
+(uživatel × měsíc, zarovnané vpravo na poslední měsíc uživatele, měsíce
+před první transakcí jsou NaN, měsíce bez transakcí nula) a modely se
+fitují pro všechny uživatele najednou operacemi nad celými sloupci:
+
+    ets    Holtovo exponenciální vyrovnávání s tlumeným trendem; parametry
+           se volí pro každého uživatele z mřížky podle součtu čtverců
+           chyb předpovědi o krok dopředu
+    trend  robustní lineární trend (Theil-Sen: medián sklonů všech dvojic
+           měsíců), rozptyl z mediánové absolutní odchylky reziduí
+
+Výsledkem je odhad příštího měsíce a jeho směrodatná odchylka, z nichž se
+sestaví stejná pole predictions jako u token_analysis a intervaly
+spolehlivosti. Uživatelé s kratší historií než MIN_HISTORY měsíců
+dostanou v bridge původní odhad (model "baseline"), v nočním běhu
+"predictions": null.
+
+V bridge volbou options.forecast ("ets", "trend") u token_analysis
+a token_analysis_bulk, noční běh nad kostkou (viz azr_cube):
+    python azr_forecast.py /data/cube --method ets --output predictions.jsonl
+"""
+
+import json
+import statistics
+import sys
+import time
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+FORECAST_METHODS = ("baseline", "ets", "trend")
+
+# Výchozí hladina intervalů spolehlivosti
+DEFAULT_LEVEL = 0.95
+
+# Nejdelší historie v měsících, ze které se modely fitují
+DEFAULT_MAX_MONTHS = 24
+
+# Nejkratší historie v měsících pro fit modelu
+MIN_HISTORY = 3
+
+# Mřížka parametrů Holtova modelu (vyrovnání úrovně a trendu) a tlumení trendu
+ETS_ALPHAS = (0.1, 0.2, 0.4, 0.6, 0.8)
+ETS_BETAS = (0.0, 0.1, 0.3)
+ETS_DAMPING = 0.9
+
+# Počet uživatelů zpracovaných najednou u modelu trend (dvojice měsíců × uživatelé)
+TREND_CHUNK_USERS = 10000
+
+# Převod mediánové absolutní odchylky na směrodatnou odchylku (normální rozdělení)
+MAD_SCALE = 1.4826
+
+def forecast_method(options: Dict[str, Any]) -> str:
+    """
+    Model predikce z options.forecast (výchozí "baseline"), pro neznámý vyvolá ValueError
+    """
+    method = options.get("forecast") or "baseline"
+    if method not in FORECAST_METHODS:
+        raise ValueError(f"Neznámý model predikce: {method} (podporované: {', '.join(FORECAST_METHODS)})")
+    return method
+
+def forecast_level(options: Dict[str, Any]) -> float:
+    """
+    Hladina intervalů spolehlivosti z options.forecastLevel (0 až 1, bez krajních hodnot)
+    """
+    level = options.get("forecastLevel", DEFAULT_LEVEL)
+    if isinstance(level, bool) or not isinstance(level, (int, float)) or not 0 < level < 1:
+        raise ValueError("options.forecastLevel musí být číslo mezi 0 a 1")
+    return float(level)
+
+def series_from_rollups(rollups: List[Any], max_months: int = DEFAULT_MAX_MONTHS) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Měsíční příjmy a výdaje z agregací (TokenRollup) jako matice uživatel × měsíc
+
+    Řada každého uživatele končí jeho posledním měsícem s transakcemi
+    (stejně jako měsíční trend v odpovědi) a má nejvýše max_months měsíců.
+    """
+    from azr_token_kernel import TYPE_EARNED, TYPE_SPENT
+
+    earned = np.full((len(rollups), max_months), np.nan)
+    spent = np.full((len(rollups), max_months), np.nan)
+    for row, rollup in enumerate(rollups):
+        months = np.flatnonzero(rollup.month_count)
+        if not len(months):
+            continue
+        first = max(int(months[0]), int(months[-1]) + 1 - max_months)
+        stop = int(months[-1]) + 1
+        earned[row, max_months - (stop - first):] = rollup.month_sum[TYPE_EARNED][first:stop]
+        spent[row, max_months - (stop - first):] = rollup.month_sum[TYPE_SPENT][first:stop]
+    return earned, spent
+
+def _row_median(values: np.ndarray) -> np.ndarray:
+    """Medián každého řádku bez NaN (řádek bez hodnot dává NaN)"""
+    ordered = np.sort(values, axis=1)
+    valid = (~np.isnan(values)).sum(axis=1)
+    low = np.take_along_axis(ordered, np.maximum(valid - 1, 0)[:, None] // 2, axis=1)[:, 0]
+    high = np.take_along_axis(ordered, (valid // 2)[:, None], axis=1)[:, 0]
+    return np.where(valid > 0, (low + high) / 2, np.nan)
+
+def _fit_ets(series: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Holtův model s tlumeným trendem pro všechny řádky najednou
+
+    Každá kombinace parametrů z mřížky je další osa polí stavu, krok v čase
+    aktualizuje všechny uživatele a kombinace jednou operací. Vrací odhad
+    příštího měsíce a směrodatnou odchylku chyb předpovědi o krok dopředu.
+    """
+    users, months = series.shape
+    alphas, betas = np.meshgrid(ETS_ALPHAS, ETS_BETAS, indexing="ij")
+    alpha = alphas.reshape(-1, 1)
+    smoothing = (alphas * betas).reshape(-1, 1)
+    level = np.zeros((len(alpha), users))
+    trend = np.zeros((len(alpha), users))
+    squared = np.zeros((len(alpha), users))
+    errors = np.zeros(users)
+
+    # Řady jsou zarovnané vpravo: od prvního platného měsíce jsou platné všechny další
+    starts = np.where(np.isnan(series).all(axis=1), months, np.argmax(~np.isnan(series), axis=1))
+    for month in range(months):
+        values = series[:, month]
+        level[:, starts == month] = values[starts == month]
+        active = starts < month
+        if not active.any():
+            continue
+        predicted = level[:, active] + ETS_DAMPING * trend[:, active]
+        error = values[active] - predicted
+        squared[:, active] += error ** 2
+        level[:, active] = predicted + alpha * error
+        trend[:, active] = ETS_DAMPING * trend[:, active] + smoothing * error
+        errors[active] += 1
+
+    best = np.argmin(squared, axis=0)
+    columns = np.arange(users)
+    forecast = level[best, columns] + ETS_DAMPING * trend[best, columns]
+    sigma = np.sqrt(squared[best, columns] / np.maximum(errors, 1))
+    return forecast, sigma
+
+def _fit_trend(series: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Theil-Senův lineární trend pro všechny řádky najednou (po blocích uživatelů)
+    """
+    users, months = series.shape
+    steps = np.arange(months, dtype=np.float64)
+    first, second = np.triu_indices(months, 1)
+    forecast = np.full(users, np.nan)
+    sigma = np.full(users, np.nan)
+    for start in range(0, users, TREND_CHUNK_USERS):
+        values = series[start:start + TREND_CHUNK_USERS]
+        slope = _row_median((values[:, second] - values[:, first]) / (second - first))
+        intercept = _row_median(values - slope[:, None] * steps)
+        residuals = values - (intercept[:, None] + slope[:, None] * steps)
+        deviation = np.abs(residuals - _row_median(residuals)[:, None])
+        forecast[start:start + TREND_CHUNK_USERS] = intercept + slope * months
+        sigma[start:start + TREND_CHUNK_USERS] = MAD_SCALE * _row_median(deviation)
+    return forecast, sigma
+
+def forecast_series(earned: np.ndarray, spent: np.ndarray, method: str = "ets") -> Dict[str, np.ndarray]:
+    """
+    Odhad příjmů a výdajů příštího měsíce z matic uživatel × měsíc
+
+    Vrací pole "earned", "spent" (odhady, nejméně nula), "earnedSigma",
+    "spentSigma" (směrodatné odchylky) a "history" (počet měsíců historie).
+    U uživatelů s historií kratší než MIN_HISTORY jsou odhady NaN.
+    """
+    if method not in ("ets", "trend"):
+        raise ValueError(f"Model {method} nelze fitovat (podporované: ets, trend)")
+    fit = _fit_ets if method == "ets" else _fit_trend
+    history = (~np.isnan(earned)).sum(axis=1)
+    result = {"history": history}
+    for name, series in (("earned", earned), ("spent", spent)):
+        forecast, sigma = fit(series)
+        short = history < MIN_HISTORY
+        result[name] = np.where(short, np.nan, np.maximum(forecast, 0.0))
+        result[f"{name}Sigma"] = np.where(short, np.nan, sigma)
+    return result
+
+def forecast_rows(fitted: Dict[str, np.ndarray], method: str, level: float = DEFAULT_LEVEL) -> List[Dict[str, Any]]:
+    """
+    Výsledky forecast_series po uživatelích pro prediction_fields
+
+    Uživatelé s krátkou historií mají method "baseline" a žádné odhady.
+    """
+    rows = []
+    for history, earned, earned_sigma, spent, spent_sigma in zip(
+            fitted["history"].tolist(), fitted["earned"].tolist(), fitted["earnedSigma"].tolist(),
+            fitted["spent"].tolist(), fitted["spentSigma"].tolist()):
+        if earned != earned:
+            rows.append({"method": "baseline", "history": history})
+        else:
+            rows.append({"method": method, "history": history, "level": level, "earned": earned,
+                         "earnedSigma": earned_sigma, "spent": spent, "spentSigma": spent_sigma})
+    return rows
+
+def forecast_rollups(rollups: List[Any], method: str, level: float = DEFAULT_LEVEL,
+                     max_months: int = DEFAULT_MAX_MONTHS) -> List[Dict[str, Any]]:
+    """
+    Predikce pro agregace (TokenRollup) mnoha uživatelů najednou, viz forecast_rows
+    """
+    earned, spent = series_from_rollups(rollups, max_months)
+    return forecast_rows(forecast_series(earned, spent, method), method, level)
+
+def _interval(value: float, sigma: float, z: float, lower_bound: Optional[float] = 0.0) -> Dict[str, float]:
+    lower = value - z * sigma
+    if lower_bound is not None:
+        lower = max(lower, lower_bound)
+    return {"lower": float(lower), "upper": float(value + z * sigma)}
+
+def prediction_fields(row: Dict[str, Any], net_change: float, window_months: float = 1.0) -> Dict[str, Any]:
+    """
+    Číselná pole predictions z odhadu modelu
+
+    Odhady pro okno predikce (window_months měsíců) jsou měsíční odhady
+    vynásobené délkou okna, směrodatné odchylky se násobí odmocninou délky.
+    Intervaly jsou v "intervals" s hladinou "level".
+    """
+    z = statistics.NormalDist().inv_cdf((1 + row["level"]) / 2)
+    earned, spent = row["earned"], row["spent"]
+    scale = window_months ** 0.5
+    balance = float(net_change) + (earned - spent) * window_months
+    balance_sigma = (row["earnedSigma"] ** 2 + row["spentSigma"] ** 2) ** 0.5 * scale
+    return {
+        "estimatedNextMonthEarnings": float(earned),
+        "estimatedNextMonthSpendings": float(spent),
+        "predictedBalance": balance,
+        "savingPotential": float(spent * 0.15),
+        "model": row["method"],
+        "intervals": {
+            "level": row["level"],
+            "estimatedNextMonthEarnings": _interval(earned, row["earnedSigma"], z),
+            "estimatedNextMonthSpendings": _interval(spent, row["spentSigma"], z),
+            "predictedBalance": _interval(balance, balance_sigma, z, None)
+        }
+    }
+
+def series_from_cube(cube: Any, max_months: int = DEFAULT_MAX_MONTHS,
+                     end_month: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Měsíční příjmy a výdaje všech uživatelů kostky (azr_cube.TokenCube) jako matice
+
+    Bez end_month končí řada každého uživatele jeho posledním měsícem
+    s transakcemi, jinak společným měsícem end_month (index od ledna 1970;
+    pozdější měsíce se nezapočítají). Vrací (příjmy, výdaje, čisté změny).
+    """
+    from azr_cube import NO_MONTH
+    from azr_token_kernel import TYPE_EARNED, TYPE_SPENT
+
+    users = len(cube.users)
+    cells = cube.cells
+    cell_users = np.repeat(np.arange(users), np.diff(cube.offsets))
+    types = cells["type"].astype(np.int64)
+    sums = np.asarray(cells["sum"])
+    net = np.bincount(cell_users[types == TYPE_EARNED], sums[types == TYPE_EARNED], minlength=users) - \
+        np.bincount(cell_users[types == TYPE_SPENT], sums[types == TYPE_SPENT], minlength=users)
+
+    months = cells["month"].astype(np.int64)
+    timed = months != NO_MONTH
+    if end_month is not None:
+        timed &= months <= end_month
+    first = np.full(users, np.iinfo(np.int64).max)
+    last = np.full(users, np.iinfo(np.int64).min)
+    np.minimum.at(first, cell_users[timed], months[timed])
+    np.maximum.at(last, cell_users[timed], months[timed])
+    if end_month is not None:
+        last = np.where(first <= end_month, end_month, last)
+
+    earned = np.zeros(users * max_months)
+    spent = np.zeros(users * max_months)
+    columns = max_months - 1 - (last[cell_users] - months)
+    keep = timed & (columns >= 0)
+    for target, code in ((earned, TYPE_EARNED), (spent, TYPE_SPENT)):
+        selected = keep & (types == code)
+        target += np.bincount(cell_users[selected] * max_months + columns[selected], sums[selected],
+                              minlength=users * max_months)
+    # Měsíce před první transakcí uživatele (a uživatelé bez transakcí s časem) nejsou historie
+    length = np.where(first <= last, last - first + 1, 0)
+    before = np.arange(max_months)[None, :] < (max_months - length)[:, None]
+    earned = np.where(before, np.nan, earned.reshape(users, max_months))
+    spent = np.where(before, np.nan, spent.reshape(users, max_months))
+    return earned, spent, net
+
+def main():
+    """
+    Noční predikce pro všechny uživatele kostky, výsledky jako JSONL
+    """
+    import argparse
+
+    from azr_cube import TokenCube
+
+    parser = argparse.ArgumentParser(description='AZR forecast - dávkové predikce tokenů nad kostkou')
+    parser.add_argument('cube', help='Adresář kostky (viz azr_cube.py)')
+    parser.add_argument('--method', choices=["ets", "trend"], default="ets", help='Model predikce (default: ets)')
+    parser.add_argument('--level', type=float, default=DEFAULT_LEVEL,
+                        help=f'Hladina intervalů spolehlivosti (default: {DEFAULT_LEVEL})')
+    parser.add_argument('--max-months', type=int, default=DEFAULT_MAX_MONTHS,
+                        help=f'Nejdelší použitá historie v měsících (default: {DEFAULT_MAX_MONTHS})')
+    parser.add_argument('--end-month', default=None,
+                        help='Poslední měsíc řad (RRRR-MM, default: poslední měsíc každého uživatele)')
+    parser.add_argument('--output', default=None, help='Výstupní soubor JSONL (default: stdout)')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    cube = TokenCube(args.cube)
+    end_month = None
+    if args.end_month is not None:
+        end_month = int(np.datetime64(args.end_month, "M").view(np.int64))
+    earned, spent, net = series_from_cube(cube, args.max_months, end_month)
+    fitted = forecast_series(earned, spent, args.method)
+    rows = forecast_rows(fitted, args.method, forecast_level({"forecastLevel": args.level}))
+    fitted_at = time.perf_counter()
+
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        for user_id, row, change in zip(cube.users, rows, net.tolist()):
+            predictions = prediction_fields(row, change) if row["method"] != "baseline" else None
+            out.write(json.dumps({"userId": user_id, "history": row["history"], "predictions": predictions},
+                                 ensure_ascii=False) + "\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(f"{len(rows)} uživatelů, fit {fitted_at - started:.1f} s, celkem {time.perf_counter() - started:.1f} s",
+          file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
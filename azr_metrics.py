@@ -0,0 +1,231 @@
+"""
+AZR Metrics - metriky zpracování AZR dotazů
+
+Pro každý typ dotazu sleduje počet dotazů a chyb, zásahy mezipaměti,
+velikost vstupních a výstupních dat a histogramy latence rozdělené na
+dekódování, běh procesoru a kódování odpovědi (p50/p95/p99).
+Metriky lze získat dotazem typu "metrics" nebo je periodicky zapisovat
+do souboru v textovém formátu Prometheus.
+"""
+
+import os
+import sys
+import threading
+import time
+from typing import Dict, Any, List, Optional
+
+# Horní hranice košů histogramu latence v milisekundách
+LATENCY_BUCKETS_MS = (
+    0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000
+)
+
+# Fáze zpracování dotazu, pro které se měří latence
+STAGES = ("decode", "handler", "encode")
+
+# Maximální počet sledovaných typů dotazů, další se sčítají pod "other"
+MAX_QUERY_TYPES = 64
+
+def label_value(value: Any) -> str:
+    """
+    Hodnota labelu pro textový formát Prometheus (escapované \\, " a nový řádek)
+
+    Typ dotazu posílá klient, bez escapování by rozbil celý výstup metrik.
+    """
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+class LatencyHistogram:
+    """
+    Histogram latence s pevnými koši
+    """
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value_ms: float) -> None:
+        index = 0
+        while index < len(self.buckets) and value_ms > self.buckets[index]:
+            index += 1
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += value_ms
+        if value_ms > self.max:
+            self.max = value_ms
+
+    def quantile(self, q: float) -> float:
+        """
+        Odhad kvantilu lineární interpolací uvnitř koše
+        """
+        if self.count == 0:
+            return 0.0
+        target = q * self.count
+        cumulative = 0
+        for index, bucket_count in enumerate(self.counts):
+            if bucket_count and cumulative + bucket_count >= target:
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else self.max
+                upper = min(upper, self.max)
+                fraction = (target - cumulative) / bucket_count
+                return round(lower + (upper - lower) * fraction, 3)
+            cumulative += bucket_count
+        return round(self.max, 3)
+
+    def snapshot(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 3),
+            "max": round(self.max, 3),
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99)
+        }
+
+class QueryTypeMetrics:
+    """
+    Metriky jednoho typu dotazu
+    """
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.cache_hits = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.latency = {stage: LatencyHistogram() for stage in STAGES}
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "cacheHits": self.cache_hits,
+            "bytesIn": self.bytes_in,
+            "bytesOut": self.bytes_out,
+            "latencyMs": {stage: histogram.snapshot() for stage, histogram in self.latency.items()}
+        }
+
+class MetricsRegistry:
+    """
+    Registr metrik pro všechny typy dotazů
+    """
+    def __init__(self):
+        self.started_at = time.time()
+        self.types: Dict[str, QueryTypeMetrics] = {}
+        self.lock = threading.Lock()
+        self.exporter: Optional[threading.Thread] = None
+
+    def _metrics_for(self, query_type: Optional[str]) -> QueryTypeMetrics:
+        query_type = str(query_type or "unknown")
+        metrics = self.types.get(query_type)
+        if metrics is None:
+            if len(self.types) >= MAX_QUERY_TYPES:
+                query_type = "other"
+                metrics = self.types.get(query_type)
+            if metrics is None:
+                metrics = QueryTypeMetrics()
+                self.types[query_type] = metrics
+        return metrics
+
+    def observe_decode(self, query_type: Optional[str], duration_ms: float, size: int) -> None:
+        """Dekódování dotazu a velikost vstupu v bajtech"""
+        with self.lock:
+            metrics = self._metrics_for(query_type)
+            metrics.latency["decode"].observe(duration_ms)
+            metrics.bytes_in += size
+
+    def observe_handler(self, query_type: Optional[str], duration_ms: float, success: bool,
+                        cache_hit: bool = False) -> None:
+        """Zpracování dotazu procesorem (včetně odpovědí z mezipaměti)"""
+        with self.lock:
+            metrics = self._metrics_for(query_type)
+            metrics.requests += 1
+            if not success:
+                metrics.errors += 1
+            if cache_hit:
+                metrics.cache_hits += 1
+            metrics.latency["handler"].observe(duration_ms)
+
+    def observe_encode(self, query_type: Optional[str], duration_ms: float, size: int) -> None:
+        """Kódování odpovědi a velikost výstupu v bajtech"""
+        with self.lock:
+            metrics = self._metrics_for(query_type)
+            metrics.latency["encode"].observe(duration_ms)
+            metrics.bytes_out += size
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Aktuální stav všech metrik
+        """
+        with self.lock:
+            return {
+                "pid": os.getpid(),
+                "uptimeSeconds": round(time.time() - self.started_at, 3),
+                "types": {name: metrics.snapshot() for name, metrics in sorted(self.types.items())}
+            }
+
+    def prometheus_text(self) -> str:
+        """
+        Metriky v textovém formátu Prometheus
+        """
+        lines: List[str] = []
+        with self.lock:
+            types = [(label_value(query_type), metrics) for query_type, metrics in sorted(self.types.items())]
+
+            counters = [
+                ("azr_requests_total", "Počet zpracovaných dotazů", lambda m: m.requests),
+                ("azr_errors_total", "Počet neúspěšných dotazů", lambda m: m.errors),
+                ("azr_cache_hits_total", "Počet odpovědí z mezipaměti", lambda m: m.cache_hits),
+            ]
+            for name, help_text, getter in counters:
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} counter")
+                for query_type, metrics in types:
+                    lines.append(f'{name}{{type="{query_type}"}} {getter(metrics)}')
+
+            lines.append("# HELP azr_payload_bytes_total Velikost dat dotazů a odpovědí")
+            lines.append("# TYPE azr_payload_bytes_total counter")
+            for query_type, metrics in types:
+                lines.append(f'azr_payload_bytes_total{{type="{query_type}",direction="in"}} {metrics.bytes_in}')
+                lines.append(f'azr_payload_bytes_total{{type="{query_type}",direction="out"}} {metrics.bytes_out}')
+
+            lines.append("# HELP azr_latency_ms Latence fází zpracování dotazu v milisekundách")
+            lines.append("# TYPE azr_latency_ms histogram")
+            for query_type, metrics in types:
+                for stage, histogram in metrics.latency.items():
+                    labels = f'type="{query_type}",stage="{stage}"'
+                    cumulative = 0
+                    for bound, bucket_count in zip(histogram.buckets, histogram.counts):
+                        cumulative += bucket_count
+                        lines.append(f'azr_latency_ms_bucket{{{labels},le="{bound}"}} {cumulative}')
+                    lines.append(f'azr_latency_ms_bucket{{{labels},le="+Inf"}} {histogram.count}')
+                    lines.append(f"azr_latency_ms_sum{{{labels}}} {round(histogram.sum, 3)}")
+                    lines.append(f"azr_latency_ms_count{{{labels}}} {histogram.count}")
+
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus_file(self, path: str) -> None:
+        """
+        Atomický zápis metrik do souboru (pro node_exporter textfile collector)
+        """
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp_path, path)
+
+    def start_file_exporter(self, path: str, interval: float = 15.0) -> None:
+        """
+        Spuštění vlákna, které periodicky zapisuje metriky do souboru
+        """
+        if self.exporter is not None:
+            return
+
+        def export_loop():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.write_prometheus_file(path)
+                except OSError as e:
+                    print(f"Zápis metrik do {path} selhal: {str(e)}", file=sys.stderr)
+
+        self.exporter = threading.Thread(target=export_loop, name="azr-metrics-exporter", daemon=True)
+        self.exporter.start()
@@ -0,0 +1,364 @@
+"""
+AZR Pool - skupina předem zahřátých procesů s AZRProcessor
+
+Dotazy se řadí do omezené fronty, ze které si je berou dispečerská vlákna,
+každé obsluhující jeden pracovní proces. Při plné frontě dostane volající
+okamžitě odpověď "busy" místo neomezeného spouštění dalších procesů.
+CPU náročné procesory (token_analysis, text_vectorization) tak mohou využít
+všechna jádra a jeden pomalý dotaz neblokuje ostatní.
+
+Dotaz s options.deadlineMs dostane do procesu jen zbytek limitu po čekání
+ve frontě. Pokud proces neodpoví ani po uplynutí limitu a tolerance
+(procesor uvízl mimo kontrolní body), je ukončen a nahrazen novým.
+
+Dotazy se stavem v paměti procesoru (metriky, token_anomaly, inkrementální
+token_analysis bez sdíleného AZR_ROLLUP_PATH) by se při rozdělování mezi
+procesy rozcházely; zpracovává je proto rodičovský proces (viz runs_in_parent).
+"""
+
+import multiprocessing
+import os
+import queue
+import signal
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, Any, Callable, List, Optional
+
+from azr_deadline import Deadline, deadline_response
+
+# Výchozí maximální počet dotazů čekajících ve frontě na volný proces
+DEFAULT_QUEUE_DEPTH = 64
+
+# Tolerance po uplynutí limitu dotazu, než je pracovní proces nahrazen
+DEFAULT_DEADLINE_GRACE_MS = 500
+
+# Typy dotazů se stavem v paměti procesoru, které se do poolu neposílají
+PARENT_TYPES = {"metrics", "token_anomaly"}
+
+def busy_response(queue_depth: int) -> Dict[str, Any]:
+    """
+    Odpověď pro dotaz odmítnutý kvůli plné frontě
+    """
+    return {
+        "success": False,
+        "busy": True,
+        "error": f"AZR je přetížen, fronta dotazů je plná (max. {queue_depth})"
+    }
+
+def _worker_main(conn, preload: List[str]) -> None:
+    """
+    Hlavní smyčka pracovního procesu
+
+    Proces vytvoří vlastní AZRProcessor, zahřeje ho a potvrdí připravenost.
+    Poté zpracovává dotazy z rodičovského procesu, dokud nedostane None.
+    Dotazy přicházejí jako dvojice (dotaz, streamování); částečné výsledky
+    se posílají před odpovědí jako zprávy s "partial": true.
+    """
+    # Ukončení řídí rodičovský proces, Ctrl+C v terminálu ho nemá přerušit
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    from azr_bridge import AZRProcessor
+
+    processor = AZRProcessor()
+    warmup = processor.warm_up(preload)
+    conn.send({"ready": True, "pid": os.getpid(), **warmup})
+
+    while True:
+        try:
+            query = conn.recv()
+        except (EOFError, OSError):
+            break
+        if query is None:
+            break
+        query, streaming = query
+        conn.send(processor.process_query(query, conn.send if streaming else None))
+
+class WorkerSlot:
+    """
+    Jeden pracovní proces a spojení do něj
+    """
+    def __init__(self, context, preload: List[str]):
+        self.context = context
+        self.preload = preload
+        self.process = None
+        self.conn = None
+        self.ready_info: Dict[str, Any] = {}
+        self.restarts = 0
+
+    def spawn(self) -> None:
+        """Spuštění procesu bez čekání na jeho připravenost"""
+        parent_conn, child_conn = self.context.Pipe()
+        self.process = self.context.Process(
+            target=_worker_main, args=(child_conn, self.preload), daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self.conn = parent_conn
+
+    def wait_ready(self) -> Dict[str, Any]:
+        """Čekání na potvrzení připravenosti od procesu"""
+        self.ready_info = self.conn.recv()
+        return self.ready_info
+
+    def restart(self) -> None:
+        """Náhrada havarovaného nebo zaseknutého procesu novým"""
+        self.stop(graceful=False)
+        self.restarts += 1
+        self.spawn()
+        self.wait_ready()
+
+    def stop(self, graceful: bool = True) -> None:
+        """Ukončení procesu"""
+        if self.process is None:
+            return
+        if graceful and self.process.is_alive():
+            try:
+                self.conn.send(None)
+            except (OSError, BrokenPipeError):
+                pass
+            self.process.join(timeout=2)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join(timeout=2)
+        try:
+            self.conn.close()
+        except OSError:
+            pass
+        self.process = None
+
+class AZRWorkerPool:
+    """
+    Skupina pracovních procesů s omezenou frontou dotazů
+    """
+    def __init__(self, pool_size: Optional[int] = None, queue_depth: int = DEFAULT_QUEUE_DEPTH,
+                 preload: Optional[List[str]] = None, start_method: str = "spawn", metrics=None,
+                 deadline_grace_ms: float = DEFAULT_DEADLINE_GRACE_MS):
+        self.pool_size = max(1, pool_size or os.cpu_count() or 1)
+        self.queue_depth = max(1, queue_depth)
+        self.preload = preload or []
+        self.context = multiprocessing.get_context(start_method)
+        self.requests: "queue.Queue" = queue.Queue(maxsize=self.queue_depth)
+        self.slots: List[WorkerSlot] = []
+        self.threads: List[threading.Thread] = []
+        self.deadline_grace_ms = deadline_grace_ms
+        self.rejected = 0
+        self.completed = 0
+        self.deadline_exceeded = 0
+        self.recycled = 0
+        self.stats_lock = threading.Lock()
+        self.metrics = metrics
+        self.started = False
+
+    def start(self) -> Dict[str, Any]:
+        """
+        Spuštění a zahřátí všech pracovních procesů
+
+        Procesy se spouští souběžně, metoda se vrátí až po potvrzení
+        připravenosti od všech. Vrací informace o zahřátí pro handshake.
+        """
+        started = time.perf_counter()
+        self.slots = [WorkerSlot(self.context, self.preload) for _ in range(self.pool_size)]
+        for slot in self.slots:
+            slot.spawn()
+        workers = [slot.wait_ready() for slot in self.slots]
+
+        for index, slot in enumerate(self.slots):
+            thread = threading.Thread(
+                target=self._dispatch_loop, args=(slot,), name=f"azr-pool-{index}", daemon=True
+            )
+            thread.start()
+            self.threads.append(thread)
+
+        self.started = True
+        print(f"AZR pool připraven: {self.pool_size} procesů, fronta {self.queue_depth}", file=sys.stderr)
+        return {
+            "warmupMs": round((time.perf_counter() - started) * 1000, 3),
+            "poolSize": self.pool_size,
+            "queueDepth": self.queue_depth,
+            "workers": [{"pid": info.get("pid"), "preloadedModules": info.get("preloadedModules", {})}
+                        for info in workers]
+        }
+
+    def runs_in_parent(self, query: Dict[str, Any]) -> bool:
+        """
+        Zda dotaz patří rodičovskému procesu místo poolu
+
+        Inkrementální token_analysis drží agregace uživatelů v paměti procesu;
+        se sdíleným SQLite úložištěm (AZR_ROLLUP_PATH) ho mohou zpracovat
+        libovolné pracovní procesy. Dávka zůstává v rodičovském procesu,
+        pokud takový dotaz obsahuje kterákoli její položka.
+        """
+        query_type = query.get("type")
+        if query_type == "batch":
+            data = query.get("data")
+            items = data.get("queries") if isinstance(data, dict) else None
+            return isinstance(items, list) and any(
+                isinstance(item, dict) and self.runs_in_parent(item) for item in items
+            )
+        if query_type in PARENT_TYPES:
+            return True
+        options = query.get("options")
+        return query_type == "token_analysis" and isinstance(options, dict) \
+            and bool(options.get("incremental")) and not os.environ.get("AZR_ROLLUP_PATH")
+
+    def submit(self, query: Dict[str, Any],
+               on_partial: Optional[Callable[[Dict[str, Any]], None]] = None) -> Future:
+        """
+        Zařazení dotazu do fronty
+
+        Vrací Future s odpovědí. Pokud je fronta plná, je Future rovnou
+        vyřešena odpovědí "busy". Částečné výsledky (options.stream) předává
+        dispečerské vlákno funkci `on_partial`, bez ní je procesor vrátí v odpovědi.
+        """
+        future: Future = Future()
+        try:
+            self.requests.put_nowait((query, future, time.perf_counter(), on_partial))
+        except queue.Full:
+            with self.stats_lock:
+                self.rejected += 1
+            future.set_result(busy_response(self.queue_depth))
+        return future
+
+    def process_query(self, query: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Blokující zpracování dotazu přes pool
+        """
+        return self.submit(query).result()
+
+    def _dispatch_loop(self, slot: WorkerSlot) -> None:
+        """
+        Smyčka dispečerského vlákna obsluhujícího jeden pracovní proces
+        """
+        while True:
+            item = self.requests.get()
+            if item is None:
+                break
+            query, future, submitted, on_partial = item
+            if not future.set_running_or_notify_cancel():
+                continue
+
+            started = time.perf_counter()
+            try:
+                response = self._run_in_slot(slot, query, submitted, on_partial)
+            except Exception as e:
+                # Dispečerské vlákno nesmí skončit, jinak by dotazy ve frontě nikdy nedostaly odpověď;
+                # stav spojení s procesem je neznámý, proces se proto nahradí
+                response = {
+                    "success": False,
+                    "error": f"Pracovní proces AZR selhal: {str(e) or type(e).__name__}"
+                }
+                self._restart_slot(slot)
+
+            try:
+                with self.stats_lock:
+                    self.completed += 1
+                    if response.get("deadlineExceeded"):
+                        self.deadline_exceeded += 1
+                if self.metrics is not None:
+                    # Latence z pohledu dispečera včetně předání dat do procesu a zpět
+                    self.metrics.observe_handler(
+                        query.get("type", "unknown"), (time.perf_counter() - started) * 1000,
+                        response.get("success", False), response.get("meta", {}).get("cache", {}).get("hit", False)
+                    )
+            except Exception as e:
+                print(f"Metriky dotazu v poolu nelze zapsat: {str(e)}", file=sys.stderr)
+            future.set_result(response)
+
+    def _restart_slot(self, slot: WorkerSlot) -> None:
+        """
+        Náhrada pracovního procesu; selhání se zapíše a obnova se zkusí znovu
+        při dalším dotazu (zápis do zavřeného spojení skončí chybou)
+        """
+        try:
+            slot.restart()
+        except Exception as e:
+            print(f"Pracovní proces AZR nelze obnovit: {str(e) or type(e).__name__}", file=sys.stderr)
+
+    def _run_in_slot(self, slot: WorkerSlot, query: Dict[str, Any], submitted: float,
+                     on_partial: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """
+        Předání dotazu pracovnímu procesu s ohledem na časový limit
+        """
+        deadline_ms = Deadline.ms_from_options(query.get("options"))
+        wait_timeout = None
+        if deadline_ms is not None:
+            queued_ms = (time.perf_counter() - submitted) * 1000
+            remaining_ms = deadline_ms - queued_ms
+            if remaining_ms <= 0:
+                return deadline_response({
+                    "deadlineMs": deadline_ms, "elapsedMs": round(queued_ms, 3), "stage": "queue", "checkpoints": []
+                })
+            query = {**query, "options": {**query["options"], "deadlineMs": round(remaining_ms, 3)}}
+            wait_timeout = (remaining_ms + self.deadline_grace_ms) / 1000
+
+        try:
+            slot.conn.send((query, on_partial is not None))
+            wait_until = time.perf_counter() + wait_timeout if wait_timeout is not None else None
+            while True:
+                if wait_until is not None and not slot.conn.poll(max(0.0, wait_until - time.perf_counter())):
+                    # Procesor nereaguje na limit, proces se nahradí novým
+                    elapsed_ms = (time.perf_counter() - submitted) * 1000
+                    print(f"Pracovní proces {slot.process.pid} překročil časový limit, nahrazuji ho", file=sys.stderr)
+                    with self.stats_lock:
+                        self.recycled += 1
+                    self._restart_slot(slot)
+                    return deadline_response({
+                        "deadlineMs": deadline_ms, "elapsedMs": round(elapsed_ms, 3), "stage": "worker",
+                        "checkpoints": [], "workerRecycled": True
+                    })
+                message = slot.conn.recv()
+                if not message.get("partial"):
+                    return message
+                try:
+                    on_partial(message)
+                except Exception as e:
+                    # Klient částečné výsledky nepřijímá (zavřené spojení), zbytek se jen dočte
+                    print(f"Částečný výsledek nelze předat: {str(e)}", file=sys.stderr)
+                    on_partial = lambda message: None
+        except (EOFError, OSError) as e:
+            self._restart_slot(slot)
+            return {
+                "success": False,
+                "error": f"Pracovní proces AZR selhal: {str(e) or type(e).__name__}"
+            }
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Aktuální stav poolu
+        """
+        with self.stats_lock:
+            return {
+                "poolSize": self.pool_size,
+                "queueDepth": self.queue_depth,
+                "queued": self.requests.qsize(),
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "deadlineExceeded": self.deadline_exceeded,
+                "recycled": self.recycled,
+                "restarts": sum(slot.restarts for slot in self.slots),
+                "alive": sum(1 for slot in self.slots if slot.process is not None and slot.process.is_alive())
+            }
+
+    def close(self) -> None:
+        """
+        Dokončení rozpracovaných dotazů a ukončení procesů
+        """
+        if not self.started:
+            return
+        for _ in self.threads:
+            self.requests.put(None)
+        for thread in self.threads:
+            thread.join()
+        for slot in self.slots:
+            slot.stop()
+        self.threads = []
+        self.started = False
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,1793 @@
+"""
+AZR Processor - zpracování dotazů bridge pro Absolute Zero Reasoner
+
+AZRProcessor a transporty (jednorázový dotaz, režim --serve, Unix socket).
+Spouští se přes azr_bridge.py; kód je v samostatném modulu, aby se při
+každém jednorázovém volání načetl z předkompilovaného .pyc a nekompiloval
+se znovu jako skript.
+"""
+
+import importlib
+import importlib.util
+import os
+import sys
+import json
+import threading
+import time
+from typing import TYPE_CHECKING, Dict, Any, Callable, List, Optional, Tuple, Union
+
+from azr_cache import ResultCache, canonical_key
+from azr_codec import available_codecs, default_codec_name, frame, get_codec, read_messages
+from azr_metrics import MetricsRegistry
+
+# Moduly jednotlivých funkcí (časové limity, streamování, sloupcový výstup,
+# sdílená paměť, profilování, agregace, detekce anomálií) se importují až
+# v procesoru, který je potřebuje, jednorázové volání za ně neplatí
+if TYPE_CHECKING:
+    from azr_anomaly import AnomalyDetector
+    from azr_profiling import HandlerProfiler
+    from azr_rollups import RollupStore
+
+# Volitelné moduly se při startu pouze vyhledají (bez importu), skutečný import
+# proběhne až v obslužné metodě, která modul potřebuje
+OPTIONAL_MODULES = ("numpy", "pandas", "sklearn", "torch", "transformers")
+
+def module_available(name: str) -> bool:
+    """
+    Zjištění dostupnosti modulu bez jeho importu
+    """
+    if name in sys.modules:
+        return True
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+def preload_modules(names: List[str]) -> Dict[str, float]:
+    """
+    Import vybraných volitelných modulů předem (např. při zahřátí serveru)
+
+    Vrací dobu importu jednotlivých modulů v milisekundách, nedostupné moduly přeskočí.
+    """
+    timings = {}
+    for name in names:
+        if not module_available(name):
+            continue
+        started = time.perf_counter()
+        importlib.import_module(name)
+        timings[name] = round((time.perf_counter() - started) * 1000, 3)
+    return timings
+
+HAS_NUMPY = module_available("numpy")
+HAS_PANDAS = module_available("pandas")
+HAS_SKLEARN = module_available("sklearn")
+HAS_TORCH = module_available("torch")
+HAS_TRANSFORMERS = module_available("transformers")
+
+# Přehled funkcí poskytovaných AZR modulem
+MODULE_CAPABILITIES = {
+    "basic_analysis": True,
+    "vectorization": HAS_NUMPY and HAS_SKLEARN,
+    "data_processing": HAS_PANDAS,
+    "local_models": HAS_TRANSFORMERS and HAS_TORCH,
+    "version": "0.1.0"
+}
+
+# Výchozí řádkový formát výstupu (azr_columnar.FORMAT_ROWS) pro výchozí hodnoty parametrů
+DEFAULT_OUTPUT_FORMAT = "rows"
+
+# Jak často (v uživatelích) token_analysis_bulk ověřuje časový limit
+BULK_CHECK_INTERVAL = 100
+
+# Třída pro zpracování AZR dotazů
+class AZRProcessor:
+    def __init__(self, cache: Optional[ResultCache] = None, metrics: Optional[MetricsRegistry] = None,
+                 rollups: Optional["RollupStore"] = None):
+        self.models = {}
+        self.cache = cache if cache is not None else ResultCache.from_env()
+        self.metrics = metrics if metrics is not None else MetricsRegistry()
+        self._rollups = rollups
+        self._anomalies: Optional["AnomalyDetector"] = None
+        self._profiler: Optional["HandlerProfiler"] = None
+        # Procesor může sdílet více vláken (azr_server), stav vytvářený při prvním
+        # použití proto vzniká pod zámkem, aby dvě vlákna nevytvořila každé svůj
+        self.lock = threading.Lock()
+
+    @property
+    def rollups(self) -> "RollupStore":
+        """Uložené agregace pro inkrementální token_analysis, vytvoří se při prvním použití"""
+        if self._rollups is None:
+            with self.lock:
+                if self._rollups is None:
+                    from azr_rollups import RollupStore
+
+                    self._rollups = RollupStore.from_env()
+        return self._rollups
+
+    @property
+    def anomalies(self) -> "AnomalyDetector":
+        """Detektor anomálií pro token_anomaly, vytvoří se při prvním použití"""
+        if self._anomalies is None:
+            with self.lock:
+                if self._anomalies is None:
+                    from azr_anomaly import AnomalyDetector
+
+                    self._anomalies = AnomalyDetector.from_env()
+        return self._anomalies
+
+    @anomalies.setter
+    def anomalies(self, detector: "AnomalyDetector") -> None:
+        with self.lock:
+            self._anomalies = detector
+
+    @property
+    def profiler(self) -> "HandlerProfiler":
+        """Profiler procesorů, vytvoří se při prvním profilovaném dotazu"""
+        if self._profiler is None:
+            with self.lock:
+                if self._profiler is None:
+                    from azr_profiling import HandlerProfiler
+
+                    self._profiler = HandlerProfiler.from_env()
+        return self._profiler
+
+    def process_query(self, query: Dict[str, Any],
+                      emit: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """
+        Zpracování AZR dotazu
+
+        Úspěšné odpovědi se ukládají do mezipaměti podle TTL daného typu dotazu,
+        volbou options.cache = false lze mezipaměť pro dotaz obejít.
+        Stav mezipaměti se vrací v meta.cache. Doba zpracování se zapisuje
+        do metrik (fáze "handler"). Profilovaný dotaz (options.profile nebo
+        náhodný výběr podle AZR_PROFILE) vrací souhrn profilu v meta.profile.
+        S options.deadlineMs se procesor po překročení limitu přeruší na
+        nejbližším kontrolním bodu (viz azr_deadline). Funkcí `emit` může
+        transport přijímat částečné výsledky dotazů s options.stream (viz azr_stream).
+        """
+        query_type = query.get("type", "unknown")
+        data = query.get("data", {})
+        options = query.get("options", {})
+        started = time.perf_counter()
+        deadline = None
+        if options.get("deadlineMs") is not None:
+            from azr_deadline import Deadline
+
+            deadline = Deadline.from_options(options)
+            if deadline is not None:
+                deadline.started = started
+        
+        # Logování
+        print(f"Zpracování dotazu typu: {query_type}", file=sys.stderr)
+
+        # Explicitně vyžádané profilování musí proběhnout, mezipaměť se proto přeskočí;
+        # inkrementální dotazy mění uložený stav a jejich výsledek na něm závisí,
+        # streamované výsledky nejsou v konečné odpovědi a binární sloupce
+        # by trvalá mezipaměť (JSON) nevrátila ve stejném tvaru
+        use_cache = self.cache.enabled and options.get("cache", True) is not False \
+            and not options.get("profile") and self.cache.ttl_for(query_type) > 0 \
+            and not options.get("incremental") and not options.get("stream") \
+            and (options.get("format") or DEFAULT_OUTPUT_FORMAT) == DEFAULT_OUTPUT_FORMAT \
+            and not self._references_region(data)
+
+        cache_key = None
+        if use_cache:
+            cache_key = canonical_key(query)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                self.metrics.observe_handler(query_type, (time.perf_counter() - started) * 1000, True, True)
+                return self._with_meta(cached, True)
+
+        profile_mode = None
+        if options.get("profile") is not None or os.environ.get("AZR_PROFILE"):
+            profile_mode = self.profiler.mode_for(options)
+        profile_summary = None
+        
+        try:
+            response, profile_summary = self._run_handler(query_type, query, data, options,
+                                                          deadline, emit, profile_mode)
+        except Exception as e:
+            response = self.wrap_exception(e)
+            profile_summary = getattr(e, "azr_profile", profile_summary)
+
+        if cache_key is not None and response["success"]:
+            self.cache.put(cache_key, query_type, response)
+        self.metrics.observe_handler(query_type, (time.perf_counter() - started) * 1000, response["success"])
+        return self._with_meta(response, False, profile_summary)
+
+    def _references_region(self, data: Any) -> bool:
+        """Data dotazu odkazují na sdílenou paměť nebo soubor (viz azr_shm.references_region)"""
+        from azr_shm import references_region
+
+        return references_region(data)
+
+    def _run_handler(self, query_type: str, query: Dict[str, Any], data: Dict[str, Any], options: Dict[str, Any],
+                     deadline: Any, emit: Optional[Callable[[Dict[str, Any]], None]],
+                     profile_mode: Optional[str]) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+        """
+        Spuštění procesoru, vrací dvojici (odpověď, souhrn profilu)
+
+        Časový limit a příjemce částečných výsledků se nastaví (a jejich
+        moduly importují) jen u dotazů, které je mají.
+        """
+        def run():
+            if profile_mode:
+                return self.profiler.run(profile_mode, query_type,
+                                         lambda: self.dispatch(query_type, query, data, options))
+            return self.dispatch(query_type, query, data, options), None
+
+        if deadline is None and emit is None:
+            result, profile_summary = run()
+            return self.wrap_result(result), profile_summary
+
+        from azr_deadline import DeadlineExceeded, active_deadline, check_deadline, deadline_response
+        from azr_stream import partial_results
+
+        try:
+            with active_deadline(deadline), partial_results(emit):
+                check_deadline("start")
+                result, profile_summary = run()
+            return self.wrap_result(result), profile_summary
+        except DeadlineExceeded as e:
+            print(f"Dotaz typu {query_type} překročil časový limit ({e.timing['stage']})", file=sys.stderr)
+            return deadline_response(e.timing), None
+
+    def _with_meta(self, response: Dict[str, Any], cache_hit: bool,
+                   profile: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Pomocná metoda přidávající do odpovědi stav mezipaměti a souhrn profilu"""
+        stats = self.cache.stats()
+        meta = dict(response.get("meta", {}))
+        meta["cache"] = {"hit": cache_hit, "hits": stats["hits"], "misses": stats["misses"]}
+        if profile is not None:
+            meta["profile"] = profile
+        return {**response, "meta": meta}
+
+    def dispatch(self, query_type: str, query: Dict[str, Any], data: Dict[str, Any],
+                 options: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Výběr procesoru podle typu dotazu
+        """
+        if query_type == "reservation_analysis":
+            return self.process_reservation_analysis(data, options)
+        elif query_type == "conflict_resolution":
+            return self.process_conflict_resolution(data, options)
+        elif query_type == "user_reservation_analysis":
+            return self.process_user_reservation_analysis(data, options)
+        elif query_type == "token_analysis":
+            return self.process_token_analysis(data, options)
+        elif query_type == "token_analysis_bulk":
+            return self.process_token_analysis_bulk(data, options)
+        elif query_type == "token_cube_refresh":
+            return self.process_token_cube_refresh(data, options)
+        elif query_type == "token_anomaly":
+            return self.process_token_anomaly(data, options)
+        elif query_type == "token_reconcile":
+            return self.process_token_reconcile(data, options)
+        elif query_type == "text_vectorization":
+            return self.process_text_vectorization(data, options)
+        elif query_type == "azr_capabilities":
+            return self.get_capabilities()
+        elif query_type == "batch":
+            return self.process_batch(data, options)
+        elif query_type == "metrics":
+            return self.get_metrics()
+        elif query_type == "analysis" or query_type == "app_analysis":
+            # Nový typ dotazu pro analýzu aplikace
+            query_text = query.get("query", "")
+            if query_text:
+                return self.process_app_analysis(query_text, options)
+            else:
+                return {"error": "Dotaz pro analýzu aplikace musí obsahovat 'query' s textem dotazu"}
+        else:
+            # Neznámý typ dotazu
+            return {"error": f"Neznámý typ dotazu: {query_type}",
+                    "dostupne_typy": ["reservation_analysis", "conflict_resolution", 
+                                      "user_reservation_analysis", "token_analysis", "token_analysis_bulk",
+                                      "token_cube_refresh", "token_anomaly", "token_reconcile",
+                                      "text_vectorization", "azr_capabilities", "batch", "metrics",
+                                      "analysis", "app_analysis"]}
+
+    def wrap_result(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Převod výsledku procesoru na odpověď ve tvaru {success, data | error}
+        """
+        if "error" in result:
+            response = {"success": False, "error": result["error"]}
+            if result.get("rebuildRequired"):
+                response["rebuildRequired"] = True
+            return response
+        else:
+            return {"success": True, "data": result}
+
+    def wrap_exception(self, e: Exception) -> Dict[str, Any]:
+        """
+        Převod výjimky z procesoru na chybovou odpověď
+        """
+        # Zachycení případných chyb
+        import traceback
+        error_traceback = traceback.format_exc()
+        return {
+            "success": False, 
+            "error": f"Chyba při zpracování dotazu: {str(e)}",
+            "traceback": error_traceback
+        }
+
+    def process_batch(self, data: Dict[str, Any], options: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Zpracování dávky dotazů v jednom volání
+
+        Dotazy se seskupí podle typu. Typy s dávkovým procesorem (viz `batch_handlers`)
+        se zpracují najednou, ostatní se volají po jednom bez opakovaného logování.
+        Výsledky se vrací ve stejném pořadí jako dotazy, každý se samostatným
+        příznakem úspěchu. Položka s vlastním options.deadlineMs se zpracuje
+        samostatně s tímto limitem (nejvýše však se zbytkem limitu dávky)
+        a po jeho překročení dostane odpověď s "deadlineExceeded".
+        """
+        from azr_deadline import (Deadline, DeadlineExceeded, active_deadline, check_deadline,
+                                  current_deadline, deadline_response)
+        from azr_stream import partial_results
+
+        queries = data.get("queries", [])
+        if not isinstance(queries, list):
+            return {"error": "Dávka musí obsahovat seznam dotazů v 'queries'"}
+
+        results: List[Optional[Dict[str, Any]]] = [None] * len(queries)
+        groups: Dict[str, List[int]] = {}
+
+        for index, item in enumerate(queries):
+            if not isinstance(item, dict):
+                results[index] = {"success": False, "error": "Dotaz musí být JSON objekt"}
+                continue
+            item_type = item.get("type", "unknown")
+            if item_type == "batch":
+                results[index] = {"success": False, "error": "Vnořené dávky nejsou podporovány"}
+                continue
+            groups.setdefault(item_type, []).append(index)
+
+        print(f"Zpracování dávky: {len(queries)} dotazů, {len(groups)} typů", file=sys.stderr)
+
+        batch_handlers = {
+            "reservation_analysis": self.process_reservation_analysis_batch
+        }
+
+        for item_type, indices in groups.items():
+            try:
+                check_deadline(f"batch: {item_type}")
+            except DeadlineExceeded as e:
+                for index in indices:
+                    results[index] = deadline_response(e.timing)
+                continue
+
+            batch_handler = batch_handlers.get(item_type)
+            if batch_handler is not None:
+                # Položky s vlastním limitem nelze přerušit uprostřed dávkového výpočtu
+                batched = [i for i in indices if Deadline.ms_from_options(queries[i].get("options")) is None]
+                try:
+                    group_results = batch_handler(
+                        [queries[i].get("data", {}) for i in batched],
+                        [queries[i].get("options", {}) for i in batched]
+                    )
+                    for index, result in zip(batched, group_results):
+                        results[index] = self.wrap_result(result)
+                    indices = [i for i in indices if results[i] is None]
+                except DeadlineExceeded as e:
+                    # Limit dávky vypršel uprostřed skupiny, výsledky dřívějších skupin zůstávají
+                    print(f"Dávkový procesor {item_type} překročil časový limit ({e.timing['stage']})",
+                          file=sys.stderr)
+                    for index in indices:
+                        results[index] = deadline_response(e.timing)
+                    continue
+                except Exception as e:
+                    # Při selhání dávkového procesoru se skupina zpracuje po jednom,
+                    # aby chyba jednoho dotazu neovlivnila ostatní
+                    print(f"Dávkový procesor {item_type} selhal, skupina se zpracuje po jednom: {str(e)}",
+                          file=sys.stderr)
+
+            for index in indices:
+                item = queries[index]
+                batch_deadline = current_deadline()
+                item_deadline = Deadline.from_options(item.get("options"))
+                if item_deadline is None or (batch_deadline is not None
+                                             and batch_deadline.remaining_ms() <= item_deadline.deadline_ms):
+                    item_deadline = batch_deadline
+                try:
+                    # Položka dávky nemá vlastní id, částečné výsledky proto neposílá
+                    with active_deadline(item_deadline), partial_results(None):
+                        check_deadline(f"batch: {item_type}")
+                        result = self.dispatch(item_type, item, item.get("data", {}), item.get("options", {}))
+                    results[index] = self.wrap_result(result)
+                except DeadlineExceeded as e:
+                    results[index] = deadline_response(e.timing)
+                except Exception as e:
+                    results[index] = self.wrap_exception(e)
+
+        return {
+            "results": results,
+            "count": len(results),
+            "failed": sum(1 for result in results if not result["success"])
+        }
+
+    def process_reservation_analysis(self, data: Dict[str, Any], options: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Zpracování analýzy rezervace
+        """
+        suggestion = data.get("suggestion", {})
+        request = data.get("request", {})
+        
+        # Základní analýza návrhu rezervace
+        enhanced_suggestion = {
+            "additionalReasons": self._suggestion_reasons(
+                suggestion.get("startTime", ""),
+                suggestion.get("date", ""),
+                suggestion.get("price", 0),
+                suggestion.get("tokenPrice", 0)
+            )
+        }
+        
+        # Vrácení výsledku
+        return {"enhancedSuggestion": enhanced_suggestion}
+
+    def process_reservation_analysis_batch(self, data_list: List[Dict[str, Any]],
+                                           options_list: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Dávková analýza návrhů rezervací
+
+        Návrhy v dávce se často liší jen místem, ne časem ani cenou, proto se
+        důvody počítají jednou pro každou unikátní kombinaci (čas, datum, cena).
+        Neplatný návrh vrátí chybu jen pro svou položku.
+        """
+        from azr_deadline import DEADLINE_CHECK_INTERVAL, check_deadline
+
+        reasons_by_key: Dict[tuple, List[str]] = {}
+        results = []
+
+        for position, data in enumerate(data_list):
+            if position % DEADLINE_CHECK_INTERVAL == 0:
+                check_deadline("reservation_analysis_batch")
+            suggestion = data.get("suggestion", {}) if isinstance(data, dict) else {}
+            if not isinstance(suggestion, dict):
+                suggestion = {}
+            key = (
+                suggestion.get("startTime", ""),
+                suggestion.get("date", ""),
+                suggestion.get("price", 0),
+                suggestion.get("tokenPrice", 0)
+            )
+
+            try:
+                reasons = reasons_by_key.get(key)
+                if reasons is None:
+                    reasons = self._suggestion_reasons(*key)
+                    reasons_by_key[key] = reasons
+            except (ValueError, TypeError, AttributeError) as e:
+                results.append({"error": f"Chyba při zpracování dotazu: {str(e)}"})
+                continue
+
+            results.append({"enhancedSuggestion": {"additionalReasons": list(reasons)}})
+
+        return results
+
+    def _suggestion_reasons(self, start_time: str, date: str, price: Any, token_price: Any) -> List[str]:
+        """Pomocná metoda sestavující důvody pro návrh rezervace"""
+        reasons = []
+
+        # Analýza času
+        if start_time:
+            hour = int(start_time.split(":")[0])
+            if 8 <= hour <= 10:
+                reasons.append(
+                    "Ranní hodiny jsou obvykle méně vytížené, což zvyšuje kvalitu vašeho zážitku."
+                )
+            elif 17 <= hour <= 20:
+                reasons.append(
+                    "Večerní hodiny jsou obvykle více vytížené, což může ovlivnit dostupnost zařízení a šaten."
+                )
+        
+        # Analýza dne v týdnu
+        if date:
+            if "sobota" in date.lower() or "neděle" in date.lower() or any(day in date.lower() for day in ["so", "ne"]):
+                reasons.append(
+                    "Víkendy jsou obvykle více vytížené, ale nabízejí příjemnější atmosféru pro rekreační sportovce."
+                )
+        
+        # Analýza ceny
+        if price and token_price:
+            if token_price <= 5:
+                reasons.append(
+                    f"Platba FitnessTokeny je v tomto případě výhodná, ušetříte až {int(price * 0.15)} Kč oproti standardní ceně."
+                )
+
+        return reasons
+    
+    def process_conflict_resolution(self, data: Dict[str, Any], options: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Zpracování řešení konfliktu
+        """
+        conflict = data.get("conflict", {})
+        reservation1 = data.get("reservation1", {})
+        reservation2 = data.get("reservation2", {})
+        
+        # Základní analýza konfliktu
+        resolution = "Na základě analýzy doporučuji následující řešení konfliktu:"
+        
+        # Porovnání rezervací
+        suggestions = []
+        
+        # Příklad: podle typu rezervace
+        if reservation1.get("type") == "facility" and reservation2.get("type") == "tournament":
+            resolution += "\nTurnajová rezervace by měla mít přednost před individuální rezervací sportoviště."
+            suggestions.append({
+                "title": "Přesunutí individuální rezervace",
+                "description": "Přesunout individuální rezervaci na jiný volný termín a potvrdit turnaj.",
+                "priority": "high"
+            })
+        else:
+            # Obecné doporučení
+            resolution += "\nDoporučuji analyzovat prioritu rezervací podle počtu účastníků a typu aktivity."
+            suggestions.append({
+                "title": "Konzultace s oběma stranami",
+                "description": "Kontaktovat obě strany a najít kompromisní řešení.",
+                "priority": "medium"
+            })
+        
+        # Vrácení výsledku
+        return {
+            "resolution": resolution,
+            "suggestions": suggestions
+        }
+    
+    def process_user_reservation_analysis(self, data: Dict[str, Any], options: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Zpracování analýzy rezervací uživatele
+        """
+        from azr_deadline import DEADLINE_CHECK_INTERVAL, check_deadline
+
+        user_id = data.get("userId", 0)
+        reservations = data.get("reservations", [])
+        
+        if not reservations:
+            return {
+                "summary": "Zatím nemáte žádné rezervace.",
+                "insights": ["Vytvořte svou první rezervaci a získejte personalizovaná doporučení."],
+                "recommendations": []
+            }
+        
+        # Základní analýza historie rezervací
+        summary = f"Analýza {len(reservations)} rezervací"
+        insights = []
+        recommendations = []
+        
+        # Počítání typů rezervací
+        reservation_types = {}
+        for position, res in enumerate(reservations):
+            if position % DEADLINE_CHECK_INTERVAL == 0:
+                check_deadline("user_reservation_analysis: typy")
+            res_type = res.get("type", "unknown")
+            reservation_types[res_type] = reservation_types.get(res_type, 0) + 1
+        
+        # Přidání insights podle typů
+        for res_type, count in reservation_types.items():
+            type_name = {
+                "facility": "sportoviště",
+                "trainer": "trenér",
+                "tournament": "turnaj"
+            }.get(res_type, res_type)
+            
+            insights.append(f"Máte {count} rezervací typu {type_name}.")
+            
+            # Doporučení podle typu
+            if res_type == "facility" and count >= 3:
+                recommendations.append({
+                    "title": "Zvažte FitnessTokens",
+                    "description": "Při vaší frekvenci rezervací sportovišť by bylo výhodné využít FitnessTokens pro slevu až 20%."
+                })
+            elif res_type == "trainer" and count >= 2:
+                recommendations.append({
+                    "title": "Dlouhodobá spolupráce s trenérem",
+                    "description": "Zvažte pravidelné tréninky s trenérem pro lepší ceny a konzistentní pokrok."
+                })
+        
+        # Vrácení výsledku
+        return {
+            "summary": summary,
+            "insights": insights,
+            "recommendations": recommendations
+        }
+    
+    def process_token_analysis(self, data: Dict[str, Any], options: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Zpracování analýzy FitnessTokens - pokročilá analýza transakcí a generování doporučení
+
+        options.timeframe (day, week, month, quarter, year; výchozí all) a
+        options.from / options.to omezují analýzu na časové okno, odpověď pak
+        obsahuje "window". options.predictionWindow určuje horizont predikce,
+        options.forecast model predikce (viz azr_forecast).
+        """
+        user_id = data.get("userId", "")
+        transactions = data.get("transactions", [])
+        columnar = data.get("columnar")
+        export = data.get("file")
+        cube = data.get("cube")
+        
+        if not HAS_PANDAS:
+            return {"error": "Modul pandas není k dispozici pro analýzu tokenů."}
+
+        from azr_columnar import output_format
+        from azr_deadline import check_deadline
+        from azr_forecast import forecast_level, forecast_method, forecast_rollups
+        from azr_token_kernel import TokenRollup, prediction_window, time_window
+
+        fmt = output_format(options)
+        window = time_window(options)
+        prediction = prediction_window(options)
+        method = forecast_method(options)
+        level = forecast_level(options)
+        if options.get("incremental"):
+            if window is not None:
+                return {"error": "Inkrementální analýza tokenů nepodporuje časové okno (timeframe, from, to)"}
+            return self._incremental_token_analysis(data, options, fmt)
+        
+        if not transactions and not columnar and not export and not cube:
+            return self._windowed(self._empty_token_analysis(), window)
+        
+        # Jednoprůchodová agregace (kódy typů a kategorií, časové koše, bincount);
+        # časové okno se u seřazených dat najde binárním hledáním
+        try:
+            if columnar:
+                # Sloupcová data ze sdílené paměti, mapovaného souboru nebo přímo ze zprávy
+                rollup = TokenRollup.from_columnar(columnar, window)
+            elif export:
+                rollup = self._file_token_rollup(export, options, window)
+            elif cube:
+                # Předpočítaná kostka: jen buňky uživatele, bez čtení transakcí;
+                # kostka je po měsících, okno se proto rozšíří na celé měsíce
+                from azr_cube import open_cube
+
+                if not cube.get("path"):
+                    raise ValueError("data.cube musí obsahovat path")
+                if window is not None:
+                    window = window.monthly()
+                rollup = open_cube(cube["path"]).rollup(cube.get("userId", user_id), window)
+            else:
+                rollup = TokenRollup.from_transactions(transactions, window)
+            
+            check_deadline("token_analysis: načtení dat")
+
+            if rollup.count == 0:
+                return self._windowed(self._empty_token_analysis(), window)
+            forecast = forecast_rollups([rollup], method, level)[0] if method != "baseline" else None
+            return self._windowed(self._token_analysis_result(rollup, data, fmt, prediction, forecast), window)
+            
+        except Exception as e:
+            return {
+                "error": f"Chyba při analýze tokenů: {str(e)}",
+                **self._empty_token_analysis(len(transactions))
+            }
+        
+        if statistics["transactionCount"] > 5:
+            recommendations.append({
+                "title": "Optimalizujte své výdaje",
+                "description": "Naplánujte si aktivity dopředu a využívejte rezervace v době mimo špičku pro úsporu tokenů."
+            })
+            
+        # Vrácení výsledku
+        return {
+            "summary": f"Celková bilance: {total_tokens} tokenů (utraceno: {total_spent}, získáno: {total_earned})",
+            "statistics": statistics,
+            "recommendations": recommendations
+        }
+    
+    def token_analysis_from_rollup(self, rollup, options: Optional[Dict[str, Any]] = None,
+                                   window=None) -> Dict[str, Any]:
+        """
+        Výsledek analýzy tokenů z hotové agregace (TokenRollup)
+
+        Pro agregace spočtené mimo dotaz, např. azr_reducer nad exportem.
+        options mají stejný význam jako u token_analysis (format,
+        predictionWindow, forecast, forecastLevel), `window` je časové okno,
+        se kterým agregace vznikla (TimeWindow), a doplní se do výsledku.
+        """
+        from azr_columnar import output_format
+        from azr_forecast import forecast_level, forecast_method, forecast_rollups
+        from azr_token_kernel import prediction_window
+
+        options = options or {}
+        fmt = output_format(options)
+        prediction = prediction_window(options)
+        method = forecast_method(options)
+        level = forecast_level(options)
+        if rollup.count == 0:
+            return self._windowed(self._empty_token_analysis(), window)
+        forecast = forecast_rollups([rollup], method, level)[0] if method != "baseline" else None
+        return self._windowed(self._token_analysis_result(rollup, {}, fmt, prediction, forecast), window)
+
+    def _file_token_rollup(self, export: Dict[str, Any], options: Dict[str, Any], window=None):
+        """
+        Agregace exportu transakcí ze souboru po blocích (viz azr_reducer)
+
+        data.file obsahuje path a volitelně format (jsonl, csv), shape
+        (bridge, sql) a chunkRows. S options.progress se průběh posílá
+        jako částečné zprávy {"progress": {...}}. S `window` se agregují
+        jen transakce v časovém okně.
+        """
+        from azr_stream import emit_partial
+
+        from azr_reducer import DEFAULT_CHUNK_ROWS, rollup_from_file
+
+        if not export.get("path"):
+            raise ValueError("data.file musí obsahovat path")
+        progress = None
+        if options.get("progress"):
+            progress = lambda info: emit_partial({"progress": info})
+        rollup, _ = rollup_from_file(
+            export["path"], export.get("format"), export.get("shape", "bridge"),
+            int(export.get("chunkRows", DEFAULT_CHUNK_ROWS)), progress, window
+        )
+        return rollup
+
+    def _windowed(self, result: Dict[str, Any], window) -> Dict[str, Any]:
+        """
+        Doplnění popisu časového okna (TimeWindow) do výsledku analýzy tokenů
+        """
+        if window is not None:
+            result["window"] = window.to_dict()
+        return result
+
+    def _empty_token_analysis(self, transaction_count: int = 0) -> Dict[str, Any]:
+        """
+        Výsledek analýzy tokenů bez transakcí
+        """
+        return {
+            "summary": {
+                "totalEarned": 0,
+                "totalSpent": 0,
+                "netChange": 0,
+                "averageTransaction": 0,
+                "transactionCount": transaction_count,
+                "highestSingleTransaction": 0
+            },
+            "patterns": {
+                "weekdayDistribution": {},
+                "hourlyDistribution": {},
+                "categoryDistribution": {},
+                "monthlyTrend": []
+            },
+            "predictions": {
+                "estimatedNextMonthEarnings": 0,
+                "estimatedNextMonthSpendings": 0,
+                "predictedBalance": 0,
+                "savingPotential": 0,
+                "earningOpportunities": []
+            },
+            "recommendations": {
+                "general": [],
+                "personalized": []
+            }
+        }
+
+    def _incremental_token_analysis(self, data: Dict[str, Any], options: Dict[str, Any],
+                                    fmt: str = DEFAULT_OUTPUT_FORMAT) -> Dict[str, Any]:
+        """
+        Inkrementální analýza tokenů nad uloženou agregací uživatele
+
+        data.transactions obsahuje jen transakce od vodoznaku data.watermark
+        z předchozí odpovědi (bez vodoznaku nebo s options.rebuild celou
+        historii). Výsledek má stejnou strukturu jako úplná analýza a navíc
+        "rollup" s novým vodoznakem. Viz azr_rollups.
+        """
+        from azr_deadline import check_deadline
+        from azr_forecast import forecast_level, forecast_method, forecast_rollups
+        from azr_rollups import REBUILD_ERROR, apply_transactions
+        from azr_token_kernel import prediction_window
+
+        user_id = data.get("userId")
+        transactions = data.get("transactions") or []
+        if not user_id:
+            return {"error": "Inkrementální analýza tokenů vyžaduje userId"}
+        if data.get("columnar") or data.get("file") or data.get("cube"):
+            return {"error": "Inkrementální analýza tokenů přijímá jen transakce v data.transactions"}
+
+        def update(state):
+            rollup, info, new_state = apply_transactions(
+                state, transactions, data.get("watermark"), bool(options.get("rebuild"))
+            )
+            return (rollup, info), new_state
+
+        try:
+            rollup, info = self.rollups.update(str(user_id), update)
+            if rollup is None:
+                return {"error": REBUILD_ERROR, "rebuildRequired": True}
+
+            check_deadline("token_analysis: načtení dat")
+
+            if rollup.count == 0:
+                result = self._empty_token_analysis()
+            else:
+                method = forecast_method(options)
+                forecast = None
+                if method != "baseline":
+                    forecast = forecast_rollups([rollup], method, forecast_level(options))[0]
+                result = self._token_analysis_result(rollup, data, fmt, prediction_window(options), forecast)
+        except Exception as e:
+            return {
+                "error": f"Chyba při analýze tokenů: {str(e)}",
+                **self._empty_token_analysis(len(transactions))
+            }
+        result["rollup"] = info
+        return result
+
+    def _token_analysis_result(self, rollup, data: Dict[str, Any], fmt: str = DEFAULT_OUTPUT_FORMAT,
+                               prediction: Tuple[str, float] = ("month", 1.0),
+                               forecast: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Souhrn, vzory, predikce a doporučení z agregace transakcí (TokenRollup)
+
+        Ve sloupcovém formátu (fmt "columns" nebo "arrow") jsou rozložení podle
+        hodin a dnů a měsíční trend místo seznamů v patterns.columns.
+        `prediction` je okno predikce a jeho délka v měsících (viz
+        azr_token_kernel.prediction_window); pro jiné okno než měsíc obsahují
+        predikce i odhady za celé okno. `forecast` je odhad modelu uživatele
+        z azr_forecast.forecast_rows, predikce pak obsahují model a intervaly.
+        """
+        from azr_columnar import FORMAT_ROWS, encode_table
+        from azr_deadline import check_deadline
+        from azr_shm import write_columns
+        from azr_token_kernel import TYPE_EARNED, TYPE_SPENT
+
+        # Základní výpočty
+        total_earned = rollup.total_earned
+        total_spent = rollup.total_spent
+        has_categories = rollup.has_categories
+        
+        # Identifikace oblíbených kategorií
+        favorite_earning_category = rollup.favorite_category(TYPE_EARNED) if has_categories else None
+        favorite_spending_category = rollup.favorite_category(TYPE_SPENT) if has_categories else None
+        
+        # Vytvoření výsledků analýzy
+        summary = {
+            "totalEarned": total_earned,
+            "totalSpent": total_spent,
+            "netChange": total_earned - total_spent,
+            "averageTransaction": rollup.average_amount,
+            "transactionCount": rollup.count,
+            "favoriteEarningCategory": favorite_earning_category,
+            "favoriteSpendingCategory": favorite_spending_category,
+            "highestSingleTransaction": rollup.amount_max,
+            "mostRecentTransaction": rollup.last_iso
+        }
+        
+        check_deadline("token_analysis: souhrn")
+
+        # Analýza vzorů
+        if has_categories:
+            category_distribution = rollup.category_distribution()
+        else:
+            category_distribution = {"Uncategorized": rollup.total_amount}
+        
+        # Měsíční trendy (seřazené podle měsíce)
+        monthly_trend = rollup.monthly_trend()
+        
+        if fmt == FORMAT_ROWS:
+            patterns = {
+                "weekdayDistribution": rollup.weekday_distribution(),
+                "hourlyDistribution": rollup.hourly_distribution(),
+                "categoryDistribution": category_distribution,
+                "monthlyTrend": monthly_trend
+            }
+        else:
+            # Tabulky: hodiny 0-23 a dny pondělí-neděle podle pozice, měsíce s transakcemi
+            patterns = {
+                "categoryDistribution": category_distribution,
+                "columns": {
+                    "hourly": encode_table({"amount": rollup.hourly_array(), "count": rollup.hour_count}, fmt),
+                    "weekday": encode_table({"amount": rollup.weekday_array(), "count": rollup.weekday_count}, fmt),
+                    "monthly": encode_table(rollup.monthly_columns(), fmt)
+                }
+            }
+
+        # Rozložení jako pole (hodiny 0-23, dny pondělí-neděle) do výstupní oblasti
+        if data.get("output"):
+            patterns["arrays"] = write_columns(data["output"], {
+                "hourly": rollup.hourly_array(),
+                "weekday": rollup.weekday_array()
+            })
+        
+        check_deadline("token_analysis: vzory")
+
+        # Predikce budoucího využití
+        # Jednoduchý lineární model pro predikci, měsíční odhady se škálují na okno predikce
+        window_name, window_months = prediction
+        model = None
+        if forecast is not None and forecast["method"] != "baseline":
+            from azr_forecast import prediction_fields
+
+            # Odhady modelu fitovaného nad měsíční řadou uživatele
+            model = prediction_fields(forecast, total_earned - total_spent, window_months)
+            estimated_next_month_earnings = model["estimatedNextMonthEarnings"]
+            estimated_next_month_spendings = model["estimatedNextMonthSpendings"]
+            predicted_balance = model["predictedBalance"]
+            saving_potential = model["savingPotential"]
+        elif len(monthly_trend) > 1:
+            recent_months = monthly_trend[-3:] if len(monthly_trend) >= 3 else monthly_trend
+            avg_earned = sum(m['earned'] for m in recent_months) / len(recent_months)
+            avg_spent = sum(m['spent'] for m in recent_months) / len(recent_months)
+            
+            # Aplikace trendu (mírný růst příjmů, stabilizace výdajů)
+            growth_factor = 1.05  # 5% nárůst pro příjmy
+            estimated_next_month_earnings = avg_earned * growth_factor
+            estimated_next_month_spendings = avg_spent * 0.95  # 5% úspora
+            
+            predicted_balance = float(total_earned - total_spent) + \
+                (estimated_next_month_earnings - estimated_next_month_spendings) * window_months
+            saving_potential = avg_spent * 0.15  # 15% potenciál úspory
+        else:
+            # Pokud nemáme dostatek dat, použijeme základní odhad
+            estimated_next_month_earnings = total_earned * 0.1 if total_earned > 0 else 10
+            estimated_next_month_spendings = total_spent * 0.1 if total_spent > 0 else 5
+            predicted_balance = float(total_earned - total_spent) * 1.05  # Mírný nárůst
+            saving_potential = total_spent * 0.15 if total_spent > 0 else 2
+        
+        # Identifikace příležitostí pro získání tokenů
+        earning_opportunities = []
+        
+        if has_categories:
+            # Analýza nevyužitých kategorií nebo kategorií s nízkým zastoupením
+            all_categories = set(['sports', 'challenges', 'rewards', 'reservations', 'events', 'transfers', 'purchases'])
+            used_categories = set(rollup.used_categories())
+            unused_categories = all_categories - used_categories
+            
+            for category in unused_categories:
+                earning_opportunities.append({
+                    "type": category.capitalize(),
+                    "potential": float(20),  # Základní potenciál
+                    "confidence": 0.8,
+                    "description": f"Začněte využívat možnosti v kategorii {category} pro získání dalších tokenů."
+                })
+        
+        # Přidání dalších příležitostí
+        earning_opportunities.append({
+            "type": "Weekly Challenge",
+            "potential": float(25),
+            "confidence": 0.85,
+            "description": "Účastněte se týdenní výzvy pro získání až 25 tokenů."
+        })
+        
+        if total_spent > total_earned:
+            earning_opportunities.append({
+                "type": "Balance Improvement",
+                "potential": float(total_spent - total_earned),
+                "confidence": 0.7,
+                "description": "Zaměřte se na vyrovnání příjmů a výdajů pomocí pravidelných aktivit."
+            })
+        
+        predictions = {
+            "estimatedNextMonthEarnings": float(estimated_next_month_earnings),
+            "estimatedNextMonthSpendings": float(estimated_next_month_spendings),
+            "predictedBalance": float(predicted_balance),
+            "savingPotential": float(saving_potential),
+            "earningOpportunities": earning_opportunities
+        }
+        if window_name != "month":
+            predictions["predictionWindow"] = window_name
+            predictions["estimatedWindowEarnings"] = float(estimated_next_month_earnings * window_months)
+            predictions["estimatedWindowSpendings"] = float(estimated_next_month_spendings * window_months)
+        if forecast is not None:
+            predictions["model"] = forecast["method"]
+        if model is not None:
+            predictions["intervals"] = model["intervals"]
+        
+        check_deadline("token_analysis: predikce")
+
+        # Generování doporučení
+        general_recommendations = []
+        personalized_recommendations = []
+        
+        # Základní doporučení pro všechny uživatele
+        general_recommendations.append({
+            "type": "activity",
+            "title": "Pravidelné sportovní aktivity",
+            "description": "Účastněte se alespoň 2 sportovních aktivit týdně pro konstantní přísun tokenů.",
+            "impact": "medium",
+            "actionable": True
+        })
+        
+        general_recommendations.append({
+            "type": "challenge",
+            "title": "Výzvy a soutěže",
+            "description": "Zapojte se do měsíčních výzev, které mohou významně zvýšit váš zůstatek tokenů.",
+            "impact": "high",
+            "actionable": True
+        })
+        
+        # Personalizovaná doporučení
+        if total_spent > total_earned * 1.5:
+            personalized_recommendations.append({
+                "type": "savings",
+                "title": "Optimalizujte své výdaje",
+                "description": "Vaše výdaje převyšují příjmy. Zvažte rezervaci sportovišť v méně vytížených hodinách pro nižší ceny.",
+                "impact": "high",
+                "relevanceScore": 0.9
+            })
+        
+        if has_categories:
+            # Analýza nejúspěšnějších kategorií pro uživatele
+            if favorite_earning_category:
+                personalized_recommendations.append({
+                    "type": favorite_earning_category.lower(),
+                    "title": f"Maximalizujte zisky v {favorite_earning_category}",
+                    "description": f"Tato kategorie vám přináší nejvíce tokenů. Zaměřte se na další aktivity v kategorii {favorite_earning_category}.",
+                    "impact": "medium",
+                    "relevanceScore": 0.8
+                })
+        
+        # Doporučení na základě času aktivit
+        active_hours = rollup.active_hours(3)
+        if active_hours:
+            hour_str = ", ".join([f"{h}:00" for h in active_hours])
+            personalized_recommendations.append({
+                "type": "timing",
+                "title": "Optimální čas pro vaše aktivity",
+                "description": f"Vaše nejproduktivnější hodiny jsou kolem {hour_str}. Plánujte své aktivity v těchto časech pro maximální efektivitu.",
+                "impact": "low",
+                "relevanceScore": 0.7
+            })
+        
+        recommendations = {
+            "general": general_recommendations,
+            "personalized": personalized_recommendations
+        }
+        
+        return {
+            "summary": summary,
+            "patterns": patterns,
+            "predictions": predictions,
+            "recommendations": recommendations
+        }
+
+    def process_token_analysis_bulk(self, data: Dict[str, Any], options: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Analýza tokenů pro mnoho uživatelů v jednom volání
+
+        Transakce jsou v data.users ({userId: [transakce]}), v data.transactions
+        (transakce s userId) nebo v data.columnar se sloupcem user. Agregace
+        všech uživatelů se spočítají najednou seskupenými operacemi, pro každého
+        uživatele se pak sestaví stejný výsledek jako u token_analysis.
+        S options.stream se výsledky posílají po uživatelích jako částečné
+        zprávy a konečná odpověď obsahuje jen počty, jinak jsou v "results".
+        Modely predikce (options.forecast) se fitují pro všechny uživatele najednou.
+        """
+        from azr_columnar import output_format
+        from azr_deadline import check_deadline
+        from azr_stream import emit_partial
+
+        if not HAS_PANDAS:
+            return {"error": "Modul pandas není k dispozici pro analýzu tokenů."}
+
+        from azr_forecast import forecast_level, forecast_method, forecast_rollups
+        from azr_token_kernel import bulk_rollups, prediction_window
+
+        fmt = output_format(options)
+        prediction = prediction_window(options)
+        method = forecast_method(options)
+        level = forecast_level(options)
+        try:
+            user_ids, rollups = bulk_rollups(data)
+        except Exception as e:
+            return {"error": f"Chyba při analýze tokenů: {str(e)}"}
+
+        check_deadline("token_analysis_bulk: agregace")
+
+        forecasts = [None] * len(rollups)
+        if method != "baseline":
+            forecasts = forecast_rollups(rollups, method, level)
+            check_deadline("token_analysis_bulk: predikce")
+
+        stream = bool(options.get("stream"))
+        results = []
+        failed = 0
+        streamed = 0
+        for index, (user_id, rollup, forecast) in enumerate(zip(user_ids, rollups, forecasts)):
+            if index % BULK_CHECK_INTERVAL == 0:
+                check_deadline("token_analysis_bulk: uživatelé")
+            try:
+                if rollup.count == 0:
+                    user_result = self._empty_token_analysis()
+                else:
+                    user_result = self._token_analysis_result(rollup, {}, fmt, prediction, forecast)
+                message = {"userId": user_id, "success": True, "data": user_result}
+            except Exception as e:
+                failed += 1
+                message = {"userId": user_id, "success": False, "error": f"Chyba při analýze tokenů: {str(e)}"}
+
+            if stream and emit_partial(message):
+                streamed += 1
+            else:
+                results.append(message)
+
+        result = {"count": len(user_ids), "failed": failed, "streamed": streamed}
+        if results:
+            result["results"] = results
+        return result
+
+    def process_token_cube_refresh(self, data: Dict[str, Any], options: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Stavba nebo obnova předpočítané kostky součtů tokenů (viz azr_cube)
+
+        data.path je adresář kostky, nové transakce (s userId) jsou
+        v data.transactions nebo v exportu data.file jako u token_analysis.
+        Obnova přičte jen dny, které v kostce ještě nejsou; s data.rebuild
+        se kostka sestaví znovu jen z předaných transakcí.
+        """
+        from azr_deadline import check_deadline
+
+        if not HAS_PANDAS:
+            return {"error": "Modul pandas není k dispozici pro analýzu tokenů."}
+
+        from azr_cube import transaction_chunks, update_cube
+        from azr_reducer import DEFAULT_CHUNK_ROWS, export_chunks
+
+        path = data.get("path")
+        if not path:
+            return {"error": "Obnova kostky vyžaduje data.path"}
+        export = data.get("file")
+
+        def chunks():
+            if export:
+                for chunk, _ in export_chunks(export["path"], export.get("format"), export.get("shape", "bridge"),
+                                              int(export.get("chunkRows", DEFAULT_CHUNK_ROWS)), with_users=True):
+                    check_deadline("token_cube_refresh: blok souboru")
+                    yield chunk
+            else:
+                yield from transaction_chunks(data.get("transactions") or [])
+
+        try:
+            return update_cube(path, chunks(), bool(data.get("rebuild")))
+        except (OSError, ValueError) as e:
+            return {"error": f"Chyba při obnově kostky: {str(e)}"}
+
+    def process_token_anomaly(self, data: Dict[str, Any], options: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Proudová detekce anomálií v transakcích tokenů (viz azr_anomaly)
+
+        data.transactions jsou transakce ve tvaru token_transactions v pořadí
+        zápisu, stav peněženek zůstává v procesoru mezi dotazy. options.reset
+        začne s prázdným stavem a nastavením detektoru z options (klíče
+        azr_anomaly.DEFAULT_CONFIG).
+        """
+        from azr_anomaly import AnomalyDetector, anomaly_config
+
+        transactions = data.get("transactions") or []
+        # Reset i zpracování pracují s jedním detektorem, souběžný reset jiného
+        # dotazu nesmí přesměrovat statistiky odpovědi na jiný stav
+        try:
+            if options.get("reset"):
+                detector = AnomalyDetector.from_env(anomaly_config(options))
+                self.anomalies = detector
+            else:
+                detector = self.anomalies
+            anomalies = detector.observe_many(transactions)
+        except (TypeError, ValueError) as e:
+            return {"error": f"Chyba při detekci anomálií: {str(e)}"}
+        return {"anomalies": anomalies, "processed": len(transactions), "detector": detector.stats()}
+
+    def process_token_reconcile(self, data: Dict[str, Any], options: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Kontrola zůstatků token_wallets proti součtům token_transactions (viz azr_reconcile)
+
+        data.ledger je SQLite soubor s knihou pohybů a vodoznakem. Transakce
+        jsou v data.transactions, v exportu data.file ({"path", "format",
+        "chunkRows"}) nebo spolu se zůstatky v SQLite databázi data.database
+        ({"path"}); zůstatky v data.wallets nebo data.walletsFile. Bez
+        zůstatků se kniha jen doplní. options.rebuild sestaví knihu znovu,
+        options.limit omezí počet vypsaných peněženek.
+        """
+        from azr_deadline import check_deadline
+
+        if not HAS_PANDAS:
+            return {"error": "Modul pandas není k dispozici pro kontrolu zůstatků."}
+
+        import sqlite3
+
+        from azr_reconcile import (DEFAULT_REPORT_LIMIT, TRANSACTION_FIELDS, WALLET_FIELDS, LedgerStore,
+                                   database_chunks, file_chunks, reconcile, record_chunks, wallet_snapshot)
+
+        ledger = data.get("ledger")
+        if not ledger:
+            return {"error": "Kontrola zůstatků vyžaduje data.ledger"}
+        export = data.get("file")
+        database = data.get("database")
+        wallets_file = data.get("walletsFile")
+        rebuild = bool(options.get("rebuild"))
+
+        def checked(chunks):
+            for chunk in chunks:
+                check_deadline("token_reconcile: blok transakcí")
+                yield chunk
+
+        store = None
+        conn = None
+        try:
+            store = LedgerStore(ledger)
+            if database:
+                conn = sqlite3.connect(database["path"], isolation_level=None)
+                watermark = None if rebuild else store.state().get("watermark")
+                chunks, wallets = database_chunks(conn, watermark, database.get("chunkRows"))
+                snapshot = wallet_snapshot([wallets])
+            else:
+                if export:
+                    chunks = file_chunks(export["path"], TRANSACTION_FIELDS, export.get("format"),
+                                         export.get("chunkRows"))
+                else:
+                    chunks = record_chunks(data.get("transactions") or [], TRANSACTION_FIELDS)
+                snapshot = None
+                if wallets_file:
+                    snapshot = wallet_snapshot(file_chunks(wallets_file["path"], WALLET_FIELDS,
+                                                           wallets_file.get("format")))
+                elif data.get("wallets") is not None:
+                    snapshot = wallet_snapshot(record_chunks(data["wallets"], WALLET_FIELDS))
+            return reconcile(store, checked(chunks), snapshot, rebuild,
+                             int(options.get("limit", DEFAULT_REPORT_LIMIT)))
+        except (OSError, ValueError, KeyError, sqlite3.Error) as e:
+            return {"error": f"Chyba při kontrole zůstatků: {str(e)}"}
+        finally:
+            if conn is not None:
+                conn.close()
+            if store is not None:
+                store.close()
+
+    def process_text_vectorization(self, data: Dict[str, Any], options: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Vektorizace textu a podobnostní analýza
+        """
+        if not (HAS_NUMPY and HAS_SKLEARN):
+            return {"error": "Moduly sklearn a numpy nejsou k dispozici pro textovou analýzu."}
+
+        import numpy as np
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        from sklearn.metrics.pairwise import cosine_similarity
+        from azr_columnar import FORMAT_ROWS, encode_table, output_format
+        from azr_deadline import DEADLINE_CHECK_INTERVAL, check_deadline
+        from azr_shm import write_columns
+        
+        fmt = output_format(options)
+        texts = data.get("texts", [])
+        query = data.get("query", "")
+        
+        if not texts:
+            return {"error": "Žádné texty k analýze."}
+        
+        if not query:
+            return {"error": "Žádný dotaz pro porovnání."}
+        
+        # Vektorizace textů
+        tfidf = TfidfVectorizer()
+        all_texts = texts + [query]
+        tfidf_matrix = tfidf.fit_transform(all_texts)
+        
+        # Výpočet podobnosti
+        query_vector = tfidf_matrix[-1]
+        document_vectors = tfidf_matrix[:-1]
+        
+        # Podobnost mezi dotazem a dokumenty, po blocích kvůli kontrole časového limitu
+        check_deadline("text_vectorization: vektorizace")
+        blocks = []
+        for block in range(0, document_vectors.shape[0], DEADLINE_CHECK_INTERVAL):
+            check_deadline("text_vectorization: podobnost")
+            blocks.append(cosine_similarity(query_vector, document_vectors[block:block + DEADLINE_CHECK_INTERVAL])[0])
+        similarities = np.concatenate(blocks)
+        
+        # Velké výsledky jako pole do výstupní oblasti nebo jako tabulka v odpovědi:
+        # podobnost podle indexu dokumentu a pořadí indexů od nejpodobnějšího
+        if data.get("output") or fmt != FORMAT_ROWS:
+            order = np.argsort(-similarities, kind="stable")
+            top_index = int(order[0])
+            arrays = {"similarity": similarities, "order": order.astype(np.int64)}
+            result = {
+                "count": len(texts),
+                "topResult": {"index": top_index, "text": texts[top_index], "similarity": similarities[top_index]},
+                "featuresAnalyzed": len(tfidf.get_feature_names_out())
+            }
+            if data.get("output"):
+                result["arrays"] = write_columns(data["output"], arrays)
+            else:
+                result["columns"] = encode_table(arrays, fmt)
+            return result
+
+        # Seřazení výsledků podle podobnosti
+        check_deadline("text_vectorization: řazení")
+        ranked_results = [
+            {"index": idx, "text": texts[idx], "similarity": sim} 
+            for idx, sim in enumerate(similarities)
+        ]
+        ranked_results.sort(key=lambda x: x["similarity"], reverse=True)
+        
+        # Vrácení výsledku
+        return {
+            "results": ranked_results,
+            "topResult": ranked_results[0] if ranked_results else None,
+            "featuresAnalyzed": len(tfidf.get_feature_names_out())
+        }
+    
+    def process_app_analysis(self, query_text: str, options: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Zpracování analýzy aplikace na základě textového dotazu
+        
+        Tato metoda posoudí stav aplikace, její výhody a nevýhody, a poskytne
+        doporučení pro další vývoj. Využívá informace z různých částí systému.
+        """
+        # Zpracování dotazu
+        detailed = options.get("detailed", False)
+        include_rationale = options.get("include_rationale", False)
+        
+        # Základní analýza aplikace
+        try:
+            # Import a volání skriptu pro analýzu
+            import subprocess
+            import json
+            
+            # Spustíme skript pro analýzu aplikace
+            result = subprocess.run(
+                ["python3", "app_analysis.py"], 
+                capture_output=True, 
+                text=True, 
+                check=True
+            )
+            
+            # Parsování výstupu
+            analysis_data = json.loads(result.stdout)
+            
+            # Příprava odpovědi
+            response = {
+                "title": "Analýza aplikace SportMatch",
+                "timestamp": analysis_data.get("timestamp"),
+                "summary": analysis_data.get("summary", ""),
+                "strengths": analysis_data.get("strengths", []),
+                "recommendations": analysis_data.get("recommendations", []),
+                "query_context": {
+                    "query": query_text,
+                    "detailed": detailed,
+                    "include_rationale": include_rationale
+                }
+            }
+            
+            # Přidání podrobné zprávy, pokud je vyžádána
+            if detailed:
+                metrics = {
+                    "czech_pages_count": analysis_data.get("structure", {}).get("czech_pages_count", 0),
+                    "english_pages_count": analysis_data.get("structure", {}).get("english_pages_count", 0),
+                    "components_count": analysis_data.get("structure", {}).get("components_count", 0),
+                    "coverage_ratio": analysis_data.get("structure", {}).get("czech_pages_count", 0) / 
+                                     max(1, analysis_data.get("structure", {}).get("english_pages_count", 1))
+                }
+                response["metrics"] = metrics
+            
+            # Interpretace dotazu a příprava kontextové odpovědi
+            if "české verze" in query_text.lower() or "lokalizace" in query_text.lower():
+                response["contextual_answer"] = self._analyze_localization(analysis_data)
+            elif "uživatelský zážitek" in query_text.lower() or "ui" in query_text.lower():
+                response["contextual_answer"] = self._analyze_user_experience(analysis_data)
+            else:
+                response["contextual_answer"] = "Analýza celkového stavu aplikace SportMatch ukazuje, že " + \
+                                              f"aplikace má {len(analysis_data.get('strengths', []))} silných stránek a " + \
+                                              f"{len(analysis_data.get('recommendations', []))} doporučení pro zlepšení."
+            
+            return response
+            
+        except Exception as e:
+            # Záložní odpověď v případě selhání analýzy
+            return {
+                "title": "Zjednodušená analýza aplikace SportMatch",
+                "summary": "Podrobná analýza nebyla možná kvůli technickým problémům.",
+                "error": str(e),
+                "recommendations": [
+                    {"title": "Rozšířit českou lokalizaci", 
+                     "description": "Dokončit překlad všech stránek do češtiny."},
+                    {"title": "Optimalizace načítání obrázků",
+                     "description": "Implementovat lazy loading a placeholdery pro všechny obrázky v aplikaci."},
+                    {"title": "Zlepšit zpracování chyb",
+                     "description": "Přidat více informativní chybové hlášky pro lepší diagnostiku problémů."}
+                ]
+            }
+    
+    def _analyze_localization(self, analysis_data: Dict[str, Any]) -> str:
+        """Pomocná metoda pro analýzu stavu lokalizace"""
+        czech_pages = analysis_data.get("structure", {}).get("czech_pages_count", 0)
+        english_pages = analysis_data.get("structure", {}).get("english_pages_count", 0)
+        
+        if czech_pages >= english_pages * 0.9:
+            return "Česká lokalizace je na velmi dobré úrovni, pokrývá většinu obsahu aplikace."
+        elif czech_pages >= english_pages * 0.7:
+            return "Česká lokalizace je na dobré cestě, ale stále chybí přeložit některé stránky."
+        else:
+            return "Česká lokalizace má značné mezery, je třeba dokončit překlad většího množství stránek."
+    
+    def _analyze_user_experience(self, analysis_data: Dict[str, Any]) -> str:
+        """Pomocná metoda pro analýzu uživatelského zážitku"""
+        design_system_usage = analysis_data.get("ui", {}).get("design_system_usage", 0)
+        
+        if design_system_usage >= 30:
+            return "Uživatelské rozhraní aplikace je konzistentní, využívá designový systém ve většině komponent."
+        elif design_system_usage >= 15:
+            return "Designový systém je částečně implementován, ale některé části UI nejsou zcela konzistentní."
+        else:
+            return "Uživatelské rozhraní není konzistentní, je třeba více používat komponenty z designového systému."
+            
+    def get_capabilities(self) -> Dict[str, Any]:
+        """
+        Získání schopností AZR modulu
+        """
+        from azr_columnar import available_formats
+
+        return {**MODULE_CAPABILITIES, "output_formats": available_formats()}
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Získání metrik zpracování dotazů a stavu mezipaměti
+        """
+        return {**self.metrics.snapshot(), "cache": self.cache.stats(), "rollups": self.rollups.stats(),
+                "anomalies": self.anomalies.stats()}
+
+    def warm_up(self, preload: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Zahřátí procesoru před přijímáním dotazů v dlouhodobě běžícím režimu
+
+        Volitelně předem importuje zadané moduly, aby první dotaz nečekal na jejich načtení.
+        Procesor se volá přímo, zahřátí se tak neobjeví v metrikách ani v mezipaměti.
+        """
+        started = time.perf_counter()
+        imports = preload_modules(preload or [])
+        self.wrap_result(self.dispatch("azr_capabilities", {"type": "azr_capabilities"}, {}, {}))
+        return {
+            "warmupMs": round((time.perf_counter() - started) * 1000, 3),
+            "preloadedModules": imports
+        }
+
+# Verze protokolu dlouhodobě běžícího režimu (--serve)
+SERVE_PROTOCOL_VERSION = 2
+
+def parse_serve_line(line: Union[str, bytes], codec=None) -> Optional[Dict[str, Any]]:
+    """
+    Načtení jedné zprávy protokolu dlouhodobě běžícího režimu
+
+    Zpráva obsahuje dotaz ve tvaru {"id": ..., "type": ..., "data": ..., "options": ...}
+    zakódovaný kodekem spojení (výchozí json). Vrací dotaz, případně chybovou
+    odpověď s příznakem "invalid" pro neplatnou zprávu. Prázdné řádky vrací None.
+    """
+    if codec is None:
+        codec = get_codec("json")
+    if not codec.binary:
+        line = line.strip()
+        if not line:
+            return None
+
+    try:
+        query = codec.decode(line)
+    except ValueError as e:
+        label = "Neplatný JSON" if not codec.binary else f"Neplatná zpráva {codec.name}"
+        return {"invalid": True, "id": None, "success": False, "error": f"{label}: {str(e)}"}
+
+    if not isinstance(query, dict):
+        return {"invalid": True, "id": None, "success": False, "error": "Dotaz musí být objekt"}
+
+    return query
+
+def serve_stream(processor: AZRProcessor, infile, outfile, lock=None,
+                 warmup: Optional[Dict[str, Any]] = None, pool=None, codec=None) -> None:
+    """
+    Dlouhodobě běžící režim nad binárními proudy (stdin/stdout nebo socket)
+
+    Po zahřátí procesoru odešle zprávu s potvrzením připravenosti a poté čte
+    dotazy až do konce vstupu. Na každý dotaz odpoví právě jednou konečnou
+    zprávou, hodnota "id" z dotazu se beze změny vrací v odpovědi. Dotazy
+    s options.stream před ní mohou poslat částečné zprávy ("partial": true).
+
+    Zprávy kóduje `codec` (výchozí podle AZR_CODEC). Dotazem typu "codec"
+    s data.codec si klient může kodek spojení změnit, potvrzení přijde ještě
+    ve starém kodeku a všechny další zprávy v obou směrech už v novém.
+
+    Pokud je procesor už zahřátý, předává se výsledek zahřátí v `warmup`.
+    Volitelný zámek serializuje přístup ke sdílenému procesoru. S `pool`
+    (AZRWorkerPool) se dotazy zpracovávají souběžně a odpovědi se zapisují
+    v pořadí dokončení, párovat je lze podle "id".
+    """
+    import threading
+
+    if warmup is None:
+        warmup = processor.warm_up()
+    if codec is None:
+        codec = get_codec(default_codec_name())
+
+    write_lock = threading.Lock()
+    connection = {"codec": codec}
+
+    def write(message: Dict[str, Any], query_type: Optional[str] = None) -> None:
+        started = time.perf_counter()
+        encoded = frame(connection["codec"], connection["codec"].encode(message))
+        if query_type is not None:
+            processor.metrics.observe_encode(query_type, (time.perf_counter() - started) * 1000, len(encoded))
+        with write_lock:
+            outfile.write(encoded)
+            outfile.flush()
+
+    write({
+        "ready": True,
+        "protocol": SERVE_PROTOCOL_VERSION,
+        "pid": os.getpid(),
+        "codec": codec.name,
+        "codecs": available_codecs(),
+        "capabilities": processor.get_capabilities(),
+        **warmup
+    })
+
+    pending = set()
+    pending_changed = threading.Condition()
+
+    def wait_pending() -> None:
+        with pending_changed:
+            pending_changed.wait_for(lambda: not pending)
+
+    messages = read_messages(infile, codec)
+    while True:
+        payload = next(messages, None)
+        if payload is None:
+            break
+        started = time.perf_counter()
+        query = parse_serve_line(payload, connection["codec"])
+        if query is None:
+            continue
+        if query.pop("invalid", False):
+            write(query)
+            continue
+
+        request_id = query.get("id")
+        query_type = query.get("type", "unknown")
+        processor.metrics.observe_decode(query_type, (time.perf_counter() - started) * 1000, len(payload))
+
+        if query_type == "codec":
+            # Odpovědi na dříve přijaté dotazy musí odejít ještě ve starém kodeku
+            wait_pending()
+            try:
+                new_codec = get_codec((query.get("data") or {}).get("codec"))
+            except ValueError as e:
+                write({"id": request_id, "success": False, "error": str(e)}, query_type)
+                continue
+            write({"id": request_id, "success": True, "data": {"codec": new_codec.name}}, query_type)
+            connection["codec"] = new_codec
+            messages = read_messages(infile, new_codec)
+            continue
+
+        # Metriky poolu a stavové dotazy se zpracují v tomto procesu (viz azr_pool.runs_in_parent)
+        if pool is not None and not pool.runs_in_parent(query):
+            future = pool.submit(
+                query, lambda message, request_id=request_id, query_type=query_type:
+                    write({"id": request_id, **message}, query_type)
+            )
+            with pending_changed:
+                pending.add(future)
+
+            def on_done(done, request_id=request_id, query_type=query_type):
+                try:
+                    write({"id": request_id, **done.result()}, query_type)
+                except (BrokenPipeError, ConnectionResetError, ValueError):
+                    pass
+                finally:
+                    with pending_changed:
+                        pending.discard(done)
+                        pending_changed.notify_all()
+
+            future.add_done_callback(on_done)
+            continue
+
+        def emit(message, request_id=request_id, query_type=query_type):
+            write({"id": request_id, **message}, query_type)
+
+        if lock is not None:
+            with lock:
+                response = processor.process_query(query, emit)
+        else:
+            response = processor.process_query(query, emit)
+        write({"id": request_id, **response}, query_type)
+
+    # Dokončení rozpracovaných dotazů před ukončením
+    wait_pending()
+
+def serve_unix_socket(processor: AZRProcessor, socket_path: str,
+                      warmup: Optional[Dict[str, Any]] = None, pool=None, codec=None) -> None:
+    """
+    Dlouhodobě běžící režim naslouchající na Unix socketu
+
+    Každé spojení používá stejný protokol jako režim nad stdin/stdout včetně
+    úvodního potvrzení připravenosti a vlastní volby kodeku. Bez poolu sdílí
+    dotazy ze všech spojení jeden zahřátý procesor, jeho volání jsou proto
+    serializována zámkem.
+    """
+    import socketserver
+    import threading
+
+    processor_lock = threading.Lock()
+    if warmup is None:
+        warmup = processor.warm_up()
+
+    class StreamHandler(socketserver.StreamRequestHandler):
+        def handle(self):
+            try:
+                serve_stream(processor, self.rfile, self.wfile, processor_lock, warmup, pool, codec)
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+
+    with socketserver.ThreadingUnixStreamServer(socket_path, StreamHandler) as server:
+        server.daemon_threads = True
+        print(f"AZR bridge naslouchá na {socket_path}", file=sys.stderr)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.unlink(socket_path)
+
+def read_query(source: tuple, codec) -> Any:
+    """
+    Načtení jednorázového dotazu ze zdroje ("argv", text), ("file", cesta)
+    nebo ("shm", název, velikost)
+
+    Argument příkazové řádky je vždy text, ze souboru, stdin a sdílené paměti
+    se čte binárně ve formátu kodeku. Chyby čtení vyvolávají OSError,
+    neplatná data ValueError.
+    """
+    kind = source[0]
+    if kind == "argv":
+        input_codec = codec if not codec.binary else get_codec("auto")
+        return input_codec.decode(source[1])
+    if kind == "shm":
+        from azr_shm import read_message
+
+        return read_message(source[1], codec, source[2])
+    if source[1] == "-":
+        return codec.decode_stream(sys.stdin.buffer)
+    with open(source[1], "rb") as f:
+        return codec.decode_stream(f)
+
+def main():
+    """
+    Hlavní funkce zpracovávající AZR dotaz z Node.js
+
+    Použití:
+        python azr_bridge.py <query_json>                  jednorázový dotaz
+        python azr_bridge.py -                             jednorázový dotaz ze stdin
+        python azr_bridge.py --input <soubor>              jednorázový dotaz ze souboru
+        python azr_bridge.py --input-shm <název>           jednorázový dotaz ze sdílené paměti
+        python azr_bridge.py --serve                       dotazy ze stdin
+        python azr_bridge.py --serve --socket <cesta>      dotazy z Unix socketu
+        python azr_bridge.py --serve --workers <n>         dotazy zpracovává pool procesů
+        python azr_bridge.py --serve --codec msgpack       binární rámcované zprávy
+
+    Kodek jednorázového dotazu i výchozí kodek režimu --serve určuje proměnná
+    prostředí AZR_CODEC (json, orjson, msgpack, auto; výchozí auto). Velké
+    dotazy je lepší předávat přes stdin, soubor nebo sdílenou paměť, argument
+    příkazové řádky je omezen velikostí argv.
+    """
+    if "--serve" in sys.argv[1:]:
+        import argparse
+
+        parser = argparse.ArgumentParser(description='AZR bridge - dlouhodobě běžící režim')
+        parser.add_argument('--serve', action='store_true', required=True,
+                            help='Udržuje jeden zahřátý procesor a čte dotazy ze vstupu')
+        parser.add_argument('--socket', type=str, default=None,
+                            help='Cesta k Unix socketu (default: stdin/stdout)')
+        parser.add_argument('--codec', type=str, default=default_codec_name(),
+                            help='Kodek zpráv: json, orjson, msgpack nebo auto (default: AZR_CODEC nebo auto)')
+        parser.add_argument('--preload', type=str, default='numpy,pandas,sklearn',
+                            help='Moduly importované při zahřátí, oddělené čárkou (default: numpy,pandas,sklearn)')
+        parser.add_argument('--workers', type=int, default=0,
+                            help='Počet pracovních procesů, 0 = bez poolu (default: 0)')
+        parser.add_argument('--queue-depth', type=int, default=64,
+                            help='Maximální počet dotazů čekajících na pracovní proces (default: 64)')
+        parser.add_argument('--deadline-grace-ms', type=float, default=500.0,
+                            help='Tolerance po uplynutí options.deadlineMs, než je pracovní proces nahrazen (default: 500)')
+        parser.add_argument('--metrics-file', type=str, default=None,
+                            help='Soubor pro periodický zápis metrik ve formátu Prometheus')
+        parser.add_argument('--metrics-interval', type=float, default=15.0,
+                            help='Interval zápisu metrik v sekundách (default: 15)')
+        args = parser.parse_args()
+
+        try:
+            codec = get_codec(args.codec)
+        except ValueError as e:
+            parser.error(str(e))
+
+        preload = [name for name in args.preload.split(",") if name]
+        processor = AZRProcessor()
+        if args.metrics_file:
+            processor.metrics.start_file_exporter(args.metrics_file, args.metrics_interval)
+        pool = None
+        if args.workers > 0:
+            from azr_pool import AZRWorkerPool
+
+            pool = AZRWorkerPool(args.workers, args.queue_depth, preload, metrics=processor.metrics,
+                                 deadline_grace_ms=args.deadline_grace_ms)
+            warmup = pool.start()
+        else:
+            warmup = processor.warm_up(preload)
+
+        try:
+            if args.socket:
+                serve_unix_socket(processor, args.socket, warmup, pool, codec)
+            else:
+                serve_stream(processor, sys.stdin.buffer, sys.stdout.buffer, warmup=warmup, pool=pool, codec=codec)
+        finally:
+            if pool is not None:
+                pool.close()
+        return
+
+    # Dotaz v argumentu příkazové řádky je malý, "auto" pro něj volí json:
+    # import orjson by trval déle než samotné dekódování a kódování odpovědi
+    codec_name = default_codec_name()
+    if codec_name.lower() == "auto" and len(sys.argv) == 2 and sys.argv[1] != "-" \
+            and not sys.argv[1].startswith("--"):
+        codec_name = "json"
+    try:
+        codec = get_codec(codec_name)
+    except ValueError as e:
+        print(json.dumps({"success": False, "error": str(e)}))
+        sys.exit(1)
+
+    def output(message: Dict[str, Any]) -> None:
+        sys.stdout.buffer.write(frame(codec, codec.encode(message)))
+        sys.stdout.buffer.flush()
+
+    # Načtení dotazu
+    if len(sys.argv) == 2 and not sys.argv[1].startswith("--"):
+        if sys.argv[1] == "-":
+            source = ("file", "-")
+        else:
+            source = ("argv", sys.argv[1])
+    elif len(sys.argv) > 2 and sys.argv[1] in ("--input", "--input-shm"):
+        import argparse
+
+        parser = argparse.ArgumentParser(description='AZR bridge - jednorázový dotaz')
+        inputs = parser.add_mutually_exclusive_group(required=True)
+        inputs.add_argument('--input', type=str,
+                            help='Soubor s dotazem, "-" pro stdin (také /dev/fd/<n> pro předaný deskriptor)')
+        inputs.add_argument('--input-shm', type=str,
+                            help='Název segmentu sdílené paměti s dotazem')
+        parser.add_argument('--input-size', type=int, default=None,
+                            help='Velikost dat v segmentu sdílené paměti v bajtech')
+        args = parser.parse_args()
+        source = ("shm", args.input_shm, args.input_size) if args.input_shm else ("file", args.input)
+    else:
+        output({
+            "success": False,
+            "error": "Nesprávný počet parametrů. Očekává se: python azr_bridge.py <query_json> | - | --input <soubor> | --input-shm <název>"
+        })
+        sys.exit(1)
+
+    try:
+        query = read_query(source, codec)
+    except OSError as e:
+        output({
+            "success": False,
+            "error": f"Dotaz nelze načíst: {str(e)}"
+        })
+        sys.exit(1)
+    except ValueError as e:
+        output({
+            "success": False,
+            "error": f"Neplatný JSON: {str(e)}" if not codec.binary else f"Neplatná zpráva {codec.name}: {str(e)}"
+        })
+        sys.exit(1)
+
+    # Zpracování dotazu (částečné výsledky s options.stream a průběh s
+    # options.progress jdou na výstup průběžně).
+    # Paměťová mezipaměť by jednorázový proces nepřežila, použije se jen
+    # perzistentní (AZR_CACHE_PATH).
+    cache = ResultCache.from_env() if os.environ.get("AZR_CACHE_PATH") else ResultCache(max_entries=0)
+    processor = AZRProcessor(cache=cache)
+    options = query.get("options") if isinstance(query, dict) else None
+    streaming = isinstance(options, dict) and bool(options.get("stream") or options.get("progress"))
+    result = processor.process_query(query, output if streaming else None)
+
+    # Výstup výsledku
+    output(result)
@@ -0,0 +1,227 @@
+"""
+AZR Profiling - volitelné profilování procesorů AZR dotazů
+
+Profilování se zapíná pro jednotlivý dotaz volbou options.profile, nebo
+globálně proměnnou prostředí AZR_PROFILE s podílem náhodně vybraných
+dotazů (např. 0.01 = 1 %). Funguje stejně v jednorázovém i dlouhodobě
+běžícím režimu, protože obaluje samotné volání procesoru.
+
+Režimy:
+    "cprofile" (nebo true)   deterministický cProfile, zapisuje .pstats
+                             (např. pro snakeviz, flameprof, gprof2dot)
+    "sample"                 vzorkování zásobníku vlákna, zapisuje .collapsed
+                             soubor pro flamegraph.pl / speedscope
+
+Do odpovědi se přidá souhrn funkcí s nejvyšším vlastním časem v meta.profile.
+"""
+
+import os
+import random
+import re
+import sys
+import threading
+import time
+from typing import Dict, Any, Callable, List, Optional, Tuple
+
+# Výchozí adresář pro výstupy profilování
+DEFAULT_PROFILE_DIR = os.path.join(os.environ.get("TMPDIR", "/tmp"), "azr-profiles")
+
+# Výchozí počet funkcí v souhrnu
+DEFAULT_TOP = 15
+
+def _frame_label(code) -> str:
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}:{code.co_firstlineno}"
+
+class StackSampler:
+    """
+    Vzorkovač zásobníku jednoho vlákna pro collapsed-stack výstup
+    """
+    def __init__(self, thread_id: int, interval: float = 0.001):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Dict[str, int] = {}
+        self.samples = 0
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="azr-profile-sampler", daemon=True)
+
+    def _run(self) -> None:
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            labels = []
+            while frame is not None:
+                labels.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            stack = ";".join(reversed(labels))
+            self.stacks[stack] = self.stacks.get(stack, 0) + 1
+            self.samples += 1
+
+    def start(self) -> None:
+        self.thread.start()
+
+    def stop(self) -> None:
+        self.stopped.set()
+        self.thread.join()
+
+    def write_collapsed(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in sorted(self.stacks.items()):
+                f.write(f"{stack} {count}\n")
+
+    def top_functions(self, top: int) -> List[Dict[str, Any]]:
+        """Funkce s nejvíce vzorky na vrcholu zásobníku"""
+        self_counts: Dict[str, int] = {}
+        for stack, count in self.stacks.items():
+            leaf = stack.rsplit(";", 1)[-1]
+            self_counts[leaf] = self_counts.get(leaf, 0) + count
+        ranked = sorted(self_counts.items(), key=lambda item: item[1], reverse=True)[:top]
+        return [
+            {"function": label, "samples": count,
+             "share": round(count / self.samples, 4) if self.samples else 0.0}
+            for label, count in ranked
+        ]
+
+class HandlerProfiler:
+    """
+    Obalení volání procesoru profilerem a uložení výsledků
+    """
+    def __init__(self, sample_rate: float = 0.0, output_dir: str = DEFAULT_PROFILE_DIR,
+                 top: int = DEFAULT_TOP, sample_interval: float = 0.001):
+        self.sample_rate = sample_rate
+        self.output_dir = output_dir
+        self.top = top
+        self.sample_interval = sample_interval
+        self.counter = 0
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "HandlerProfiler":
+        """
+        Vytvoření profileru podle proměnných prostředí
+
+        AZR_PROFILE (podíl profilovaných dotazů 0-1), AZR_PROFILE_DIR (adresář
+        výstupů) a AZR_PROFILE_TOP (počet funkcí v souhrnu).
+        """
+        try:
+            sample_rate = float(os.environ.get("AZR_PROFILE", 0) or 0)
+        except ValueError:
+            sample_rate = 0.0
+        return cls(
+            sample_rate=min(max(sample_rate, 0.0), 1.0),
+            output_dir=os.environ.get("AZR_PROFILE_DIR", DEFAULT_PROFILE_DIR),
+            top=int(os.environ.get("AZR_PROFILE_TOP", DEFAULT_TOP))
+        )
+
+    def mode_for(self, options: Dict[str, Any]) -> Optional[str]:
+        """
+        Režim profilování pro dotaz, None pokud se profilovat nemá
+        """
+        requested = options.get("profile")
+        if requested is True or requested in ("cprofile", "pstats"):
+            return "cprofile"
+        if requested in ("sample", "collapsed"):
+            return "sample"
+        if requested is False:
+            return None
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            return "cprofile"
+        return None
+
+    def _output_path(self, query_type: str, extension: str) -> str:
+        with self.lock:
+            self.counter += 1
+            counter = self.counter
+        safe_type = re.sub(r"[^A-Za-z0-9_-]", "_", str(query_type))[:64] or "unknown"
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        os.makedirs(self.output_dir, exist_ok=True)
+        return os.path.join(self.output_dir, f"{safe_type}-{stamp}-{os.getpid()}-{counter}.{extension}")
+
+    def run(self, mode: str, query_type: str, func: Callable[[], Any]) -> Tuple[Any, Dict[str, Any]]:
+        """
+        Spuštění funkce pod profilerem
+
+        Vrací dvojici (výsledek, souhrn profilu). Výjimka z funkce se po
+        uložení profilu předá dál a souhrn se v ní uloží jako `azr_profile`.
+        """
+        if mode == "sample":
+            return self._run_sampled(query_type, func)
+        return self._run_cprofile(query_type, func)
+
+    def _run_cprofile(self, query_type: str, func: Callable[[], Any]) -> Tuple[Any, Dict[str, Any]]:
+        import cProfile
+        import pstats
+
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        error = None
+        result = None
+        try:
+            profiler.enable()
+        except ValueError as e:
+            # Jiný profiler už běží (souběžně profilovaný dotaz v jiném vlákně)
+            return func(), {"mode": "cprofile", "skipped": str(e)}
+        try:
+            result = func()
+        except Exception as e:
+            error = e
+        finally:
+            profiler.disable()
+        duration_ms = (time.perf_counter() - started) * 1000
+
+        summary: Dict[str, Any] = {"mode": "cprofile", "durationMs": round(duration_ms, 3)}
+        try:
+            path = self._output_path(query_type, "pstats")
+            profiler.dump_stats(path)
+            summary["file"] = path
+        except OSError as e:
+            summary["writeError"] = str(e)
+
+        stats = pstats.Stats(profiler)
+        ranked = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)[:self.top]
+        summary["top"] = [
+            {
+                "function": f"{os.path.basename(filename)}:{name}:{line}",
+                "calls": primitive_calls,
+                "totalMs": round(total_time * 1000, 3),
+                "cumulativeMs": round(cumulative_time * 1000, 3)
+            }
+            for (filename, line, name), (primitive_calls, _, total_time, cumulative_time, _) in ranked
+        ]
+
+        if error is not None:
+            error.azr_profile = summary
+            raise error
+        return result, summary
+
+    def _run_sampled(self, query_type: str, func: Callable[[], Any]) -> Tuple[Any, Dict[str, Any]]:
+        sampler = StackSampler(threading.get_ident(), self.sample_interval)
+        started = time.perf_counter()
+        error = None
+        result = None
+        sampler.start()
+        try:
+            result = func()
+        except Exception as e:
+            error = e
+        finally:
+            sampler.stop()
+        duration_ms = (time.perf_counter() - started) * 1000
+
+        summary: Dict[str, Any] = {
+            "mode": "sample",
+            "durationMs": round(duration_ms, 3),
+            "samples": sampler.samples
+        }
+        try:
+            path = self._output_path(query_type, "collapsed")
+            sampler.write_collapsed(path)
+            summary["file"] = path
+        except OSError as e:
+            summary["writeError"] = str(e)
+        summary["top"] = sampler.top_functions(self.top)
+
+        if error is not None:
+            error.azr_profile = summary
+            raise error
+        return result, summary
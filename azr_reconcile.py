@@ -0,0 +1,478 @@
+#!/usr/bin/env python3
+"""
+AZR Reconcile - kontrola zůstatků peněženek proti transakcím tokenů
+
+token_wallets.balance je denormalizovaný součet pohybů peněženky: musí se
+rovnat součtu příchozích (to_wallet_id) minus součtu odchozích
+(from_wallet_id) částek v token_transactions. Kontrola čte transakce po
+blocích, každý blok vektorově sečte po peněženkách a součty přičte do
+knihy pohybů (ledger) v SQLite souboru. Zůstatky ze snímku token_wallets se
+pak porovnají s knihou a odpověď vypíše nesouhlasící peněženky.
+
+Kniha si pamatuje vodoznak (čas poslední započítané transakce) a id
+transakcí s tímto časem, další běh proto započítá jen novější transakce
+(stejně jako inkrementální token_analysis, viz azr_rollups). U zdroje
+SQLite se vodoznak uplatní přímo v dotazu, čte se jen přírůstek; export
+v souboru se přečte celý, ale sčítá se jen přírůstek. Transakce vložené
+později se starším created_at se nezapočítají, občas je proto vhodné knihu
+sestavit znovu (rebuild).
+
+Snímek zůstatků musí odpovídat stejnému okamžiku jako transakce (jeden
+export nebo jedna čtecí transakce databáze, viz database_chunks).
+
+Jako náhradu Postgres lze z exportů naplnit SQLite databázi se stejnými
+tabulkami (load). Použití:
+    python azr_reconcile.py load stand-in.db --transactions tx.jsonl --wallets wallets.csv
+    python azr_reconcile.py run ledger.db --database stand-in.db
+    python azr_reconcile.py run ledger.db --transactions tx.jsonl --wallets wallets.csv
+"""
+
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+# Verze formátu knihy pohybů, zvýšit při změně tabulek
+LEDGER_FORMAT_VERSION = 1
+
+# Výchozí počet vypsaných nesouhlasících peněženek
+DEFAULT_REPORT_LIMIT = 100
+
+TRANSACTION_FIELDS = ["id", "from_wallet_id", "to_wallet_id", "amount", "created_at"]
+WALLET_FIELDS = ["id", "balance"]
+
+def timestamp_text(value_ns: int) -> str:
+    """
+    Čas v ns jako ISO řetězec pevné délky (po mikrosekundy), řetězce se
+    tak v SQLite porovnávají ve stejném pořadí jako časy
+    """
+    import numpy as np
+
+    return str(np.datetime_as_string(np.int64(value_ns).view("datetime64[ns]"), unit="us"))
+
+def _wallet_ids(values: Any) -> Any:
+    """Id peněženek jako řetězce (stejně jako v knize), chybějící jako None"""
+    import pandas as pd
+
+    return pd.Series(values, dtype=object).map(str, na_action="ignore").to_numpy()
+
+def _integer_amounts(values: Any, name: str) -> Any:
+    """Celočíselný sloupec částek, chybějící nebo neceločíselné hodnoty vyvolají ValueError"""
+    import numpy as np
+    import pandas as pd
+
+    numbers = pd.to_numeric(pd.Series(values), errors="coerce").to_numpy()
+    if np.isnan(numbers.astype(np.float64)).any():
+        raise ValueError(f"Sloupec {name} obsahuje chybějící nebo nečíselné hodnoty")
+    if numbers.dtype.kind == "f":
+        if (numbers != np.floor(numbers)).any():
+            raise ValueError(f"Sloupec {name} obsahuje neceločíselné hodnoty")
+    return numbers.astype(np.int64)
+
+def _has_id(value: Any) -> bool:
+    return value is not None and value == value
+
+class FlowDelta:
+    """
+    Součty pohybů po peněženkách z transakcí novějších než vodoznak knihy
+    """
+    def __init__(self, boundary_ns: Optional[int] = None, boundary_ids: Optional[List[str]] = None):
+        self.boundary_ns = boundary_ns
+        self.boundary_ids = set(boundary_ids or [])
+        self.last_ns = boundary_ns
+        self.last_ids = set(self.boundary_ids)
+        self.flows = None
+        self.applied = 0
+        self.skipped = 0
+
+    def add(self, chunk: Any) -> None:
+        """
+        Přičtení bloku transakcí (DataFrame se sloupci TRANSACTION_FIELDS)
+        """
+        import numpy as np
+        import pandas as pd
+        from azr_token_kernel import NAT, _column_timestamps
+
+        if not len(chunk):
+            return
+        timestamps = _column_timestamps(chunk["created_at"].to_numpy())[0]
+        if (timestamps == NAT).any():
+            raise ValueError("Transakce bez created_at nelze zařadit podle vodoznaku")
+        ids = chunk["id"].to_numpy()
+
+        keep = None
+        if self.boundary_ns is not None:
+            keep = timestamps > self.boundary_ns
+            for position in np.flatnonzero(timestamps == self.boundary_ns).tolist():
+                keep[position] = _has_id(ids[position]) and str(ids[position]) not in self.boundary_ids
+            self.skipped += int(len(keep) - keep.sum())
+            if not keep.any():
+                return
+            timestamps = timestamps[keep]
+            ids = ids[keep]
+            chunk = chunk[keep]
+
+        amounts = _integer_amounts(chunk["amount"].to_numpy(), "amount")
+        receivers = _wallet_ids(chunk["to_wallet_id"].to_numpy())
+        senders = _wallet_ids(chunk["from_wallet_id"].to_numpy())
+        zeros = np.zeros(len(amounts), dtype=np.int64)
+        moves = pd.DataFrame({
+            "wallet_id": np.concatenate([receivers, senders]),
+            "inflow": np.concatenate([amounts, zeros]),
+            "outflow": np.concatenate([zeros, amounts]),
+            "transactions": np.ones(2 * len(amounts), dtype=np.int64)
+        })
+        sums = moves[moves["wallet_id"].notna()].groupby("wallet_id", sort=False).sum()
+        self.flows = sums if self.flows is None else pd.concat([self.flows, sums]).groupby(level=0, sort=False).sum()
+        self.applied += len(amounts)
+
+        # Nový vodoznak a id transakcí s jeho časem pro odfiltrování v dalším běhu
+        latest = int(timestamps.max())
+        latest_ids = {str(ids[position]) for position in np.flatnonzero(timestamps == latest).tolist()
+                      if _has_id(ids[position])}
+        if self.last_ns is None or latest > self.last_ns:
+            self.last_ns, self.last_ids = latest, latest_ids
+        elif latest == self.last_ns:
+            self.last_ids |= latest_ids
+
+class LedgerStore:
+    """
+    Kniha pohybů peněženek v SQLite souboru
+
+    Přírůstek se zapisuje v transakci BEGIN IMMEDIATE spolu s vodoznakem;
+    souběžný běh, který mezitím posunul vodoznak, vyvolá ValueError
+    a kniha zůstane beze změny.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=5.0, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS wallet_flows ("
+            " wallet_id TEXT PRIMARY KEY,"
+            " inflow INTEGER NOT NULL,"
+            " outflow INTEGER NOT NULL,"
+            " transactions INTEGER NOT NULL)"
+        )
+        self.conn.execute("CREATE TABLE IF NOT EXISTS ledger_state (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        if self._state().get("version", LEDGER_FORMAT_VERSION) != LEDGER_FORMAT_VERSION:
+            self.clear()
+
+    def _state(self) -> Dict[str, Any]:
+        rows = self.conn.execute("SELECT key, value FROM ledger_state").fetchall()
+        return {key: json.loads(value) for key, value in rows}
+
+    def state(self) -> Dict[str, Any]:
+        """Vodoznak (ns), id transakcí s jeho časem a počet započítaných transakcí"""
+        with self.lock:
+            return self._state()
+
+    def clear(self) -> None:
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            self.conn.execute("DELETE FROM wallet_flows")
+            self.conn.execute("DELETE FROM ledger_state")
+            self.conn.execute("COMMIT")
+
+    def apply(self, delta: FlowDelta) -> Dict[str, Any]:
+        """
+        Přičtení přírůstku a posun vodoznaku, vrací nový stav knihy
+        """
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                state = self._state()
+                if state.get("watermark") != delta.boundary_ns:
+                    raise ValueError("Kniha pohybů byla mezitím změněna jiným během, spusťte kontrolu znovu")
+                if delta.flows is not None:
+                    self.conn.executemany(
+                        "INSERT INTO wallet_flows (wallet_id, inflow, outflow, transactions) VALUES (?, ?, ?, ?)"
+                        " ON CONFLICT(wallet_id) DO UPDATE SET"
+                        " inflow = inflow + excluded.inflow,"
+                        " outflow = outflow + excluded.outflow,"
+                        " transactions = transactions + excluded.transactions",
+                        zip(delta.flows.index.tolist(), delta.flows["inflow"].tolist(),
+                            delta.flows["outflow"].tolist(), delta.flows["transactions"].tolist())
+                    )
+                state = {
+                    "version": LEDGER_FORMAT_VERSION,
+                    "watermark": delta.last_ns,
+                    "ids": sorted(delta.last_ids),
+                    "transactionCount": state.get("transactionCount", 0) + delta.applied,
+                    "updatedAt": time.time()
+                }
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO ledger_state (key, value) VALUES (?, ?)",
+                    [(key, json.dumps(value)) for key, value in state.items()]
+                )
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+            return state
+
+    def flows(self) -> Any:
+        """Součty pohybů všech peněženek jako DataFrame indexovaný wallet_id"""
+        import pandas as pd
+
+        with self.lock:
+            return pd.read_sql_query("SELECT wallet_id, inflow, outflow, transactions FROM wallet_flows",
+                                     self.conn, index_col="wallet_id")
+
+    def close(self) -> None:
+        self.conn.close()
+
+def file_chunks(path: str, columns: List[str], fmt: Optional[str] = None,
+                chunk_rows: Optional[int] = None) -> Iterator[Any]:
+    """
+    Bloky exportu (JSONL nebo CSV) jako DataFrame se zadanými sloupci
+    """
+    from azr_reducer import DEFAULT_CHUNK_ROWS, _csv_chunks, _jsonl_chunks, export_format
+
+    fmt = export_format(path, fmt)
+    chunk_rows = chunk_rows or DEFAULT_CHUNK_ROWS
+    if chunk_rows <= 0:
+        raise ValueError("Velikost bloku musí být kladná")
+    with open(path, "rb") as f:
+        yield from _csv_chunks(f, columns, chunk_rows) if fmt == "csv" else _jsonl_chunks(f, columns, chunk_rows)
+
+def database_chunks(conn: sqlite3.Connection, watermark: Optional[int] = None,
+                    chunk_rows: Optional[int] = None) -> Tuple[Iterator[Any], Any]:
+    """
+    Přírůstek transakcí (created_at >= vodoznak) a snímek zůstatků z SQLite
+    databáze s tabulkami token_transactions a token_wallets (viz load_database)
+
+    Obojí se čte v jedné čtecí transakci, snímek tak odpovídá stejnému
+    okamžiku jako transakce. Vrací dvojici (bloky transakcí, snímek).
+    """
+    import pandas as pd
+    from azr_reducer import DEFAULT_CHUNK_ROWS
+
+    conn.execute("BEGIN")
+    wallets = pd.read_sql_query(f"SELECT {', '.join(WALLET_FIELDS)} FROM token_wallets", conn)
+    query = f"SELECT {', '.join(TRANSACTION_FIELDS)} FROM token_transactions"
+    params: Tuple[Any, ...] = ()
+    if watermark is not None:
+        query += " WHERE created_at >= ?"
+        params = (timestamp_text(watermark),)
+
+    def chunks():
+        try:
+            yield from pd.read_sql_query(query, conn, params=params, chunksize=chunk_rows or DEFAULT_CHUNK_ROWS)
+        finally:
+            conn.execute("COMMIT")
+
+    return chunks(), wallets
+
+def wallet_snapshot(chunks: Iterator[Any]) -> Any:
+    """
+    Snímek token_wallets (bloky se sloupci id a balance) jako sloupec balance indexovaný wallet_id
+    """
+    import pandas as pd
+
+    parts = []
+    for chunk in chunks:
+        parts.append(pd.DataFrame({"wallet_id": _wallet_ids(chunk["id"].to_numpy()),
+                                   "balance": _integer_amounts(chunk["balance"].to_numpy(), "balance")}))
+    if not parts:
+        return pd.DataFrame({"balance": pd.Series([], dtype="int64")}, index=pd.Index([], name="wallet_id"))
+    snapshot = pd.concat(parts, ignore_index=True)
+    if snapshot["wallet_id"].isna().any():
+        raise ValueError("Snímek obsahuje peněženky bez id")
+    duplicated = snapshot["wallet_id"].duplicated()
+    if duplicated.any():
+        raise ValueError(f"Snímek obsahuje peněženku {snapshot['wallet_id'][duplicated].iloc[0]} vícekrát")
+    return snapshot.set_index("wallet_id")
+
+def compare_balances(flows: Any, snapshot: Any, limit: int = DEFAULT_REPORT_LIMIT) -> Dict[str, Any]:
+    """
+    Porovnání zůstatků se součty pohybů
+
+    Nesouhlasí peněženka, jejíž zůstatek se liší od příchozích minus
+    odchozích částek (peněženka bez transakcí má mít zůstatek 0), a
+    peněženka z transakcí, která ve snímku chybí. Vypíše se nejvýše `limit`
+    peněženek s největším rozdílem.
+    """
+    import numpy as np
+
+    merged = flows.join(snapshot, how="outer")
+    inflow = merged["inflow"].fillna(0).to_numpy(dtype=np.int64)
+    outflow = merged["outflow"].fillna(0).to_numpy(dtype=np.int64)
+    transactions = merged["transactions"].fillna(0).to_numpy(dtype=np.int64)
+    present = merged["balance"].notna().to_numpy()
+    balance = merged["balance"].fillna(0).to_numpy(dtype=np.int64)
+    expected = inflow - outflow
+    difference = balance - expected
+    mismatched = np.flatnonzero(~present | (difference != 0))
+
+    order = mismatched[np.lexsort((merged.index.to_numpy()[mismatched].astype(str), -np.abs(difference[mismatched])))]
+    wallet_ids = merged.index.to_numpy()
+    rows = []
+    for position in order[:limit].tolist():
+        rows.append({
+            "walletId": wallet_ids[position],
+            "balance": int(balance[position]) if present[position] else None,
+            "expected": int(expected[position]),
+            "difference": int(difference[position]) if present[position] else None,
+            "inflow": int(inflow[position]),
+            "outflow": int(outflow[position]),
+            "transactions": int(transactions[position])
+        })
+    checked = present[mismatched]
+    return {
+        "wallets": int(present.sum()),
+        "ledgerWallets": len(flows),
+        "mismatchCount": len(mismatched),
+        "missingWallets": int((~checked).sum()),
+        "netDifference": int(difference[mismatched][checked].sum()),
+        "mismatches": rows,
+        "truncated": len(mismatched) > limit
+    }
+
+def reconcile(store: LedgerStore, transactions: Iterator[Any], snapshot: Any = None,
+              rebuild: bool = False, limit: int = DEFAULT_REPORT_LIMIT) -> Dict[str, Any]:
+    """
+    Započítání transakcí do knihy a porovnání se snímkem zůstatků
+
+    `transactions` jsou bloky (DataFrame se sloupci TRANSACTION_FIELDS);
+    s rebuild se kniha vyprázdní a sestaví jen z nich. `snapshot` je výsledek
+    wallet_snapshot, bez něj se kniha jen doplní.
+    """
+    started = time.perf_counter()
+    if rebuild:
+        store.clear()
+    state = store.state()
+    delta = FlowDelta(state.get("watermark"), state.get("ids"))
+    for chunk in transactions:
+        delta.add(chunk)
+    state = store.apply(delta)
+
+    result = {
+        "ledger": {
+            "watermark": timestamp_text(state["watermark"]) if state["watermark"] is not None else None,
+            "applied": delta.applied,
+            "skipped": delta.skipped,
+            "touchedWallets": len(delta.flows) if delta.flows is not None else 0,
+            "transactionCount": state["transactionCount"],
+            "rebuilt": rebuild
+        }
+    }
+    if snapshot is not None:
+        result.update(compare_balances(store.flows(), snapshot, limit))
+    result["elapsedMs"] = round((time.perf_counter() - started) * 1000, 3)
+    return result
+
+def record_chunks(records: List[Dict[str, Any]], columns: List[str]) -> Iterator[Any]:
+    """Záznamy ve tvaru JSON (transakce nebo peněženky) jako jeden blok"""
+    import pandas as pd
+
+    if records:
+        yield pd.DataFrame(records, columns=columns)
+
+def load_database(path: str, transactions: Iterator[Any], wallets: Iterator[Any]) -> Dict[str, Any]:
+    """
+    Naplnění SQLite náhrady Postgres z exportů token_transactions a token_wallets
+
+    Opakované načtení přepíše záznamy se stejným id. Čas transakce se uloží
+    jako místní čas v pevném tvaru (timestamp_text), aby vodoznak šlo
+    porovnávat přímo v dotazu.
+    """
+    import numpy as np
+    from azr_token_kernel import _column_timestamps
+
+    conn = sqlite3.connect(path, isolation_level=None)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("CREATE TABLE IF NOT EXISTS token_wallets (id TEXT PRIMARY KEY, balance INTEGER NOT NULL)")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS token_transactions ("
+            " id TEXT PRIMARY KEY, from_wallet_id TEXT, to_wallet_id TEXT,"
+            " amount INTEGER NOT NULL, created_at TEXT NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS token_transactions_created_at ON token_transactions (created_at)")
+        counts = {"transactions": 0, "wallets": 0}
+        conn.execute("BEGIN")
+        for chunk in transactions:
+            created = np.datetime_as_string(
+                _column_timestamps(chunk["created_at"].to_numpy())[0].view("datetime64[ns]"), unit="us")
+            conn.executemany(
+                "INSERT OR REPLACE INTO token_transactions VALUES (?, ?, ?, ?, ?)",
+                zip(_wallet_ids(chunk["id"].to_numpy()).tolist(), _wallet_ids(chunk["from_wallet_id"].to_numpy()).tolist(),
+                    _wallet_ids(chunk["to_wallet_id"].to_numpy()).tolist(),
+                    _integer_amounts(chunk["amount"].to_numpy(), "amount").tolist(), created.tolist())
+            )
+            counts["transactions"] += len(chunk)
+        for chunk in wallets:
+            conn.executemany(
+                "INSERT OR REPLACE INTO token_wallets VALUES (?, ?)",
+                zip(_wallet_ids(chunk["id"].to_numpy()).tolist(),
+                    _integer_amounts(chunk["balance"].to_numpy(), "balance").tolist())
+            )
+            counts["wallets"] += len(chunk)
+        conn.execute("COMMIT")
+    finally:
+        conn.close()
+    return counts
+
+def main():
+    """
+    Naplnění náhradní databáze a kontrola zůstatků z příkazové řádky
+    """
+    import argparse
+
+    from azr_codec import to_builtin
+    from azr_reducer import DEFAULT_CHUNK_ROWS
+
+    parser = argparse.ArgumentParser(description='AZR reconcile - kontrola zůstatků peněženek proti transakcím')
+    parser.add_argument('command', choices=["load", "run"], help='Naplnění SQLite náhrady nebo kontrola')
+    parser.add_argument('target', help='SQLite databáze (load) nebo kniha pohybů (run)')
+    parser.add_argument('--transactions', default=None, help='Export token_transactions (JSONL nebo CSV)')
+    parser.add_argument('--wallets', default=None, help='Export token_wallets (JSONL nebo CSV)')
+    parser.add_argument('--database', default=None, help='SQLite databáze s transakcemi a zůstatky (run)')
+    parser.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS,
+                        help=f'Počet řádků v bloku (default: {DEFAULT_CHUNK_ROWS})')
+    parser.add_argument('--limit', type=int, default=DEFAULT_REPORT_LIMIT,
+                        help=f'Počet vypsaných nesouhlasících peněženek (default: {DEFAULT_REPORT_LIMIT})')
+    parser.add_argument('--rebuild', action='store_true', help='Sestavit knihu pohybů znovu od začátku')
+    args = parser.parse_args()
+
+    def exported(path, columns):
+        return file_chunks(path, columns, chunk_rows=args.chunk_rows) if path else iter(())
+
+    if args.command == "load":
+        counts = load_database(args.target, exported(args.transactions, TRANSACTION_FIELDS),
+                               exported(args.wallets, WALLET_FIELDS))
+        print(json.dumps(counts, ensure_ascii=False))
+        return
+
+    if not args.database and not args.transactions:
+        parser.error("run vyžaduje --database nebo --transactions")
+    store = LedgerStore(args.target)
+    conn = sqlite3.connect(args.database, isolation_level=None) if args.database else None
+    try:
+        if conn is not None:
+            watermark = None if args.rebuild else store.state().get("watermark")
+            chunks, wallets = database_chunks(conn, watermark, args.chunk_rows)
+            snapshot = wallet_snapshot([wallets])
+        else:
+            chunks = exported(args.transactions, TRANSACTION_FIELDS)
+            snapshot = wallet_snapshot(exported(args.wallets, WALLET_FIELDS)) if args.wallets else None
+        result = reconcile(store, chunks, snapshot, args.rebuild, args.limit)
+    finally:
+        if conn is not None:
+            conn.close()
+        store.close()
+    print(json.dumps(result, default=to_builtin, ensure_ascii=False))
+    if result.get("mismatchCount"):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+AZR Reducer - proudová analýza tokenů nad exporty transakcí
+
+Export (JSONL nebo CSV) se čte po blocích řádků, každý blok se agreguje
+do TokenRollup a přičte k průběžnému stavu; v paměti je tak vždy jen
+jeden blok a agregace (součty po měsících, hodinách a kategoriích), bez
+ohledu na velikost souboru. Výsledek je stejný jako token_analysis nad
+všemi transakcemi najednou.
+
+Tvar "bridge" odpovídá transakcím pro token_analysis (transactionDate,
+amount, type, category), tvar "sql" tabulce token_transactions (created_at,
+amount, type podle token_transaction_type, kategorie v description).
+Description je volný text, u tvaru "sql" se proto za soubor použije nejvýše
+MAX_DESCRIPTION_CATEGORIES různých kategorií a další se sloučí do "other",
+aby agregace nerostla s počtem různých popisů.
+
+V bridge dotazem token_analysis s data.file = {"path", "format", "shape",
+"chunkRows"}, průběh s options.progress jako částečné zprávy. Samostatně:
+    python azr_reducer.py export.jsonl --shape sql --progress
+"""
+
+import os
+import sys
+import time
+from typing import Dict, Any, Callable, Iterator, List, Optional, Tuple
+
+# Počet řádků zpracovaných najednou
+DEFAULT_CHUNK_ROWS = 100000
+
+# Nejkratší interval mezi hlášeními průběhu v sekundách
+PROGRESS_INTERVAL = 1.0
+
+EXPORT_FORMATS = ("jsonl", "csv")
+
+# Nejvyšší počet různých kategorií z volného textu (description) v jednom souboru
+MAX_DESCRIPTION_CATEGORIES = 256
+
+# Kategorie, do které se sloučí popisy nad MAX_DESCRIPTION_CATEGORIES
+OTHER_CATEGORY = "other"
+
+# Přejmenování sloupců exportu na TRANSACTION_COLUMNS, převod typů transakcí,
+# sloupce s uživatelem (u "sql" peněženka příjemce, u výdajů odesílatele)
+# a omezení počtu různých kategorií (None = bez omezení)
+EXPORT_SHAPES: Dict[str, Dict[str, Any]] = {
+    "bridge": {"columns": {}, "types": None, "user": ["userId"], "categories": None},
+    "sql": {
+        "columns": {"created_at": "transactionDate", "description": "category"},
+        "types": {"purchase": "earned", "reward": "earned", "donation": "earned", "refund": "earned",
+                  "payment": "spent"},
+        "user": ["to_wallet_id", "from_wallet_id"],
+        "categories": MAX_DESCRIPTION_CATEGORIES
+    }
+}
+
+def export_format(path: str, fmt: Optional[str] = None) -> str:
+    """
+    Formát exportu: zadaný, jinak podle přípony souboru (výchozí jsonl)
+    """
+    if fmt is None:
+        fmt = "csv" if path.lower().endswith(".csv") else "jsonl"
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Neznámý formát exportu: {fmt} (podporované: {', '.join(EXPORT_FORMATS)})")
+    return fmt
+
+def _jsonl_chunks(f, columns: List[str], chunk_rows: int) -> Iterator[Any]:
+    """Bloky řádků JSONL jako DataFrame jen s potřebnými sloupci"""
+    import pandas as pd
+    from azr_codec import get_codec
+
+    codec = get_codec("auto")
+    records = []
+    for number, line in enumerate(f, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            records.append(codec.decode(line))
+        except ValueError as e:
+            raise ValueError(f"Neplatný JSON na řádku {number}: {str(e)}")
+        if len(records) >= chunk_rows:
+            yield pd.DataFrame(records, columns=columns)
+            records = []
+    if records:
+        yield pd.DataFrame(records, columns=columns)
+
+def _csv_chunks(f, columns: List[str], chunk_rows: int) -> Iterator[Any]:
+    """Bloky řádků CSV jako DataFrame jen s potřebnými sloupci"""
+    import pandas as pd
+
+    text_columns = {name: str for name in columns if name != "amount"}
+    reader = pd.read_csv(f, chunksize=chunk_rows, usecols=lambda name: name in columns, dtype=text_columns)
+    for chunk in reader:
+        yield chunk.reindex(columns=columns)
+
+def _capped_categories(categories: Any, known: set, limit: int) -> Any:
+    """
+    Kategorie bloku, v celém souboru nejvýše `limit` různých hodnot
+
+    Nové hodnoty se přidávají do `known` v pořadí výskytu, dokud je místo,
+    ostatní se nahradí OTHER_CATEGORY. Chybějící kategorie zůstávají prázdné.
+    """
+    if len(known) < limit:
+        for value in categories.dropna().unique():
+            known.add(value)
+            if len(known) >= limit:
+                break
+    return categories.where(categories.isna() | categories.isin(known), OTHER_CATEGORY)
+
+def export_chunks(path: str, fmt: Optional[str] = None, shape: str = "bridge",
+                  chunk_rows: int = DEFAULT_CHUNK_ROWS, with_users: bool = False) -> Iterator[Tuple[Any, int]]:
+    """
+    Bloky exportu jako DataFrame se sloupci TRANSACTION_COLUMNS
+
+    S with_users obsahují bloky i sloupec userId. Vrací dvojice (blok,
+    počet dosud přečtených bajtů souboru).
+    """
+    from azr_token_kernel import TRANSACTION_COLUMNS
+
+    fmt = export_format(path, fmt)
+    if shape not in EXPORT_SHAPES:
+        raise ValueError(f"Neznámý tvar exportu: {shape} (podporované: {', '.join(EXPORT_SHAPES)})")
+    if chunk_rows <= 0:
+        raise ValueError("Velikost bloku musí být kladná")
+    renames = EXPORT_SHAPES[shape]["columns"]
+    type_map = EXPORT_SHAPES[shape]["types"]
+    user_columns = EXPORT_SHAPES[shape]["user"]
+    category_limit = EXPORT_SHAPES[shape]["categories"]
+    known_categories: set = set()
+    source = {target: name for name, target in renames.items()}
+    columns = [source.get(name, name) for name in TRANSACTION_COLUMNS]
+    if with_users:
+        columns += user_columns
+    total_bytes = os.path.getsize(path)
+
+    with open(path, "rb") as f:
+        chunks = _csv_chunks(f, columns, chunk_rows) if fmt == "csv" else _jsonl_chunks(f, columns, chunk_rows)
+        for chunk in chunks:
+            if renames:
+                chunk = chunk.rename(columns=renames)
+            if type_map is not None:
+                chunk["type"] = chunk["type"].map(type_map)
+            if category_limit is not None:
+                chunk["category"] = _capped_categories(chunk["category"], known_categories, category_limit)
+            if with_users and len(user_columns) > 1:
+                receiver, sender = user_columns
+                chunk["userId"] = chunk[receiver].where(chunk["type"] != "spent", chunk[sender])
+            elif with_users:
+                chunk = chunk.rename(columns={user_columns[0]: "userId"})
+            # CSV čte dopředu po blocích, pozice je proto jen přibližná
+            yield chunk, min(f.tell(), total_bytes)
+
+def rollup_from_file(path: str, fmt: Optional[str] = None, shape: str = "bridge",
+                     chunk_rows: int = DEFAULT_CHUNK_ROWS,
+                     progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+                     window: Any = None) -> Tuple[Any, Dict[str, Any]]:
+    """
+    Agregace transakcí ze souboru po blocích
+
+    `progress` dostává nejvýše jednou za PROGRESS_INTERVAL sekund a na konci
+    slovník s počtem řádků, bloků a přečtených bajtů. S `window` (TimeWindow)
+    se z každého bloku agregují jen transakce v časovém okně. Vrací dvojici
+    (TokenRollup, souhrn průběhu).
+    """
+    from azr_deadline import check_deadline
+    from azr_token_kernel import TokenRollup, frame_arrays, window_positions
+
+    rollup = TokenRollup()
+    tracker = ProgressTracker(os.path.getsize(path), progress)
+    for chunk, position in export_chunks(path, fmt, shape, chunk_rows):
+        check_deadline("token_analysis: blok souboru")
+        arrays = frame_arrays(chunk)
+        selection = window_positions(arrays["timestamps_ns"], window) if window is not None else None
+        rollup.merge(TokenRollup.from_transaction_arrays(arrays, selection))
+        tracker.advance(len(chunk), position)
+    return rollup, tracker.finish()
+
+class ProgressTracker:
+    """
+    Počítadlo průběhu zpracování souboru s hlášením nejvýše jednou za PROGRESS_INTERVAL
+    """
+    def __init__(self, total_bytes: int, progress: Optional[Callable[[Dict[str, Any]], None]] = None):
+        self.started = time.perf_counter()
+        self.last_report = self.started
+        self.progress = progress
+        self.state = {"rows": 0, "chunks": 0, "bytes": 0, "totalBytes": total_bytes}
+
+    def report(self) -> Dict[str, Any]:
+        total_bytes = self.state["totalBytes"]
+        return {
+            **self.state,
+            "percent": round(100.0 * self.state["bytes"] / total_bytes, 1) if total_bytes else 100.0,
+            "elapsedMs": round((time.perf_counter() - self.started) * 1000, 3)
+        }
+
+    def advance(self, rows: int, position: int) -> None:
+        self.state["rows"] += rows
+        self.state["chunks"] += 1
+        self.state["bytes"] = position
+        if self.progress is not None and time.perf_counter() - self.last_report >= PROGRESS_INTERVAL:
+            self.last_report = time.perf_counter()
+            self.progress(self.report())
+
+    def finish(self) -> Dict[str, Any]:
+        """Konečný souhrn, hlásí se vždy"""
+        self.state["bytes"] = self.state["totalBytes"]
+        summary = self.report()
+        if self.progress is not None:
+            self.progress(summary)
+        return summary
+
+def main():
+    """
+    Analýza exportu z příkazové řádky, výsledek jako JSON na stdout
+    """
+    import argparse
+    import json
+
+    from azr_bridge import AZRProcessor
+    from azr_codec import to_builtin
+
+    parser = argparse.ArgumentParser(description='AZR reducer - proudová analýza tokenů nad exportem transakcí')
+    parser.add_argument('path', help='Soubor s exportem transakcí')
+    parser.add_argument('--format', choices=EXPORT_FORMATS, default=None,
+                        help='Formát exportu (default: podle přípony, jinak jsonl)')
+    parser.add_argument('--shape', choices=list(EXPORT_SHAPES), default="bridge",
+                        help='Tvar záznamů: bridge (token_analysis) nebo sql (token_transactions)')
+    parser.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS,
+                        help=f'Počet řádků v bloku (default: {DEFAULT_CHUNK_ROWS})')
+    parser.add_argument('--timeframe', choices=["all", "day", "week", "month", "quarter", "year"], default="all",
+                        help='Časové okno analýzy (default: all)')
+    parser.add_argument('--from', dest='start', default=None, help='Začátek okna (ISO 8601, včetně)')
+    parser.add_argument('--to', dest='end', default=None, help='Konec okna (ISO 8601, bez)')
+    parser.add_argument('--progress', action='store_true', help='Průběžně vypisovat postup na stderr')
+    args = parser.parse_args()
+
+    def progress(info: Dict[str, Any]) -> None:
+        print(f"{info['percent']:5.1f} % ({info['rows']} řádků, {info['elapsedMs'] / 1000:.1f} s)", file=sys.stderr)
+
+    from azr_token_kernel import time_window
+
+    window = time_window({"timeframe": args.timeframe, "from": args.start, "to": args.end})
+    processor = AZRProcessor()
+    rollup, summary = rollup_from_file(args.path, args.format, args.shape, args.chunk_rows,
+                                       progress if args.progress else None, window)
+    result = processor.token_analysis_from_rollup(rollup, window=window)
+    print(json.dumps({"success": True, "data": result, "file": summary}, default=to_builtin, ensure_ascii=False))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+"""
+AZR Rollups - uložené agregace transakcí pro inkrementální token_analysis
+
+Pro každého uživatele se uchovává kompaktní stav (TokenRollup: součty podle
+typu, měsíce, hodiny, dne v týdnu a kategorie, poslední čas transakce).
+Dotaz token_analysis s options.incremental pak posílá jen transakce novější
+než vodoznak (watermark) z předchozí odpovědi; stav se aktualizuje v čase
+úměrném počtu nových transakcí a odpověď má stejnou strukturu jako úplná
+analýza.
+
+Vodoznak je čas poslední započítané transakce (ISO, jak přišel z Node.js).
+Transakce starší než uložený vodoznak se přeskočí, transakce se stejným
+časem jen tehdy, pokud už byly započítány (podle "id"; bez id se přeskočí
+vždy). Node.js tak může bezpečně posílat transakce s created_at >= vodoznak.
+Je-li vodoznak klienta novější než uložený stav (stav chybí, byl vyřazen
+nebo ho vytvořil jiný proces), odpověď vrátí "rebuildRequired" a klient
+pošle celou historii bez vodoznaku.
+
+Stav je v paměti procesu (LRU podle počtu uživatelů), nebo v SQLite souboru
+(AZR_ROLLUP_PATH), který sdílí pracovní procesy poolu i servery.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Callable, List, Optional, Tuple
+
+from azr_codec import to_builtin
+
+# Verze formátu uloženého stavu, zvýšit při změně TokenRollup.to_state
+ROLLUP_FORMAT_VERSION = 1
+
+# Výchozí počet uživatelů, jejichž stav se drží v paměti
+DEFAULT_MAX_USERS = 10000
+
+REBUILD_ERROR = "Uložená agregace neodpovídá vodoznaku, je potřeba poslat celou historii transakcí"
+
+def watermark_ns(value: Any) -> int:
+    """
+    Vodoznak jako místní čas v ns (stejně jako časy transakcí v TokenRollup)
+    """
+    import pandas as pd
+
+    timestamp = pd.Timestamp(value)
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.tz_localize(None)
+    return int(timestamp.as_unit("ns").value)
+
+def _has_id(value: Any) -> bool:
+    """Id transakce je zadáno (chybějící sloupec dává None nebo NaN)"""
+    return value is not None and value == value
+
+def apply_transactions(state: Optional[Dict[str, Any]], transactions: List[Dict[str, Any]],
+                       watermark: Any = None, rebuild: bool = False) -> Tuple[Any, Dict[str, Any], Optional[Dict[str, Any]]]:
+    """
+    Započítání nových transakcí do uloženého stavu
+
+    Bez vodoznaku (nebo s rebuild) se stav sestaví znovu z předaných
+    transakcí. Vrací trojici (TokenRollup, informace pro odpověď, nový stav);
+    pokud stav nelze navázat, je TokenRollup i nový stav None
+    a informace obsahují rebuildRequired.
+    """
+    import numpy as np
+    from azr_token_kernel import TokenRollup, transaction_arrays
+
+    rebuilt = rebuild or watermark is None
+    boundary_ns = None
+    boundary_ids: set = set()
+    if rebuilt:
+        rollup = TokenRollup()
+    else:
+        if state is None or state.get("version") != ROLLUP_FORMAT_VERSION:
+            return None, {"rebuildRequired": True, "watermark": None}, None
+        rollup = TokenRollup.from_state(state["rollup"])
+        if rollup.last_ns is None or watermark_ns(watermark) > rollup.last_ns:
+            return None, {"rebuildRequired": True, "watermark": rollup.last_iso}, None
+        boundary_ns = rollup.last_ns
+        boundary_ids = set(state.get("ids") or [])
+
+    applied = 0
+    if transactions:
+        arrays = transaction_arrays(transactions, with_ids=True)
+        timestamps = arrays["timestamps_ns"]
+        selection = None
+        if boundary_ns is not None:
+            keep = timestamps > boundary_ns
+            at_boundary = np.flatnonzero(timestamps == boundary_ns)
+            for position in at_boundary.tolist():
+                transaction_id = arrays["ids"][position]
+                keep[position] = _has_id(transaction_id) and transaction_id not in boundary_ids
+            selection = np.flatnonzero(keep)
+        delta = TokenRollup.from_transaction_arrays(arrays, selection)
+        applied = delta.count
+
+        # Id transakcí s časem nového vodoznaku pro odfiltrování opakovaně poslaných
+        if delta.last_ns is not None and (boundary_ns is None or delta.last_ns >= boundary_ns):
+            positions = np.flatnonzero(timestamps == delta.last_ns)
+            if selection is not None:
+                positions = np.intersect1d(positions, selection)
+            latest_ids = {arrays["ids"][position] for position in positions.tolist()
+                          if _has_id(arrays["ids"][position])}
+            boundary_ids = boundary_ids | latest_ids if delta.last_ns == boundary_ns else latest_ids
+        rollup.merge(delta)
+
+    info = {
+        "watermark": rollup.last_iso,
+        "applied": applied,
+        "skipped": len(transactions) - applied,
+        "transactionCount": rollup.count,
+        "rebuilt": rebuilt
+    }
+    new_state = {
+        "version": ROLLUP_FORMAT_VERSION,
+        "rollup": rollup.to_state(),
+        "ids": sorted(boundary_ids, key=str)
+    }
+    return rollup, info, new_state
+
+class RollupStore:
+    """
+    Stav agregací podle uživatelů v paměti procesu, volitelně v SQLite
+    """
+    def __init__(self, max_users: int = DEFAULT_MAX_USERS, backend: Optional["SQLiteRollupBackend"] = None):
+        self.max_users = max_users
+        self.backend = backend
+        self.states: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.updates = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "RollupStore":
+        """
+        Vytvoření úložiště podle proměnných prostředí
+
+        AZR_ROLLUP_PATH připojí SQLite soubor sdílený více procesy,
+        AZR_ROLLUP_MAX_USERS omezuje počet uživatelů v paměti.
+        """
+        backend = None
+        rollup_path = os.environ.get("AZR_ROLLUP_PATH")
+        if rollup_path:
+            backend = SQLiteRollupBackend(rollup_path)
+        return cls(max_users=int(os.environ.get("AZR_ROLLUP_MAX_USERS", DEFAULT_MAX_USERS)), backend=backend)
+
+    def update(self, user_id: str, func: Callable[[Optional[Dict[str, Any]]], Tuple[Any, Optional[Dict[str, Any]]]]) -> Any:
+        """
+        Atomická úprava stavu uživatele
+
+        func dostane dosavadní stav (nebo None) a vrací dvojici (výsledek,
+        nový stav); nový stav None znamená beze změny. Výjimka z func
+        (i překročení časového limitu) stav nezmění.
+        """
+        if self.backend is not None:
+            return self.backend.update(user_id, func)
+
+        with self.lock:
+            result, new_state = func(self.states.get(user_id))
+            if new_state is not None:
+                self.states[user_id] = new_state
+                self.states.move_to_end(user_id)
+                self.updates += 1
+                while len(self.states) > self.max_users:
+                    self.states.popitem(last=False)
+                    self.evictions += 1
+            return result
+
+    def delete(self, user_id: str) -> None:
+        """Odstranění stavu uživatele"""
+        if self.backend is not None:
+            self.backend.delete(user_id)
+            return
+        with self.lock:
+            self.states.pop(user_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Počítadla úložiště"""
+        if self.backend is not None:
+            return self.backend.stats()
+        with self.lock:
+            return {"users": len(self.states), "updates": self.updates, "evictions": self.evictions}
+
+class SQLiteRollupBackend:
+    """
+    Stav agregací v SQLite souboru sdíleném více procesy
+
+    Úprava stavu probíhá v transakci BEGIN IMMEDIATE, souběžné dotazy
+    téhož uživatele z různých procesů se tak nepřepíší.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.updates = 0
+        self.lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=5.0, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS token_rollups ("
+            " user_id TEXT PRIMARY KEY,"
+            " version INTEGER NOT NULL,"
+            " updated_at REAL NOT NULL,"
+            " state TEXT NOT NULL)"
+        )
+        self.conn.execute("DELETE FROM token_rollups WHERE version != ?", (ROLLUP_FORMAT_VERSION,))
+
+    def update(self, user_id: str, func: Callable[[Optional[Dict[str, Any]]], Tuple[Any, Optional[Dict[str, Any]]]]) -> Any:
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self.conn.execute(
+                    "SELECT state FROM token_rollups WHERE user_id = ?", (user_id,)
+                ).fetchone()
+                result, new_state = func(json.loads(row[0]) if row is not None else None)
+                if new_state is not None:
+                    self.conn.execute(
+                        "INSERT OR REPLACE INTO token_rollups (user_id, version, updated_at, state)"
+                        " VALUES (?, ?, ?, ?)",
+                        (user_id, ROLLUP_FORMAT_VERSION, time.time(), json.dumps(new_state, default=to_builtin))
+                    )
+                    self.updates += 1
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+            return result
+
+    def delete(self, user_id: str) -> None:
+        with self.lock:
+            self.conn.execute("DELETE FROM token_rollups WHERE user_id = ?", (user_id,))
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            (users,) = self.conn.execute("SELECT COUNT(*) FROM token_rollups").fetchone()
+        return {"path": self.path, "users": users, "updates": self.updates}
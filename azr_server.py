@@ -0,0 +1,435 @@
+#!/usr/bin/env python3
+"""
+AZR Server - asyncio server pro AZR bridge
+
+Naslouchá na Unix socketu (a volitelně na lokálním TCP portu) a přijímá
+dotazy ve zprávách s délkovou hlavičkou: 4 bajty délky (big-endian)
+následované objektem dotazu zakódovaným kodekem spojení (json, orjson nebo
+msgpack, viz azr_codec). Kodek lze pro spojení změnit dotazem typu "codec".
+Na jednom spojení může běžet více dotazů současně, odpovědi se posílají
+v pořadí dokončení a párují se podle "id".
+
+Rychlé procesory běží přímo ve smyčce událostí, CPU náročné se přesouvají
+do executoru (vláknový executor se sdíleným procesorem, nebo AZRWorkerPool).
+Dotazy měnící stav procesoru v pořadí událostí (token_anomaly) mají vlastní
+jednovláknový executor, takže se použijí ve stejném pořadí, v jakém přišly.
+"""
+
+import asyncio
+import os
+import signal
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Callable, Optional, Set, Tuple
+
+from azr_bridge import AZRProcessor, SERVE_PROTOCOL_VERSION
+from azr_deadline import Deadline, deadline_response
+from azr_codec import FRAME_HEADER, available_codecs, default_codec_name, get_codec
+
+# Tolerance po uplynutí limitu dotazu, po které server odpoví bez čekání na procesor
+DEFAULT_DEADLINE_GRACE_MS = 500
+
+# Výchozí maximální velikost jedné zprávy (64 MB)
+DEFAULT_MAX_FRAME_SIZE = 64 * 1024 * 1024
+
+# Typy dotazů, které se nezpracovávají přímo ve smyčce událostí
+CPU_BOUND_TYPES = {
+    "token_analysis", "token_analysis_bulk", "token_cube_refresh", "token_reconcile", "token_anomaly",
+    "text_vectorization", "analysis", "app_analysis", "batch"
+}
+
+# Typy dotazů, které musí stav procesoru měnit v pořadí příchodu
+ORDERED_TYPES = {"token_anomaly"}
+
+def is_ordered(query: Dict[str, Any]) -> bool:
+    """
+    Zda dotaz (nebo některá položka dávky) patří do jednovláknového executoru
+    """
+    if query.get("type") == "batch":
+        data = query.get("data")
+        items = data.get("queries") if isinstance(data, dict) else None
+        return isinstance(items, list) and any(
+            isinstance(item, dict) and item.get("type") in ORDERED_TYPES for item in items
+        )
+    return query.get("type") in ORDERED_TYPES
+
+def encode_frame(message: Dict[str, Any], codec=None) -> bytes:
+    """
+    Zakódování zprávy do rámce s délkovou hlavičkou
+    """
+    body = (codec or get_codec("json")).encode(message)
+    return FRAME_HEADER.pack(len(body)) + body
+
+def decode_request(body: bytes, codec) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    """
+    Dekódování těla rámce na dotaz
+
+    Vrací dvojici (dotaz, chybová odpověď), vyplněna je vždy jen jedna z nich.
+    """
+    try:
+        query = codec.decode(body)
+    except (ValueError, UnicodeDecodeError) as e:
+        label = "Neplatný JSON" if not codec.binary else f"Neplatná zpráva {codec.name}"
+        return None, {"success": False, "error": f"{label}: {str(e)}"}
+    if not isinstance(query, dict):
+        return None, {"success": False, "error": "Dotaz musí být objekt"}
+    return query, None
+
+async def read_frame(reader: asyncio.StreamReader, max_frame_size: int) -> Optional[bytes]:
+    """
+    Načtení jednoho rámce, na konci spojení vrací None
+    """
+    try:
+        header = await reader.readexactly(FRAME_HEADER.size)
+    except asyncio.IncompleteReadError:
+        return None
+    (length,) = FRAME_HEADER.unpack(header)
+    if length > max_frame_size:
+        raise ValueError(f"Zpráva je příliš velká ({length} B, max. {max_frame_size} B)")
+    return await reader.readexactly(length)
+
+class AZRAsyncServer:
+    """
+    Asyncio server multiplexující dotazy z mnoha spojení na AZR procesory
+    """
+    def __init__(self, processor: Optional[AZRProcessor] = None, pool=None,
+                 max_in_flight: int = 32, threads: int = 4,
+                 max_frame_size: int = DEFAULT_MAX_FRAME_SIZE, drain_timeout: float = 30.0,
+                 codec=None, deadline_grace_ms: float = DEFAULT_DEADLINE_GRACE_MS):
+        self.processor = processor or AZRProcessor()
+        self.deadline_grace_ms = deadline_grace_ms
+        self.codec = codec or get_codec(default_codec_name())
+        self.pool = pool
+        self.max_in_flight = max(1, max_in_flight)
+        self.max_frame_size = max_frame_size
+        self.drain_timeout = drain_timeout
+        self.executor = ThreadPoolExecutor(max_workers=max(1, threads), thread_name_prefix="azr-cpu")
+        self.ordered_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="azr-ordered")
+        self.servers = []
+        self.tasks: Set[asyncio.Task] = set()
+        self.connections = set()
+        self.warmup: Dict[str, Any] = {}
+        self.draining = False
+        self.stopped: Optional[asyncio.Event] = None
+
+    async def run_query(self, query: Dict[str, Any],
+                        emit: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """
+        Zpracování dotazu na vhodném místě
+
+        Rychlé dotazy běží přímo ve smyčce, CPU náročné v poolu procesů
+        nebo ve vláknovém executoru; stavové dotazy pool nechává tomuto
+        procesu (azr_pool.runs_in_parent) a řadí se za sebe (is_ordered).
+        Vlákno nelze ukončit zvenčí, s limitem options.deadlineMs se proto
+        odpověď odešle nejpozději po jeho uplynutí a tolerance, i když
+        procesor ještě nedosáhl kontrolního bodu.
+        Částečné výsledky (options.stream) předává `emit`, volaná mimo smyčku.
+        """
+        if self.pool is not None and not self.pool.runs_in_parent(query):
+            return await asyncio.wrap_future(self.pool.submit(query, emit))
+        if query.get("type") in CPU_BOUND_TYPES:
+            loop = asyncio.get_running_loop()
+            started = time.perf_counter()
+            executor = self.ordered_executor if is_ordered(query) else self.executor
+            future = loop.run_in_executor(executor, self.processor.process_query, query, emit)
+            deadline_ms = Deadline.ms_from_options(query.get("options"))
+            if deadline_ms is None:
+                return await future
+            try:
+                return await asyncio.wait_for(future, (deadline_ms + self.deadline_grace_ms) / 1000)
+            except asyncio.TimeoutError:
+                return deadline_response({
+                    "deadlineMs": deadline_ms,
+                    "elapsedMs": round((time.perf_counter() - started) * 1000, 3),
+                    "stage": "executor",
+                    "checkpoints": []
+                })
+        return self.processor.process_query(query)
+
+    async def handle_request(self, query: Dict[str, Any], size: int, decode_ms: float,
+                             writer: asyncio.StreamWriter, write_lock: asyncio.Lock,
+                             slots: asyncio.Semaphore, connection: Dict[str, Any]) -> None:
+        """
+        Zpracování jednoho dotazu a odeslání odpovědi
+
+        Každý dotaz dostane odpověď, při chybě zpracování nebo kódování
+        chybový rámec; spojení se zavírá jen při chybě čtení či zápisu.
+        """
+        metrics = self.processor.metrics
+        request_id = query.get("id")
+        query_type = query.get("type", "unknown")
+        loop = asyncio.get_running_loop()
+        answered = False
+
+        async def send_partial(message: Dict[str, Any]) -> None:
+            if answered:
+                return
+            async with write_lock:
+                writer.write(encode_frame({"id": request_id, **message}, connection["codec"]))
+                await writer.drain()
+
+        def emit(message: Dict[str, Any]) -> None:
+            # Volá se z vlákna executoru nebo poolu, čeká na odeslání (zpětný tlak)
+            asyncio.run_coroutine_threadsafe(send_partial(message), loop).result()
+
+        try:
+            metrics.observe_decode(query_type, decode_ms, size)
+            response = await self.run_query(query, emit)
+            answered = True
+
+            started = time.perf_counter()
+            frame = encode_frame({"id": request_id, **response}, connection["codec"])
+            metrics.observe_encode(query_type, (time.perf_counter() - started) * 1000, len(frame))
+
+            async with write_lock:
+                writer.write(frame)
+                await writer.drain()
+        except (ConnectionResetError, BrokenPipeError):
+            # Spojení je přerušené, odpověď nelze doručit
+            writer.close()
+        except Exception as e:
+            # Chyba dotazu (např. nezakódovatelná odpověď) spojení neukončí, klient dostane chybový rámec
+            answered = True
+            error = {"id": request_id, "success": False, "error": f"Chyba při zpracování dotazu: {str(e)}"}
+            try:
+                async with write_lock:
+                    writer.write(encode_frame(error, connection["codec"]))
+                    await writer.drain()
+            except (ConnectionResetError, BrokenPipeError):
+                writer.close()
+        finally:
+            slots.release()
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """
+        Obsluha jednoho spojení
+
+        Počet současně zpracovávaných dotazů je omezen na `max_in_flight`;
+        při dosažení limitu server přestane ze spojení číst, dokud se
+        některý dotaz nedokončí. Dotazy se dekódují už při čtení, aby změna
+        kodeku dotazem "codec" platila přesně od následující zprávy.
+        """
+        write_lock = asyncio.Lock()
+        slots = asyncio.Semaphore(self.max_in_flight)
+        connection_tasks: Set[asyncio.Task] = set()
+        connection = {"codec": self.codec}
+        self.connections.add(writer)
+
+        async def send(message: Dict[str, Any]) -> None:
+            async with write_lock:
+                writer.write(encode_frame(message, connection["codec"]))
+                await writer.drain()
+
+        try:
+            await send({
+                "ready": True,
+                "protocol": SERVE_PROTOCOL_VERSION,
+                "pid": os.getpid(),
+                "codec": self.codec.name,
+                "codecs": available_codecs(),
+                "capabilities": self.processor.get_capabilities(),
+                **self.warmup
+            })
+
+            while not self.draining:
+                await slots.acquire()
+                try:
+                    body = await read_frame(reader, self.max_frame_size)
+                except ValueError as e:
+                    slots.release()
+                    await send({"id": None, "success": False, "error": str(e)})
+                    break
+                if body is None:
+                    slots.release()
+                    break
+                if self.draining:
+                    slots.release()
+                    await send({
+                        "id": None, "success": False, "error": "AZR server se ukončuje, dotaz nebyl přijat"
+                    })
+                    break
+
+                started = time.perf_counter()
+                query, error = decode_request(body, connection["codec"])
+                decode_ms = (time.perf_counter() - started) * 1000
+                if error is not None:
+                    slots.release()
+                    await send({"id": None, **error})
+                    continue
+
+                if query.get("type") == "codec":
+                    slots.release()
+                    # Odpovědi na dříve přijaté dotazy musí odejít ještě ve starém kodeku
+                    if connection_tasks:
+                        await asyncio.gather(*connection_tasks, return_exceptions=True)
+                    try:
+                        new_codec = get_codec((query.get("data") or {}).get("codec"))
+                    except ValueError as e:
+                        await send({"id": query.get("id"), "success": False, "error": str(e)})
+                        continue
+                    await send({"id": query.get("id"), "success": True, "data": {"codec": new_codec.name}})
+                    connection["codec"] = new_codec
+                    continue
+
+                task = asyncio.create_task(self.handle_request(
+                    query, len(body), decode_ms, writer, write_lock, slots, connection
+                ))
+                connection_tasks.add(task)
+                self.tasks.add(task)
+                task.add_done_callback(connection_tasks.discard)
+                task.add_done_callback(self.tasks.discard)
+
+            if connection_tasks:
+                await asyncio.gather(*connection_tasks, return_exceptions=True)
+        except (ConnectionResetError, BrokenPipeError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.connections.discard(writer)
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except (ConnectionResetError, BrokenPipeError):
+                pass
+
+    async def start(self, socket_path: Optional[str] = None, tcp_port: Optional[int] = None,
+                    host: str = "127.0.0.1", preload: Optional[list] = None) -> None:
+        """
+        Zahřátí procesorů a otevření naslouchajících socketů
+        """
+        if self.pool is not None:
+            self.warmup = self.pool.start()
+        else:
+            self.warmup = self.processor.warm_up(preload)
+
+        if socket_path:
+            if os.path.exists(socket_path):
+                os.unlink(socket_path)
+            server = await asyncio.start_unix_server(self.handle_connection, path=socket_path)
+            self.servers.append(server)
+            print(f"AZR server naslouchá na {socket_path}", file=sys.stderr)
+
+        if tcp_port is not None:
+            server = await asyncio.start_server(self.handle_connection, host=host, port=tcp_port)
+            self.servers.append(server)
+            print(f"AZR server naslouchá na {host}:{tcp_port}", file=sys.stderr)
+
+        self.stopped = asyncio.Event()
+
+    async def drain(self) -> None:
+        """
+        Řízené ukončení: nové spojení se nepřijímají, rozpracované dotazy
+        se dokončí (nejdéle `drain_timeout` sekund) a poté se spojení zavřou
+        """
+        if self.draining:
+            return
+        self.draining = True
+        print("AZR server ukončuje činnost, dokončuji rozpracované dotazy...", file=sys.stderr)
+
+        for server in self.servers:
+            server.close()
+
+        started = time.monotonic()
+        if self.tasks:
+            await asyncio.wait(set(self.tasks), timeout=self.drain_timeout)
+        for writer in list(self.connections):
+            writer.close()
+
+        for server in self.servers:
+            await server.wait_closed()
+
+        self.executor.shutdown(wait=False)
+        self.ordered_executor.shutdown(wait=False)
+        if self.pool is not None:
+            self.pool.close()
+
+        print(f"AZR server ukončen ({time.monotonic() - started:.2f} s)", file=sys.stderr)
+        self.stopped.set()
+
+    async def serve_until_stopped(self) -> None:
+        """
+        Běh serveru do signálu SIGTERM/SIGINT a následné řízené ukončení
+        """
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, lambda: asyncio.ensure_future(self.drain()))
+        await self.stopped.wait()
+
+async def run_server(args) -> None:
+    """
+    Spuštění serveru podle parametrů příkazové řádky
+    """
+    preload = [name for name in args.preload.split(",") if name]
+    processor = AZRProcessor()
+    if args.metrics_file:
+        processor.metrics.start_file_exporter(args.metrics_file, args.metrics_interval)
+
+    pool = None
+    if args.workers > 0:
+        from azr_pool import AZRWorkerPool
+
+        pool = AZRWorkerPool(args.workers, args.queue_depth, preload, metrics=processor.metrics,
+                             deadline_grace_ms=args.deadline_grace_ms)
+
+    server = AZRAsyncServer(
+        processor=processor,
+        pool=pool,
+        max_in_flight=args.max_in_flight,
+        threads=args.threads,
+        max_frame_size=args.max_frame_size,
+        drain_timeout=args.drain_timeout,
+        codec=get_codec(args.codec),
+        deadline_grace_ms=args.deadline_grace_ms
+    )
+    await server.start(args.socket, args.tcp_port, args.host, preload)
+    await server.serve_until_stopped()
+
+    if args.socket and os.path.exists(args.socket):
+        os.unlink(args.socket)
+
+def main():
+    """
+    Hlavní funkce pro spuštění AZR serveru
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(description='AZR server - asyncio front-end pro AZR bridge')
+    parser.add_argument('--socket', type=str, default='/tmp/azr.sock',
+                        help='Cesta k Unix socketu, prázdná hodnota socket vypne (default: /tmp/azr.sock)')
+    parser.add_argument('--tcp-port', type=int, default=None, help='Volitelný TCP port')
+    parser.add_argument('--host', type=str, default='127.0.0.1', help='Adresa pro TCP (default: 127.0.0.1)')
+    parser.add_argument('--codec', type=str, default=default_codec_name(),
+                        help='Výchozí kodek spojení: json, orjson, msgpack nebo auto (default: AZR_CODEC nebo auto)')
+    parser.add_argument('--max-in-flight', type=int, default=32,
+                        help='Maximální počet současných dotazů na jedno spojení (default: 32)')
+    parser.add_argument('--threads', type=int, default=4,
+                        help='Počet vláken pro CPU náročné dotazy bez poolu (default: 4)')
+    parser.add_argument('--workers', type=int, default=0,
+                        help='Počet pracovních procesů, 0 = bez poolu (default: 0)')
+    parser.add_argument('--queue-depth', type=int, default=64,
+                        help='Maximální počet dotazů čekajících na pracovní proces (default: 64)')
+    parser.add_argument('--max-frame-size', type=int, default=DEFAULT_MAX_FRAME_SIZE,
+                        help='Maximální velikost jedné zprávy v bajtech (default: 64 MB)')
+    parser.add_argument('--drain-timeout', type=float, default=30.0,
+                        help='Maximální doba dokončování dotazů při ukončení v sekundách (default: 30)')
+    parser.add_argument('--deadline-grace-ms', type=float, default=DEFAULT_DEADLINE_GRACE_MS,
+                        help='Tolerance po uplynutí options.deadlineMs, než se odpoví bez výsledku (default: 500)')
+    parser.add_argument('--preload', type=str, default='numpy,pandas,sklearn',
+                        help='Moduly importované při zahřátí, oddělené čárkou (default: numpy,pandas,sklearn)')
+    parser.add_argument('--metrics-file', type=str, default=None,
+                        help='Soubor pro periodický zápis metrik ve formátu Prometheus')
+    parser.add_argument('--metrics-interval', type=float, default=15.0,
+                        help='Interval zápisu metrik v sekundách (default: 15)')
+    args = parser.parse_args()
+
+    if not args.socket and args.tcp_port is None:
+        parser.error("Je třeba zadat --socket nebo --tcp-port")
+    try:
+        get_codec(args.codec)
+    except ValueError as e:
+        parser.error(str(e))
+
+    asyncio.run(run_server(args))
+
+if __name__ == "__main__":
+    main()
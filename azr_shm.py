@@ -0,0 +1,202 @@
+"""
+AZR Shared Memory - předávání dat mezi Node.js a AZR bridge přes sdílenou paměť
+
+Segment vytváří a ruší volající (Node.js), bridge se k němu jen připojí
+podle názvu a po přečtení se odpojí. Segment obsahuje zakódovaný dotaz;
+zarovnání na velikost stránky vyplněné nulovými bajty se ignoruje, pro
+binární kodeky je ale třeba předat přesnou velikost dat.
+
+Velká data lze předat i sloupcově, popisovačem oblasti místo JSON pole:
+
+    {"shm": "<název>" | "path": "<soubor>", "length": 1000000,
+     "columns": {"timestamp": {"offset": 0, "dtype": "int64"},
+                 "amount": {"offset": 8000000, "dtype": "float64"}, ...}}
+
+Sloupce jsou pole little-endian bez hlaviček, čtou se jako numpy pohledy
+přímo do oblasti bez kopírování. Výsledky, které jsou přirozeně pole,
+zapisuje bridge stejným způsobem do oblasti určené volajícím (write_columns)
+a v odpovědi vrací jen její popisovač.
+"""
+
+import mmap
+import os
+from typing import Any, Dict, Optional
+
+# Zarovnání začátku sloupců při zápisu výsledků
+COLUMN_ALIGNMENT = 8
+
+# Povolené typy sloupců
+COLUMN_DTYPES = (
+    "int8", "uint8", "int16", "uint16", "int32", "uint32", "int64", "uint64", "float32", "float64"
+)
+
+def open_shared_memory(name: str):
+    """
+    Připojení k existujícímu segmentu sdílené paměti
+
+    Segment se neregistruje u resource trackeru, jinak by ho Python při
+    ukončení procesu smazal, přestože ho vlastní volající.
+    """
+    from multiprocessing import shared_memory
+
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13 nemá parametr track
+        from multiprocessing import resource_tracker
+
+        segment = shared_memory.SharedMemory(name=name)
+        try:
+            resource_tracker.unregister(segment._name, "shared_memory")
+        except Exception:
+            pass
+        return segment
+
+def read_message(name: str, codec, size: Optional[int] = None) -> Any:
+    """
+    Načtení a dekódování zprávy ze segmentu sdílené paměti
+
+    S `size` se dekóduje přímo pohled do segmentu bez kopírování (pokud to
+    kodek umí), bez něj se odříznou koncové nulové bajty.
+    """
+    segment = open_shared_memory(name)
+    try:
+        if size is not None:
+            if size > segment.size:
+                raise ValueError(f"Velikost dat ({size} B) přesahuje velikost segmentu ({segment.size} B)")
+            view = segment.buf[:size]
+            try:
+                return codec.decode(view)
+            finally:
+                view.release()
+        return codec.decode(bytes(segment.buf).rstrip(b"\x00"))
+    finally:
+        segment.close()
+
+def references_region(data: Any) -> bool:
+    """
+    Zda data dotazu odkazují na oblast sdílené paměti, mapovaný soubor,
+    soubor s exportem (data.file) nebo předpočítanou kostku (data.cube)
+
+    Obsah oblasti není součástí klíče mezipaměti, takové dotazy se proto
+    neukládají.
+    """
+    return isinstance(data, dict) and any(key in data for key in ("columnar", "output", "file", "cube"))
+
+def _column_dtype(name: str):
+    import numpy as np
+
+    if name not in COLUMN_DTYPES:
+        raise ValueError(f"Nepodporovaný typ sloupce: {name} (povolené: {', '.join(COLUMN_DTYPES)})")
+    return np.dtype(name).newbyteorder("<")
+
+class ColumnarRegion:
+    """
+    Sloupcová data v oblasti sdílené paměti nebo v mapovaném souboru
+
+    Sloupce jsou numpy pohledy do oblasti, platí jen do zavolání close().
+    """
+    def __init__(self, descriptor: Dict[str, Any]):
+        import numpy as np
+
+        self.segment = None
+        self.mapping = None
+        if descriptor.get("shm"):
+            self.segment = open_shared_memory(descriptor["shm"])
+            buffer = self.segment.buf
+        elif descriptor.get("path"):
+            with open(descriptor["path"], "rb") as f:
+                self.mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            buffer = self.mapping
+        else:
+            raise ValueError("Popisovač oblasti musí obsahovat shm nebo path")
+
+        self.length = int(descriptor.get("length", 0))
+        self.columns: Dict[str, Any] = {}
+        try:
+            for name, column in (descriptor.get("columns") or {}).items():
+                dtype = _column_dtype(column.get("dtype", "float64"))
+                offset = int(column.get("offset", 0))
+                length = int(column.get("length", self.length))
+                if offset < 0 or offset + length * dtype.itemsize > len(buffer):
+                    raise ValueError(f"Sloupec {name} přesahuje velikost oblasti ({len(buffer)} B)")
+                self.columns[name] = np.frombuffer(buffer, dtype=dtype, count=length, offset=offset)
+        except Exception:
+            self.close()
+            raise
+
+    def close(self) -> None:
+        """Uvolnění pohledů a odpojení od oblasti"""
+        self.columns.clear()
+        try:
+            if self.segment is not None:
+                self.segment.close()
+            if self.mapping is not None:
+                self.mapping.close()
+        except BufferError:
+            # Na oblast ještě odkazuje některé pole, uvolní se spolu s ním
+            pass
+        self.segment = None
+        self.mapping = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+def write_columns(target: Dict[str, Any], arrays: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Zápis polí do nové oblasti sdílené paměti nebo souboru
+
+    `target` určuje název segmentu ({"shm": ...}) nebo cestu ({"path": ...}),
+    oblast vlastní volající a po přečtení ji sám smaže. Vrací popisovač
+    oblasti se sloupci ve stejném tvaru, jaký přijímá ColumnarRegion.
+    """
+    import numpy as np
+
+    prepared = {}
+    columns = {}
+    size = 0
+    for name, values in arrays.items():
+        values = np.ascontiguousarray(values)
+        dtype = _column_dtype(values.dtype.name)
+        values = values.astype(dtype, copy=False)
+        size += -size % COLUMN_ALIGNMENT
+        columns[name] = {"offset": size, "dtype": dtype.name, "length": int(values.shape[0])}
+        prepared[name] = values
+        size += values.nbytes
+
+    if target.get("shm"):
+        from multiprocessing import shared_memory
+
+        try:
+            segment = shared_memory.SharedMemory(name=target["shm"], create=True, size=max(size, 1), track=False)
+        except TypeError:
+            from multiprocessing import resource_tracker
+
+            segment = shared_memory.SharedMemory(name=target["shm"], create=True, size=max(size, 1))
+            try:
+                resource_tracker.unregister(segment._name, "shared_memory")
+            except Exception:
+                pass
+        try:
+            for name, values in prepared.items():
+                offset = columns[name]["offset"]
+                segment.buf[offset:offset + values.nbytes] = values.tobytes()
+        finally:
+            segment.close()
+        location = {"shm": target["shm"]}
+    elif target.get("path"):
+        tmp_path = f"{target['path']}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            for name, values in prepared.items():
+                f.seek(columns[name]["offset"])
+                f.write(values.tobytes())
+            f.truncate(size)
+        os.replace(tmp_path, target["path"])
+        location = {"path": target["path"]}
+    else:
+        raise ValueError("Cíl výstupu musí obsahovat shm nebo path")
+
+    return {**location, "size": size, "columns": columns}
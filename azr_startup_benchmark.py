@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Benchmark studeného startu AZR bridge
+
+Měří dobu importu azr_bridge a jednotlivých volitelných modulů (pomocí
+`python -X importtime`) a celkovou dobu jednorázového volání bridge.
+Výsledky lze uložit jako baseline do benchmarks/startup_baseline.json
+a při dalších bězích s ní porovnat, aby se regrese startu projevily hned.
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Any
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+BRIDGE_PATH = os.path.join(BASE_DIR, "azr_bridge.py")
+DEFAULT_BASELINE = os.path.join(BASE_DIR, "benchmarks", "startup_baseline.json")
+
+# Dotazy, jejichž jednorázové volání měříme od spuštění interpretu po výstup
+ONE_SHOT_QUERIES = {
+    "azr_capabilities": {"type": "azr_capabilities"},
+    "reservation_analysis": {
+        "type": "reservation_analysis",
+        "data": {"suggestion": {"startTime": "18:00", "date": "sobota", "price": 400, "tokenPrice": 4}}
+    }
+}
+
+def parse_importtime(stderr: str) -> Dict[str, int]:
+    """
+    Parsování výstupu `-X importtime` na kumulativní dobu importu modulů (µs)
+    """
+    timings = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        timings[parts[2].strip()] = int(parts[1].strip())
+    return timings
+
+def _measure_env() -> Dict[str, str]:
+    """
+    Prostředí měřených procesů s ukládáním bytecode jako v provozu
+
+    S PYTHONDONTWRITEBYTECODE by každý běh znovu kompiloval změněné moduly
+    a měření by záviselo na stavu __pycache__.
+    """
+    env = dict(os.environ)
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    return env
+
+def measure_import(module: str, runs: int) -> float:
+    """
+    Medián kumulativní doby importu modulu v milisekundách
+    """
+    samples = []
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            capture_output=True, text=True, cwd=BASE_DIR, env=_measure_env()
+        )
+        if result.returncode != 0:
+            return -1.0
+        samples.append(parse_importtime(result.stderr).get(module, 0) / 1000)
+    return round(statistics.median(samples), 3)
+
+def measure_one_shot(query: Dict[str, Any], runs: int) -> float:
+    """
+    Medián doby jednorázového volání `python azr_bridge.py <query_json>` v milisekundách
+    """
+    samples = []
+    payload = json.dumps(query)
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, BRIDGE_PATH, payload], capture_output=True, cwd=BASE_DIR, env=_measure_env())
+        samples.append((time.perf_counter() - started) * 1000)
+    return round(statistics.median(samples), 3)
+
+def run_benchmark(runs: int) -> Dict[str, Dict[str, float]]:
+    """
+    Provedení všech měření startu
+    """
+    import azr_bridge
+
+    imports = {"azr_bridge": measure_import("azr_bridge", runs)}
+    for module in azr_bridge.OPTIONAL_MODULES:
+        if azr_bridge.module_available(module):
+            imports[module] = measure_import(module, runs)
+
+    one_shot = {name: measure_one_shot(query, runs) for name, query in ONE_SHOT_QUERIES.items()}
+    return {"importMs": imports, "oneShotMs": one_shot}
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]],
+            threshold: float, min_delta_ms: float) -> List[str]:
+    """
+    Porovnání s baseline, vrací seznam regresí
+
+    Za regresi se považuje zpomalení o více než `threshold` (relativně)
+    a zároveň o více než `min_delta_ms`, aby šum u rychlých měření nevedl k chybám.
+    """
+    regressions = []
+    for section, values in results.items():
+        for name, value in values.items():
+            reference = baseline.get(section, {}).get(name)
+            if reference is None or reference <= 0 or value < 0:
+                continue
+            if value > reference * (1 + threshold) and value - reference > min_delta_ms:
+                regressions.append(f"{section}.{name}: {value:.1f} ms (baseline {reference:.1f} ms)")
+    return regressions
+
+def main():
+    """
+    Hlavní funkce benchmarku startu
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Benchmark studeného startu AZR bridge')
+    parser.add_argument('--runs', type=int, default=5, help='Počet opakování měření (default: 5)')
+    parser.add_argument('--baseline', type=str, default=DEFAULT_BASELINE,
+                        help='Soubor s baseline (default: benchmarks/startup_baseline.json)')
+    parser.add_argument('--update-baseline', action='store_true', help='Uloží výsledky jako novou baseline')
+    parser.add_argument('--threshold', type=float, default=0.3,
+                        help='Povolené relativní zpomalení oproti baseline (default: 0.3)')
+    parser.add_argument('--min-delta-ms', type=float, default=5.0,
+                        help='Minimální absolutní zpomalení považované za regresi (default: 5 ms)')
+    args = parser.parse_args()
+
+    results = run_benchmark(args.runs)
+    print(json.dumps(results, indent=2))
+
+    if args.update_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+            f.write("\n")
+        print(f"Baseline uložena do {args.baseline}", file=sys.stderr)
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"Baseline {args.baseline} neexistuje, porovnání přeskočeno", file=sys.stderr)
+        return
+
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+
+    regressions = compare(results, baseline, args.threshold, args.min_delta_ms)
+    if regressions:
+        print("Regrese startu:", file=sys.stderr)
+        for regression in regressions:
+            print(f"  {regression}", file=sys.stderr)
+        sys.exit(1)
+
+    print("Bez regresí oproti baseline", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
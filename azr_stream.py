@@ -0,0 +1,45 @@
+"""
+AZR Stream - průběžné odesílání částečných výsledků dotazu
+
+Procesor zpracovávající mnoho nezávislých položek (např. token_analysis_bulk)
+může s options.stream posílat výsledek každé položky hned po dokončení.
+Transport (serve_stream, pool, asyncio server, jednorázový režim) nastaví
+pro dobu zpracování dotazu funkci pro odeslání zprávy a procesor volá
+emit_partial; bez nastavené funkce vrací procesor vše až v odpovědi.
+
+Částečné zprávy mají příznak "partial": true a stejné "id" jako dotaz,
+po nich vždy následuje jedna konečná odpověď.
+"""
+
+import contextlib
+import contextvars
+from typing import Dict, Any, Callable, Iterator, Optional
+
+_current_emitter: contextvars.ContextVar = contextvars.ContextVar("azr_stream", default=None)
+
+@contextlib.contextmanager
+def partial_results(emit: Optional[Callable[[Dict[str, Any]], None]]) -> Iterator[None]:
+    """
+    Nastavení funkce pro odesílání částečných výsledků v tomto bloku
+    """
+    token = _current_emitter.set(emit)
+    try:
+        yield
+    finally:
+        _current_emitter.reset(token)
+
+def streaming_available() -> bool:
+    """
+    Transport dotazu umí částečné výsledky odeslat
+    """
+    return _current_emitter.get() is not None
+
+def emit_partial(message: Dict[str, Any]) -> bool:
+    """
+    Odeslání částečného výsledku, vrací False pokud transport streamování neumí
+    """
+    emit = _current_emitter.get()
+    if emit is None:
+        return False
+    emit({"partial": True, **message})
+    return True
@@ -0,0 +1,885 @@
+"""
+AZR Token Kernel - jednoprůchodová agregace transakcí FitnessTokens
+
+Transakce se převedou na celočíselné kódy (typ, kategorie) a časové koše
+(měsíc, hodina, den v týdnu) a všechny součty pro token_analysis se spočítají
+několika voláními np.bincount nad jedním průchodem dat. Na rozdíl od
+opakovaného filtrování a groupby nad DataFrame nevznikají mezilehlé kopie
+ani textové sloupce (strftime).
+
+Součty se vracejí v typu sloupce amount (celá čísla zůstávají celými čísly)
+a klíče rozložení mají stejné pořadí jako výsledky pandas groupby, takže
+odpověď procesoru je stejná jako při výpočtu přes DataFrame.
+"""
+
+import copy
+import itertools
+from typing import Dict, Any, Callable, List, Optional, Tuple
+
+import numpy as np
+
+# Kódy typů transakcí; "other" zahrnuje neznámé i chybějící typy
+TYPE_EARNED = 0
+TYPE_SPENT = 1
+TYPE_OTHER = 2
+TYPE_COUNT = 3
+
+WEEKDAY_NAMES = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+# Sloupce transakcí, které analýza potřebuje
+TRANSACTION_COLUMNS = ["transactionDate", "amount", "type", "category"]
+
+NS_PER_MS = 1000000
+NS_PER_HOUR = 3600 * 1000 * NS_PER_MS
+NS_PER_DAY = 24 * NS_PER_HOUR
+
+# 1. 1. 1970 byl čtvrtek (pondělí = 0)
+EPOCH_WEEKDAY = 3
+
+# Chybějící čas (NaT) v int64 reprezentaci
+NAT = np.iinfo(np.int64).min
+
+# Délky časových oken options.timeframe a predictionWindow
+TIMEFRAMES = {
+    "day": {"days": 1},
+    "week": {"days": 7},
+    "month": {"months": 1},
+    "quarter": {"months": 3},
+    "year": {"years": 1}
+}
+
+# Průměrná délka měsíce ve dnech
+DAYS_PER_MONTH = 365.25 / 12
+
+# Délky oken predikce v měsících
+PREDICTION_MONTHS = {
+    "day": 1 / DAYS_PER_MONTH,
+    "week": 7 / DAYS_PER_MONTH,
+    "month": 1.0,
+    "quarter": 3.0,
+    "year": 12.0
+}
+
+class TimeWindow:
+    """
+    Časové okno analýzy [start, end) v místních ns od epochy
+
+    Chybějící hranice (None) znamená okno neomezené z dané strany.
+    Transakce bez platného času do žádného okna nepatří.
+    """
+    def __init__(self, start_ns: Optional[int], end_ns: Optional[int], timeframe: str = "all",
+                 granularity: str = "transaction"):
+        self.start_ns = start_ns
+        self.end_ns = end_ns
+        self.timeframe = timeframe
+        self.granularity = granularity
+
+    def bounds(self) -> Tuple[int, int]:
+        """Hranice pro porovnání s časy transakcí (NAT leží před každým oknem)"""
+        start = self.start_ns if self.start_ns is not None else NAT + 1
+        end = self.end_ns if self.end_ns is not None else np.iinfo(np.int64).max
+        return start, end
+
+    def month_bounds(self) -> Tuple[Optional[int], Optional[int]]:
+        """První a poslední měsíc (index od ledna 1970), do kterého okno zasahuje"""
+        first = last = None
+        if self.start_ns is not None:
+            first = int(np.datetime64(self.start_ns, "ns").astype("datetime64[M]").view(np.int64))
+        if self.end_ns is not None:
+            last = int(np.datetime64(self.end_ns - 1, "ns").astype("datetime64[M]").view(np.int64))
+        return first, last
+
+    def monthly(self) -> "TimeWindow":
+        """
+        Okno rozšířené na celé měsíce (pro agregace po měsících, např. kostku)
+        """
+        first, last = self.month_bounds()
+        start = end = None
+        if first is not None:
+            start = int(np.datetime64(first, "M").astype("datetime64[ns]").view(np.int64))
+        if last is not None:
+            end = int(np.datetime64(last + 1, "M").astype("datetime64[ns]").view(np.int64))
+        return TimeWindow(start, end, self.timeframe, "month")
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Popis okna pro odpověď (ISO časy bez časové zóny)"""
+        def iso(value):
+            if value is None:
+                return None
+            return np.datetime64(value, "ns").astype("datetime64[us]").item().isoformat()
+
+        return {
+            "timeframe": self.timeframe,
+            "from": iso(self.start_ns),
+            "to": iso(self.end_ns),
+            "granularity": self.granularity
+        }
+
+def _local_ns(value: Any, name: str) -> int:
+    """Čas z options.from / options.to jako místní ns od epochy (zóna se odřízne jako u transakcí)"""
+    import pandas as pd
+
+    try:
+        stamp = pd.Timestamp(value) if isinstance(value, str) else pd.NaT
+    except ValueError:
+        stamp = pd.NaT
+    if stamp is pd.NaT:
+        raise ValueError(f"options.{name} musí být čas ve formátu ISO 8601: {value!r}")
+    if stamp.tzinfo is not None:
+        stamp = stamp.tz_localize(None)
+    return int(stamp.as_unit("ns").value)
+
+def time_window(options: Dict[str, Any], now: Any = None) -> Optional[TimeWindow]:
+    """
+    Časové okno z options.timeframe, options.from a options.to
+
+    timeframe je "all" (výchozí, celá historie) nebo klíč TIMEFRAMES; from
+    (včetně) a to (bez) jsou ISO časy. Okno s timeframe bez hranic končí
+    v `now` (výchozí aktuální místní čas), s jednou hranicí se od ní
+    odměří; s oběma hranicemi se timeframe nepoužije. Bez omezení vrací None.
+    """
+    import pandas as pd
+
+    timeframe = options.get("timeframe") or "all"
+    if timeframe != "all" and timeframe not in TIMEFRAMES:
+        raise ValueError(f"Neznámé časové okno: {timeframe} (podporovaná: all, {', '.join(TIMEFRAMES)})")
+    start = _local_ns(options["from"], "from") if options.get("from") is not None else None
+    end = _local_ns(options["to"], "to") if options.get("to") is not None else None
+    if timeframe == "all" and start is None and end is None:
+        return None
+
+    if timeframe != "all" and (start is None or end is None):
+        offset = pd.DateOffset(**TIMEFRAMES[timeframe])
+        if start is not None:
+            end = (pd.Timestamp(start) + offset).value
+        else:
+            anchor = pd.Timestamp(end) if end is not None else pd.Timestamp(now or pd.Timestamp.now())
+            end = anchor.value
+            start = (anchor - offset).value
+    if start is not None and end is not None and start >= end:
+        raise ValueError("options.from musí předcházet options.to")
+    return TimeWindow(start, end, timeframe)
+
+def prediction_window(options: Dict[str, Any]) -> Tuple[str, float]:
+    """
+    Okno predikce z options.predictionWindow (výchozí "month") a jeho délka v měsících
+    """
+    name = options.get("predictionWindow") or "month"
+    if name not in PREDICTION_MONTHS:
+        raise ValueError(f"Neznámé okno predikce: {name} (podporovaná: {', '.join(PREDICTION_MONTHS)})")
+    return name, PREDICTION_MONTHS[name]
+
+def _is_ascending(values: np.ndarray) -> bool:
+    return len(values) < 2 or bool(np.all(values[1:] >= values[:-1]))
+
+def window_positions(timestamps_ns: np.ndarray, window: TimeWindow, assume_sorted: bool = False) -> np.ndarray:
+    """
+    Vzestupné pozice transakcí v časovém okně
+
+    U vzestupně nebo sestupně seřazených časů (s assume_sorted se pořadí
+    neověřuje) se hranice okna najdou binárním hledáním, vybírá se tak jen
+    souvislý úsek a práce dalších kroků odpovídá velikosti okna, ne celé
+    historii. Neseřazené časy se filtrují maskou.
+    """
+    start, end = window.bounds()
+    if assume_sorted or _is_ascending(timestamps_ns):
+        first, stop = np.searchsorted(timestamps_ns, [start, end])
+        return np.arange(first, stop)
+    reverse = timestamps_ns[::-1]
+    if _is_ascending(reverse):
+        first, stop = np.searchsorted(reverse, [start, end])
+        size = len(timestamps_ns)
+        return np.arange(size - stop, size - first)
+    return np.flatnonzero((timestamps_ns >= start) & (timestamps_ns < end))
+
+def type_lookup(labels: List[Any]) -> np.ndarray:
+    """
+    Převodní tabulka z kódů typů volajícího na TYPE_*
+
+    Poslední prvek patří kódu -1 (chybějící hodnota).
+    """
+    return np.array(
+        [TYPE_EARNED if label == "earned" else TYPE_SPENT if label == "spent" else TYPE_OTHER
+         for label in labels] + [TYPE_OTHER],
+        dtype=np.int64
+    )
+
+def transaction_arrays(transactions: List[Dict[str, Any]], with_ids: bool = False) -> Dict[str, Any]:
+    """
+    Sloupce transakcí ve tvaru JSON jako pole pro TokenRollup.from_arrays
+
+    Převádějí se jen potřebné sloupce (s with_ids i "id"), ostatní klíče
+    transakcí se vůbec nečtou. "dates" jsou původní časy včetně časové zóny.
+    """
+    import pandas as pd
+
+    columns = TRANSACTION_COLUMNS + ["id"] if with_ids else TRANSACTION_COLUMNS
+    return frame_arrays(pd.DataFrame(transactions, columns=columns), with_ids)
+
+def frame_arrays(df: Any, with_ids: bool = False) -> Dict[str, Any]:
+    """
+    Sloupce TRANSACTION_COLUMNS (a s with_ids "id") z DataFrame jako pole
+    pro TokenRollup.from_arrays, viz transaction_arrays
+    """
+    import pandas as pd
+
+    dates = pd.to_datetime(df["transactionDate"])
+    local = dates.dt.tz_localize(None) if dates.dt.tz is not None else dates
+
+    type_codes, type_labels = pd.factorize(df["type"])
+    category_codes, categories = pd.factorize(df["category"])
+    arrays = {
+        "timestamps_ns": local.to_numpy(dtype="datetime64[ns]").view(np.int64),
+        "amounts": df["amount"].to_numpy(),
+        "types": type_lookup(list(type_labels))[type_codes],
+        "category_codes": category_codes,
+        "categories": list(categories),
+        "dates": dates
+    }
+    if with_ids:
+        arrays["ids"] = df["id"].to_numpy()
+    return arrays
+
+def _max_amount(first: Any, second: Any) -> Any:
+    """Větší ze dvou maxim, chybějící (None, NaN) se přeskočí"""
+    if first is None or first != first:
+        return second
+    if second is None or second != second:
+        return first
+    return max(first, second)
+
+def _check_codes(codes: np.ndarray, labels: List[Any], name: str) -> None:
+    if len(codes) and (codes.min() < -1 or codes.max() >= len(labels)):
+        raise ValueError(f"Sloupec {name} obsahuje kód mimo rozsah ({len(labels)} hodnot)")
+
+def _coded_column(values: np.ndarray, labels: List[Any], name: str) -> Tuple[np.ndarray, List[Any]]:
+    """
+    Kódy a hodnoty sloupce: celočíselný sloupec jsou kódy do labels,
+    jiný (řetězce) se zakóduje v pořadí prvního výskytu jako u transakcí JSON
+    """
+    if values.dtype.kind in "iu":
+        codes = values.astype(np.int64)
+        _check_codes(codes, labels, name)
+        return codes, labels
+    import pandas as pd
+
+    codes, uniques = pd.factorize(values)
+    return codes.astype(np.int64, copy=False), list(uniques)
+
+def _column_timestamps(values: np.ndarray) -> Tuple[np.ndarray, Optional[Callable[[int], str]]]:
+    """Časový sloupec jako místní ns od epochy a funkce pro původní zápis času (jen u ISO řetězců)"""
+    if values.dtype.kind == "M":
+        return values.astype("datetime64[ns]").view(np.int64), None
+    if values.dtype.kind in "iuf":
+        return values.astype(np.int64) * NS_PER_MS, None
+    import pandas as pd
+
+    dates = pd.to_datetime(pd.Series(values))
+    local = dates.dt.tz_localize(None) if dates.dt.tz is not None else dates
+    return local.to_numpy(dtype="datetime64[ns]").view(np.int64), lambda index: dates.iloc[index].isoformat()
+
+def window_columns(columns: Dict[str, np.ndarray], window: TimeWindow,
+                   assume_sorted: bool = False) -> Dict[str, np.ndarray]:
+    """
+    Sloupcové transakce zúžené na časové okno (viz window_positions)
+
+    Sloupec timestamp v ms se prohledává přímo, bez převodu celého sloupce,
+    u mapovaného souboru se tak čtou jen stránky s transakcemi okna.
+    """
+    time_column = "timestamp" if "timestamp" in columns else "transactionDate"
+    if time_column not in columns:
+        raise ValueError(f"Ve sloupcových datech chybí sloupec {time_column}")
+    values = columns[time_column]
+    if values.dtype.kind in "iuf":
+        # ms * NS_PER_MS >= start právě když ms >= ceil(start / NS_PER_MS)
+        start, end = (-(-bound // NS_PER_MS) for bound in window.bounds())
+        if values.dtype.kind in "iu":
+            info = np.iinfo(values.dtype)
+            start, end = min(max(start, info.min), info.max), min(max(end, info.min), info.max)
+        window = TimeWindow(start, end)
+        timestamps = values
+    else:
+        timestamps, _ = _column_timestamps(values)
+    positions = window_positions(timestamps, window, assume_sorted)
+    return {name: column[positions] for name, column in columns.items()}
+
+def column_arrays(columns: Dict[str, np.ndarray], descriptor: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Sloupcové transakce jako pole pro TokenRollup.from_arrays
+
+    Čas je sloupec timestamp (ms od epochy, nebo datetime64 z Arrow),
+    případně transactionDate s ISO řetězci jako u transakcí JSON (pak se
+    čas nejnovější transakce vrací v původním zápisu). Sloupce type
+    a category (volitelný) jsou kódy do typeCodes a categoryCodes
+    (-1 = bez kategorie), nebo přímo hodnoty.
+    """
+    time_column = "timestamp" if "timestamp" in columns else "transactionDate"
+    for name in (time_column, "amount", "type"):
+        if name not in columns:
+            raise ValueError(f"Ve sloupcových datech chybí sloupec {name}")
+
+    timestamps_ns, timestamp_label = _column_timestamps(columns[time_column])
+    type_codes, type_labels = _coded_column(columns["type"], descriptor.get("typeCodes") or ["earned", "spent"], "type")
+    category_codes, categories = None, []
+    if "category" in columns:
+        category_codes, categories = _coded_column(columns["category"], descriptor.get("categoryCodes") or [], "category")
+    return {
+        "timestamps_ns": timestamps_ns,
+        "amounts": columns["amount"],
+        "types": type_lookup(type_labels)[type_codes],
+        "category_codes": category_codes,
+        "categories": categories,
+        "timestamp_label": timestamp_label
+    }
+
+class TokenRollup:
+    """
+    Agregované součty transakcí jednoho uživatele pro token_analysis
+
+    Součty podle typu, měsíce, hodiny, dne v týdnu a kategorie spolu
+    s počty transakcí v jednotlivých koších (koše bez transakcí se do
+    rozložení nezahrnují, stejně jako u groupby).
+    """
+    def __init__(self, integer: bool = True):
+        self.integer = integer
+        self.count = 0
+        self.amount_count = 0
+        self.amount_total = 0.0
+        self.amount_max: Any = None
+        self.last_ns: Optional[int] = None
+        self.last_iso: Optional[str] = None
+        self.type_sum = np.zeros(TYPE_COUNT)
+        self.hour_sum = np.zeros(24)
+        self.hour_count = np.zeros(24, dtype=np.int64)
+        self.weekday_sum = np.zeros(7)
+        self.weekday_count = np.zeros(7, dtype=np.int64)
+        # Měsíce jako index od ledna 1970, pole začínají měsícem month_base
+        self.month_base = 0
+        self.month_sum = np.zeros((TYPE_COUNT, 0))
+        self.month_count = np.zeros(0, dtype=np.int64)
+        self.categories: List[Any] = []
+        self.category_sum = np.zeros((TYPE_COUNT, 0))
+        self.category_count = np.zeros((TYPE_COUNT, 0), dtype=np.int64)
+
+    @classmethod
+    def from_arrays(cls, timestamps_ns: np.ndarray, amounts: np.ndarray, types: np.ndarray,
+                    category_codes: Optional[np.ndarray] = None, categories: Optional[List[Any]] = None,
+                    timestamp_label: Optional[Callable[[int], str]] = None) -> "TokenRollup":
+        """
+        Agregace z polí stejné délky
+
+        timestamps_ns jsou místní časy v ns od epochy (NAT = chybějící čas),
+        types kódy TYPE_*, category_codes indexy do categories (-1 = bez
+        kategorie). timestamp_label(index) vrací ISO zápis času transakce s daným
+        indexem v původní podobě (včetně časové zóny); bez něj se čas
+        nejnovější transakce zapíše bez zóny.
+        """
+        rollup = cls(integer=amounts.dtype.kind in "iub")
+        count = len(amounts)
+        rollup.count = count
+        if count == 0:
+            return rollup
+
+        types = types.astype(np.int64, copy=False)
+        if rollup.integer:
+            weights = amounts.astype(np.float64)
+            rollup.amount_count = count
+            rollup.amount_max = amounts.max()
+        else:
+            weights = amounts.astype(np.float64, copy=False)
+            valid_amount = ~np.isnan(weights)
+            rollup.amount_count = int(valid_amount.sum())
+            rollup.amount_max = np.nanmax(weights) if rollup.amount_count else np.nan
+            if rollup.amount_count < count:
+                weights = np.where(valid_amount, weights, 0.0)
+        rollup.amount_total = float(weights.sum())
+        rollup.type_sum = np.bincount(types, weights, minlength=TYPE_COUNT)
+
+        if category_codes is not None and categories:
+            size = len(categories)
+            category_codes = category_codes.astype(np.int64, copy=False)
+            present = category_codes >= 0
+            keys = types[present] * size + category_codes[present]
+            rollup.categories = list(categories)
+            rollup.category_sum = np.bincount(keys, weights[present],
+                                              minlength=TYPE_COUNT * size).reshape(TYPE_COUNT, size)
+            rollup.category_count = np.bincount(keys, minlength=TYPE_COUNT * size).reshape(TYPE_COUNT, size)
+
+        # Časové koše jen pro transakce s platným časem
+        valid_time = timestamps_ns != NAT
+        positions = None
+        if not valid_time.all():
+            positions = np.flatnonzero(valid_time)
+            timestamps_ns = timestamps_ns[valid_time]
+            types = types[valid_time]
+            weights = weights[valid_time]
+        if not len(timestamps_ns):
+            return rollup
+
+        latest = int(timestamps_ns.argmax())
+        rollup.last_ns = int(timestamps_ns[latest])
+        if timestamp_label is not None:
+            rollup.last_iso = timestamp_label(int(positions[latest]) if positions is not None else latest)
+        else:
+            rollup.last_iso = np.datetime64(rollup.last_ns, "ns").astype("datetime64[us]").item().isoformat()
+
+        hours = (timestamps_ns // NS_PER_HOUR) % 24
+        rollup.hour_sum = np.bincount(hours, weights, minlength=24)
+        rollup.hour_count = np.bincount(hours, minlength=24)
+
+        weekdays = (timestamps_ns // NS_PER_DAY + EPOCH_WEEKDAY) % 7
+        rollup.weekday_sum = np.bincount(weekdays, weights, minlength=7)
+        rollup.weekday_count = np.bincount(weekdays, minlength=7)
+
+        months = timestamps_ns.view("datetime64[ns]").astype("datetime64[M]").view(np.int64)
+        rollup.month_base = int(months.min())
+        months = months - rollup.month_base
+        span = int(months.max()) + 1
+        rollup.month_sum = np.bincount(types * span + months, weights,
+                                       minlength=TYPE_COUNT * span).reshape(TYPE_COUNT, span)
+        rollup.month_count = np.bincount(months, minlength=span)
+        return rollup
+
+    @classmethod
+    def from_transactions(cls, transactions: List[Dict[str, Any]],
+                          window: Optional[TimeWindow] = None) -> "TokenRollup":
+        """
+        Agregace transakcí ve tvaru JSON (transactionDate, amount, type, category),
+        s `window` jen transakcí v časovém okně
+        """
+        arrays = transaction_arrays(transactions)
+        if window is None:
+            return cls.from_transaction_arrays(arrays)
+        return cls.from_transaction_arrays(arrays, window_positions(arrays["timestamps_ns"], window))
+
+    @classmethod
+    def from_transaction_arrays(cls, arrays: Dict[str, Any],
+                                selection: Optional[np.ndarray] = None) -> "TokenRollup":
+        """
+        Agregace polí z transaction_arrays, volitelně jen vybraných pozic
+        """
+        dates = arrays["dates"]
+        if selection is None:
+            return cls.from_arrays(
+                arrays["timestamps_ns"], arrays["amounts"], arrays["types"],
+                arrays["category_codes"], arrays["categories"],
+                timestamp_label=lambda index: dates.iloc[index].isoformat()
+            )
+        return cls.from_arrays(
+            arrays["timestamps_ns"][selection], arrays["amounts"][selection], arrays["types"][selection],
+            arrays["category_codes"][selection], arrays["categories"],
+            timestamp_label=lambda index: dates.iloc[int(selection[index])].isoformat()
+        )
+
+    @classmethod
+    def from_columnar(cls, descriptor: Dict[str, Any], window: Optional[TimeWindow] = None) -> "TokenRollup":
+        """
+        Agregace sloupcových transakcí ze sdílené paměti, souboru nebo zprávy
+
+        Sloupce viz column_arrays. Data se čtou přímo, bez převodu na DataFrame.
+        S `window` jen transakce v časovém okně; popisovač s "sorted": true
+        slibuje vzestupně seřazený čas a jeho ověření se přeskočí.
+        """
+        from azr_columnar import open_columns
+
+        with open_columns(descriptor) as region:
+            columns = region.columns
+            if window is not None:
+                columns = window_columns(columns, window, bool(descriptor.get("sorted")))
+            arrays = column_arrays(columns, descriptor)
+            return cls.from_arrays(
+                arrays["timestamps_ns"], arrays["amounts"], arrays["types"],
+                arrays["category_codes"], arrays["categories"],
+                timestamp_label=arrays["timestamp_label"]
+            )
+
+    def merge(self, other: "TokenRollup") -> "TokenRollup":
+        """
+        Přičtení jiné agregace (např. nových transakcí) k této, vrací self
+
+        Výsledek je stejný jako agregace obou skupin transakcí najednou;
+        pole měsíců a kategorií se podle potřeby rozšíří.
+        """
+        if other.count == 0:
+            return self
+        if self.count == 0:
+            self.__dict__.update(copy.deepcopy(other.__dict__))
+            return self
+
+        self.integer = self.integer and other.integer
+        self.count += other.count
+        self.amount_count += other.amount_count
+        self.amount_total += other.amount_total
+        self.amount_max = _max_amount(self.amount_max, other.amount_max)
+        if other.last_ns is not None and (self.last_ns is None or other.last_ns > self.last_ns):
+            self.last_ns = other.last_ns
+            self.last_iso = other.last_iso
+        self.type_sum = self.type_sum + other.type_sum
+        self.hour_sum = self.hour_sum + other.hour_sum
+        self.hour_count = self.hour_count + other.hour_count
+        self.weekday_sum = self.weekday_sum + other.weekday_sum
+        self.weekday_count = self.weekday_count + other.weekday_count
+
+        if other.month_count.size:
+            if not self.month_count.size:
+                self.month_base = other.month_base
+            base = min(self.month_base, other.month_base)
+            end = max(self.month_base + self.month_count.size, other.month_base + other.month_count.size)
+            month_sum = np.zeros((TYPE_COUNT, end - base))
+            month_count = np.zeros(end - base, dtype=np.int64)
+            for rollup in (self, other):
+                start = rollup.month_base - base
+                stop = start + rollup.month_count.size
+                month_sum[:, start:stop] += rollup.month_sum
+                month_count[start:stop] += rollup.month_count
+            self.month_base = base
+            self.month_sum = month_sum
+            self.month_count = month_count
+
+        if other.categories:
+            index = {label: position for position, label in enumerate(self.categories)}
+            added = [label for label in other.categories if label not in index]
+            if added:
+                for label in added:
+                    index[label] = len(self.categories)
+                    self.categories.append(label)
+                padding = ((0, 0), (0, len(added)))
+                self.category_sum = np.pad(self.category_sum, padding)
+                self.category_count = np.pad(self.category_count, padding)
+            positions = [index[label] for label in other.categories]
+            np.add.at(self.category_sum, (slice(None), positions), other.category_sum)
+            np.add.at(self.category_count, (slice(None), positions), other.category_count)
+        return self
+
+    def to_state(self) -> Dict[str, Any]:
+        """
+        Stav agregace z vestavěných typů (pro uložení jako JSON)
+        """
+        amount_max = self.amount_max.item() if hasattr(self.amount_max, "item") else self.amount_max
+        return {
+            "integer": self.integer,
+            "count": self.count,
+            "amountCount": self.amount_count,
+            "amountTotal": self.amount_total,
+            "amountMax": amount_max,
+            "lastNs": self.last_ns,
+            "lastIso": self.last_iso,
+            "typeSum": self.type_sum.tolist(),
+            "hourSum": self.hour_sum.tolist(),
+            "hourCount": self.hour_count.tolist(),
+            "weekdaySum": self.weekday_sum.tolist(),
+            "weekdayCount": self.weekday_count.tolist(),
+            "monthBase": self.month_base,
+            "monthSum": self.month_sum.tolist(),
+            "monthCount": self.month_count.tolist(),
+            "categories": list(self.categories),
+            "categorySum": self.category_sum.tolist(),
+            "categoryCount": self.category_count.tolist()
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "TokenRollup":
+        """
+        Obnovení agregace ze stavu vytvořeného to_state
+        """
+        rollup = cls(integer=state["integer"])
+        rollup.count = state["count"]
+        rollup.amount_count = state["amountCount"]
+        rollup.amount_total = state["amountTotal"]
+        rollup.amount_max = state["amountMax"]
+        rollup.last_ns = state["lastNs"]
+        rollup.last_iso = state["lastIso"]
+        rollup.type_sum = np.array(state["typeSum"], dtype=np.float64)
+        rollup.hour_sum = np.array(state["hourSum"], dtype=np.float64)
+        rollup.hour_count = np.array(state["hourCount"], dtype=np.int64)
+        rollup.weekday_sum = np.array(state["weekdaySum"], dtype=np.float64)
+        rollup.weekday_count = np.array(state["weekdayCount"], dtype=np.int64)
+        rollup.month_base = state["monthBase"]
+        rollup.month_count = np.array(state["monthCount"], dtype=np.int64)
+        rollup.month_sum = np.array(state["monthSum"], dtype=np.float64).reshape(TYPE_COUNT, rollup.month_count.size)
+        rollup.categories = list(state["categories"])
+        size = len(rollup.categories)
+        rollup.category_sum = np.array(state["categorySum"], dtype=np.float64).reshape(TYPE_COUNT, size)
+        rollup.category_count = np.array(state["categoryCount"], dtype=np.int64).reshape(TYPE_COUNT, size)
+        return rollup
+
+    def _value(self, value: float) -> Any:
+        """Součet v typu sloupce amount"""
+        return int(round(value)) if self.integer else float(value)
+
+    def _values(self, values: np.ndarray) -> np.ndarray:
+        return np.rint(values).astype(np.int64) if self.integer else values
+
+    @property
+    def total_earned(self) -> Any:
+        return self._value(self.type_sum[TYPE_EARNED])
+
+    @property
+    def total_spent(self) -> Any:
+        return self._value(self.type_sum[TYPE_SPENT])
+
+    @property
+    def total_amount(self) -> Any:
+        return self._value(self.amount_total)
+
+    @property
+    def average_amount(self) -> float:
+        return self.amount_total / self.amount_count if self.amount_count else float("nan")
+
+    @property
+    def has_categories(self) -> bool:
+        return bool(self.category_count.any())
+
+    def _sorted_categories(self, mask: np.ndarray) -> List[int]:
+        """Indexy kategorií s transakcemi, seřazené podle názvu jako u groupby"""
+        return sorted(np.flatnonzero(mask).tolist(), key=lambda index: self.categories[index])
+
+    def used_categories(self) -> List[Any]:
+        return [self.categories[index] for index in self._sorted_categories(self.category_count.sum(axis=0) > 0)]
+
+    def favorite_category(self, type_code: int) -> Optional[Any]:
+        """
+        Kategorie s nejvyšším součtem pro daný typ (při shodě první podle názvu)
+        """
+        indexes = self._sorted_categories(self.category_count[type_code] > 0)
+        if not indexes:
+            return None
+        sums = self.category_sum[type_code][indexes]
+        return self.categories[indexes[int(np.argmax(sums))]]
+
+    def category_distribution(self) -> Dict[Any, Any]:
+        totals = self.category_sum.sum(axis=0)
+        return {
+            self.categories[index]: self._value(totals[index])
+            for index in self._sorted_categories(self.category_count.sum(axis=0) > 0)
+        }
+
+    def weekday_distribution(self) -> Dict[str, Any]:
+        """Součty podle dne v týdnu, klíče abecedně jako u groupby podle názvu dne"""
+        return {
+            name: self._value(self.weekday_sum[index])
+            for name, index in sorted((WEEKDAY_NAMES[index], index) for index in np.flatnonzero(self.weekday_count))
+        }
+
+    def hourly_distribution(self) -> Dict[str, Any]:
+        return {str(hour): self._value(self.hour_sum[hour]) for hour in np.flatnonzero(self.hour_count).tolist()}
+
+    def hourly_array(self) -> np.ndarray:
+        """Součty pro hodiny 0-23"""
+        return self._values(self.hour_sum)
+
+    def weekday_array(self) -> np.ndarray:
+        """Součty pro dny pondělí-neděle"""
+        return self._values(self.weekday_sum)
+
+    def active_hours(self, top: int = 3) -> List[int]:
+        """
+        Hodiny s nejvyššími součty
+
+        Pořadí při shodných součtech je stejné jako u sort_values(ascending=False)
+        v pandas (quicksort nad obráceným polem, výsledek obrácený zpět).
+        """
+        hours = np.flatnonzero(self.hour_count)
+        sums = self._values(self.hour_sum[hours])
+        order = hours[::-1][sums[::-1].argsort(kind="quicksort")][::-1]
+        return order[:top].tolist()
+
+    def month_label(self, offset: int) -> str:
+        year, month = divmod(self.month_base + offset, 12)
+        return f"{1970 + year:04d}-{month + 1:02d}"
+
+    def monthly_trend(self) -> List[Dict[str, Any]]:
+        """Příjmy a výdaje po měsících s transakcemi, vzestupně podle měsíce"""
+        return [
+            {
+                "month": self.month_label(offset),
+                "earned": self._value(self.month_sum[TYPE_EARNED][offset]),
+                "spent": self._value(self.month_sum[TYPE_SPENT][offset])
+            }
+            for offset in np.flatnonzero(self.month_count).tolist()
+        ]
+
+    def monthly_columns(self) -> Dict[str, Any]:
+        """Měsíční trend jako sloupce month, earned a spent (stejné měsíce jako monthly_trend)"""
+        offsets = np.flatnonzero(self.month_count)
+        return {
+            "month": [self.month_label(offset) for offset in offsets.tolist()],
+            "earned": self._values(self.month_sum[TYPE_EARNED][offsets]),
+            "spent": self._values(self.month_sum[TYPE_SPENT][offsets])
+        }
+
+def grouped_rollups(users: np.ndarray, user_count: int, timestamps_ns: np.ndarray, amounts: np.ndarray,
+                    types: np.ndarray, category_codes: Optional[np.ndarray] = None,
+                    categories: Optional[List[Any]] = None,
+                    timestamp_label: Optional[Callable[[int], str]] = None) -> List[TokenRollup]:
+    """
+    Agregace transakcí mnoha uživatelů najednou
+
+    users jsou kódy uživatelů 0..user_count-1, ostatní pole jako u
+    TokenRollup.from_arrays. Součty všech uživatelů se spočítají několika
+    voláními np.bincount nad složenými klíči (uživatel × koš), měsíce jen
+    pro dvojice uživatel-měsíc, které v datech skutečně jsou. Vrací seznam
+    agregací v pořadí kódů uživatelů.
+    """
+    integer = amounts.dtype.kind in "iub"
+    users = users.astype(np.int64, copy=False)
+    types = types.astype(np.int64, copy=False)
+    counts = np.bincount(users, minlength=user_count)
+
+    if integer:
+        weights = amounts.astype(np.float64)
+        amount_counts = counts
+        maxes = np.full(user_count, np.iinfo(np.int64).min, dtype=np.int64)
+        np.maximum.at(maxes, users, amounts.astype(np.int64))
+    else:
+        weights = amounts.astype(np.float64, copy=False)
+        valid_amount = ~np.isnan(weights)
+        amount_counts = np.bincount(users[valid_amount], minlength=user_count)
+        maxes = np.full(user_count, np.nan)
+        np.fmax.at(maxes, users, weights)
+        if not valid_amount.all():
+            weights = np.where(valid_amount, weights, 0.0)
+    totals = np.bincount(users, weights, minlength=user_count)
+    type_sums = np.bincount(users * TYPE_COUNT + types, weights,
+                            minlength=user_count * TYPE_COUNT).reshape(user_count, TYPE_COUNT)
+
+    category_sums = category_counts = None
+    if category_codes is not None and categories:
+        size = len(categories)
+        category_codes = category_codes.astype(np.int64, copy=False)
+        present = category_codes >= 0
+        keys = (users[present] * TYPE_COUNT + types[present]) * size + category_codes[present]
+        shape = (user_count, TYPE_COUNT, size)
+        category_sums = np.bincount(keys, weights[present], minlength=int(np.prod(shape))).reshape(shape)
+        category_counts = np.bincount(keys, minlength=int(np.prod(shape))).reshape(shape)
+
+    # Časové koše jen pro transakce s platným časem
+    valid_time = timestamps_ns != NAT
+    positions = np.flatnonzero(valid_time)
+    if len(positions) < len(timestamps_ns):
+        timestamps_ns = timestamps_ns[positions]
+        users = users[positions]
+        types = types[positions]
+        weights = weights[positions]
+
+    hours = (timestamps_ns // NS_PER_HOUR) % 24
+    hour_sums = np.bincount(users * 24 + hours, weights, minlength=user_count * 24).reshape(user_count, 24)
+    hour_counts = np.bincount(users * 24 + hours, minlength=user_count * 24).reshape(user_count, 24)
+    weekdays = (timestamps_ns // NS_PER_DAY + EPOCH_WEEKDAY) % 7
+    weekday_sums = np.bincount(users * 7 + weekdays, weights, minlength=user_count * 7).reshape(user_count, 7)
+    weekday_counts = np.bincount(users * 7 + weekdays, minlength=user_count * 7).reshape(user_count, 7)
+
+    # Nejnovější transakce každého uživatele (první výskyt maxima)
+    latest = np.full(user_count, NAT, dtype=np.int64)
+    np.maximum.at(latest, users, timestamps_ns)
+    at_latest = np.flatnonzero(timestamps_ns == latest[users])
+    latest_users, first = np.unique(users[at_latest], return_index=True)
+    latest_positions = np.full(user_count, -1, dtype=np.int64)
+    latest_positions[latest_users] = positions[at_latest[first]]
+
+    # Dvojice uživatel-měsíc seřazené podle uživatele a měsíce
+    months = timestamps_ns.view("datetime64[ns]").astype("datetime64[M]").view(np.int64)
+    month_keys = month_sums = month_counts = None
+    month_bounds = np.zeros(user_count + 1, dtype=np.int64)
+    if len(months):
+        first_month = int(months.min())
+        span = int(months.max()) - first_month + 1
+        month_keys, inverse = np.unique(users * span + (months - first_month), return_inverse=True)
+        month_sums = np.bincount(inverse * TYPE_COUNT + types, weights,
+                                 minlength=len(month_keys) * TYPE_COUNT).reshape(len(month_keys), TYPE_COUNT)
+        month_counts = np.bincount(inverse, minlength=len(month_keys))
+        month_bounds = np.searchsorted(month_keys // span, np.arange(user_count + 1))
+        month_keys = month_keys % span + first_month
+
+    rollups = []
+    for user in range(user_count):
+        rollup = TokenRollup(integer=integer)
+        rollups.append(rollup)
+        rollup.count = int(counts[user])
+        if rollup.count == 0:
+            continue
+        rollup.amount_count = int(amount_counts[user])
+        rollup.amount_total = float(totals[user])
+        rollup.amount_max = maxes[user]
+        rollup.type_sum = type_sums[user]
+        if category_sums is not None:
+            rollup.categories = list(categories)
+            rollup.category_sum = category_sums[user]
+            rollup.category_count = category_counts[user]
+
+        position = int(latest_positions[user])
+        if position < 0:
+            continue
+        rollup.last_ns = int(latest[user])
+        if timestamp_label is not None:
+            rollup.last_iso = timestamp_label(position)
+        else:
+            rollup.last_iso = np.datetime64(rollup.last_ns, "ns").astype("datetime64[us]").item().isoformat()
+        rollup.hour_sum = hour_sums[user]
+        rollup.hour_count = hour_counts[user]
+        rollup.weekday_sum = weekday_sums[user]
+        rollup.weekday_count = weekday_counts[user]
+
+        start, stop = month_bounds[user], month_bounds[user + 1]
+        user_months = month_keys[start:stop]
+        rollup.month_base = int(user_months[0])
+        offsets = user_months - rollup.month_base
+        rollup.month_sum = np.zeros((TYPE_COUNT, int(offsets[-1]) + 1))
+        rollup.month_sum[:, offsets] = month_sums[start:stop].T
+        rollup.month_count = np.zeros(int(offsets[-1]) + 1, dtype=np.int64)
+        rollup.month_count[offsets] = month_counts[start:stop]
+    return rollups
+
+def bulk_rollups(data: Dict[str, Any]) -> Tuple[List[Any], List[TokenRollup]]:
+    """
+    Agregace transakcí mnoha uživatelů pro token_analysis_bulk
+
+    Přijímá data.users ({userId: [transakce]}), data.transactions (transakce
+    s klíčem userId) nebo data.columnar se sloupcem user (kódy do userCodes,
+    bez nich je id uživatele přímo kód; sloupce lze poslat i přímo ve zprávě,
+    viz azr_columnar). Vrací dvojici (id uživatelů, agregace).
+    """
+    import pandas as pd
+
+    columnar = data.get("columnar")
+    if columnar:
+        from azr_columnar import open_columns
+
+        user_labels = columnar.get("userCodes")
+        with open_columns(columnar) as region:
+            if "user" not in region.columns:
+                raise ValueError("Ve sloupcových datech chybí sloupec user")
+            arrays = column_arrays(region.columns, columnar)
+            user_codes, user_ids = pd.factorize(region.columns["user"], sort=True)
+            if (user_codes < 0).any():
+                raise ValueError("Transakce bez userId nelze přiřadit uživateli")
+            if user_labels and user_ids.dtype.kind in "iu":
+                _check_codes(user_ids, user_labels, "user")
+                user_ids = [user_labels[code] for code in user_ids.tolist()]
+            else:
+                user_ids = user_ids.tolist()
+            return user_ids, grouped_rollups(
+                user_codes, len(user_ids), arrays["timestamps_ns"], arrays["amounts"], arrays["types"],
+                arrays["category_codes"], arrays["categories"], timestamp_label=arrays["timestamp_label"]
+            )
+
+    users = data.get("users")
+    if isinstance(users, dict):
+        user_ids = list(users.keys())
+        groups = [users[user_id] or [] for user_id in user_ids]
+        transactions = list(itertools.chain.from_iterable(groups))
+        user_codes = np.repeat(np.arange(len(user_ids)), [len(group) for group in groups])
+    else:
+        transactions = data.get("transactions") or []
+        user_codes, user_ids = pd.factorize(pd.Series([t.get("userId") for t in transactions], dtype=object))
+        user_ids = list(user_ids)
+        if (user_codes < 0).any():
+            raise ValueError("Transakce bez userId nelze přiřadit uživateli")
+
+    arrays = transaction_arrays(transactions)
+    dates = arrays["dates"]
+    return user_ids, grouped_rollups(
+        user_codes, len(user_ids), arrays["timestamps_ns"], arrays["amounts"], arrays["types"],
+        arrays["category_codes"], arrays["categories"],
+        timestamp_label=lambda index: dates.iloc[index].isoformat()
+    )
@@ -0,0 +1,48 @@
+"""
+Společné pomůcky testů AZR Python modulů
+"""
+
+import json
+import os
+import random
+import sys
+
+import pytest
+
+# Moduly azr_* leží v kořeni balíčku vedle adresáře tests
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from azr_cache import ResultCache
+from azr_codec import to_builtin
+from azr_processor import AZRProcessor
+
+CATEGORIES = ["sports", "challenges", "rewards", "events", None]
+
+def make_transactions(count, seed=1, floaty=False, tz="", categories=CATEGORIES):
+    """Náhodné transakce tokenů ve tvaru, který posílá Node.js"""
+    rng = random.Random(seed)
+    transactions = []
+    for index in range(count):
+        transaction = {
+            "id": index,
+            "transactionDate": f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+                               f"T{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:00{tz}",
+            "type": rng.choice(["earned", "spent", "bonus"]),
+            "amount": rng.randint(1, 50) + (0.25 if floaty else 0)
+        }
+        if categories:
+            transaction["category"] = rng.choice(categories)
+        transactions.append(transaction)
+    return transactions
+
+def normalize(response):
+    """Odpověď ve vestavěných typech, doporučené příležitosti v pevném pořadí"""
+    response = json.loads(json.dumps(response, default=to_builtin))
+    if "predictions" in response:
+        response["predictions"]["earningOpportunities"].sort(key=lambda item: item["type"])
+    return response
+
+@pytest.fixture
+def processor():
+    """Procesor bez mezipaměti, aby každý dotaz opravdu počítal"""
+    return AZRProcessor(cache=ResultCache(max_entries=0))
@@ -0,0 +1,89 @@
+"""
+Testy proudové detekce anomálií v transakcích tokenů
+"""
+
+import pytest
+
+from azr_anomaly import AnomalyDetector, anomaly_config, event_seconds
+
+def transfer(index, sender, receiver, amount=10, second=None):
+    second = index if second is None else second
+    return {"id": index, "from_wallet_id": sender, "to_wallet_id": receiver, "amount": amount,
+            "type": "payment", "created_at": second * 1000}
+
+def kinds(anomalies):
+    return [anomaly["kind"] for anomaly in anomalies]
+
+def test_event_seconds():
+    assert event_seconds("1970-01-01T00:01:00") == 60
+    assert event_seconds("1970-01-01T01:00:00+01:00") == 0
+    assert event_seconds("1970-01-01T00:00:00Z") == 0
+    assert event_seconds(1500) == 1.5
+    with pytest.raises(ValueError):
+        event_seconds(None)
+
+def test_burst_flags_once_per_window():
+    detector = AnomalyDetector({"burstCount": 3, "burstWindowSeconds": 60})
+    # Jedna transakce za sekundu po dobu tří oken
+    anomalies = detector.observe_many([transfer(i, "a", f"r{i}") for i in range(180)])
+    bursts = [anomaly for anomaly in anomalies if anomaly["kind"] == "burst"]
+    assert [anomaly["transactionId"] for anomaly in bursts] == [2, 62, 122]
+    assert all(anomaly["count"] >= 3 for anomaly in bursts)
+
+def test_burst_window_slides():
+    detector = AnomalyDetector({"burstCount": 3, "burstWindowSeconds": 60})
+    events = [transfer(0, "a", "b", second=0), transfer(1, "a", "b", second=50), transfer(2, "a", "b", second=200)]
+    assert "burst" not in kinds(detector.observe_many(events))
+
+def test_spending_spike_after_warmup():
+    detector = AnomalyDetector()
+    events = [transfer(i, "a", "b", amount=20, second=i * 600) for i in range(10)]
+    events.append(transfer(10, "a", "b", amount=500, second=6000))
+    anomalies = detector.observe_many(events)
+    assert kinds(anomalies) == ["spending"]
+    assert anomalies[0]["transactionId"] == 10 and anomalies[0]["baseline"] == 20
+
+def test_circular_transfers():
+    detector = AnomalyDetector()
+    two = detector.observe_many([transfer(0, "a", "b"), transfer(1, "b", "a")])
+    assert [anomaly["wallets"] for anomaly in two] == [["b", "a", "b"]]
+    three = detector.observe_many([transfer(2, "x", "y"), transfer(3, "y", "z"), transfer(4, "z", "x")])
+    assert [anomaly["wallets"] for anomaly in three] == [["z", "x", "y", "z"]]
+
+def test_circular_window_expires():
+    detector = AnomalyDetector({"cycleWindowSeconds": 60})
+    events = [transfer(0, "a", "b", second=0), transfer(1, "b", "a", second=120)]
+    assert detector.observe_many(events) == []
+
+def test_invalid_batch_leaves_state_unchanged():
+    detector = AnomalyDetector({"burstCount": 3})
+    batch = [transfer(0, "a", "b"), transfer(1, "a", "b"), {"id": 2, "from_wallet_id": "a", "amount": "x",
+                                                             "created_at": 2000}]
+    with pytest.raises(ValueError, match="Transakce 2"):
+        detector.observe_many(batch)
+    assert detector.stats()["processed"] == 0 and not detector.wallets
+
+    # Opravenou dávku lze poslat znovu bez dvojího započtení
+    batch[2] = transfer(2, "a", "b")
+    assert kinds(detector.observe_many(batch)) == ["burst"]
+    assert detector.stats()["processed"] == 3
+
+def test_wallet_limit_evicts_oldest():
+    detector = AnomalyDetector(max_wallets=3)
+    detector.observe_many([transfer(i, f"w{i}", None) for i in range(5)])
+    assert list(detector.wallets) == ["w2", "w3", "w4"]
+    assert detector.stats()["evictions"] == 2
+
+def test_config_validation():
+    assert anomaly_config({"burstCount": 5})["burstCount"] == 5
+    with pytest.raises(ValueError):
+        anomaly_config({"burstCount": -1})
+
+def test_token_anomaly_query_keeps_state(processor):
+    first = processor.process_query({
+        "type": "token_anomaly", "data": {"transactions": [transfer(0, "a", "b")]}, "options": {"reset": True}
+    })
+    second = processor.process_query({"type": "token_anomaly", "data": {"transactions": [transfer(1, "b", "a")]}})
+    assert first["success"] and second["success"]
+    assert kinds(second["data"]["anomalies"]) == ["circular"]
+    assert second["data"]["detector"]["processed"] == 2
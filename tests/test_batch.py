@@ -0,0 +1,68 @@
+"""
+Testy dávkového zpracování dotazů
+"""
+
+from conftest import make_transactions
+
+SUGGESTION = {"suggestion": {"startTime": "18:00", "date": "sobota", "price": 400, "tokenPrice": 4}}
+
+def run_batch(processor, queries, options=None):
+    response = processor.process_query({"type": "batch", "data": {"queries": queries}, "options": options or {}})
+    assert response["success"], response.get("error")
+    return response["data"]
+
+def test_results_keep_order(processor):
+    queries = [{"type": "reservation_analysis", "data": SUGGESTION},
+               {"type": "azr_capabilities"},
+               {"type": "batch", "data": {"queries": []}},
+               "neplatný",
+               {"type": "reservation_analysis", "data": SUGGESTION}]
+    batch = run_batch(processor, queries)
+    assert [result["success"] for result in batch["results"]] == [True, True, False, False, True]
+    assert batch["results"][0] == batch["results"][4]
+    assert batch["failed"] == 2
+
+def test_failing_batch_handler_falls_back_to_single_items(processor, capsys):
+    def failing_batch(data_list, options_list):
+        raise RuntimeError("rozbitý dávkový procesor")
+
+    processor.process_reservation_analysis_batch = failing_batch
+    batch = run_batch(processor, [{"type": "reservation_analysis", "data": SUGGESTION}] * 3)
+    assert batch["failed"] == 0
+    assert "rozbitý dávkový procesor" in capsys.readouterr().err
+
+def test_deadline_in_batch_handler_keeps_earlier_results(processor):
+    from azr_deadline import Deadline, DeadlineExceeded
+
+    def expired_batch(data_list, options_list):
+        raise DeadlineExceeded(Deadline(1).timing("reservation_analysis_batch"))
+
+    processor.process_reservation_analysis_batch = expired_batch
+    results = run_batch(processor, [{"type": "azr_capabilities"},
+                                    {"type": "reservation_analysis", "data": SUGGESTION},
+                                    {"type": "reservation_analysis", "data": SUGGESTION}])["results"]
+    assert results[0]["success"] is True
+    assert [result.get("deadlineExceeded") for result in results[1:]] == [True, True]
+    assert results[1]["timing"]["stage"] == "reservation_analysis_batch"
+
+def test_item_deadline(processor):
+    transactions = make_transactions(2000)
+    queries = [{"type": "token_analysis", "data": {"transactions": transactions}, "options": {"deadlineMs": 0.001}},
+               {"type": "token_analysis", "data": {"transactions": transactions}},
+               {"type": "reservation_analysis", "data": SUGGESTION, "options": {"deadlineMs": 0.001}},
+               {"type": "reservation_analysis", "data": SUGGESTION, "options": {"deadlineMs": 10000}}]
+    results = run_batch(processor, queries)["results"]
+    assert results[0]["deadlineExceeded"] is True and results[0]["timing"]["deadlineMs"] == 0.001
+    assert results[1]["success"] is True
+    assert results[2]["deadlineExceeded"] is True
+    assert results[3]["success"] is True
+
+def test_batch_deadline_bounds_items(processor):
+    from azr_deadline import Deadline, active_deadline
+
+    queries = [{"type": "token_analysis", "data": {"transactions": make_transactions(100)},
+                "options": {"deadlineMs": 60000}}]
+    with active_deadline(Deadline(0.001)):
+        results = processor.process_batch({"queries": queries}, {})["results"]
+    assert results[0]["deadlineExceeded"] is True
+    assert results[0]["timing"]["deadlineMs"] == 0.001
@@ -0,0 +1,68 @@
+"""
+Testy mezipaměti výsledků: kanonický klíč, TTL, LRU a perzistentní SQLite
+"""
+
+import azr_cache
+from azr_cache import ResultCache, SQLiteCacheBackend, canonical_key
+
+def test_canonical_key_ignores_key_order_and_number_form():
+    first = {"type": "analysis", "data": {"a": 1, "b": [1.0, 2.5]}, "options": {"x": True, "cache": False}}
+    second = {"options": {"x": True}, "data": {"b": [1, 2.5], "a": 1.0}, "type": "analysis"}
+    assert canonical_key(first) == canonical_key(second)
+    assert canonical_key(first) != canonical_key({**first, "data": {"a": 2}})
+
+def test_ttl_expiry(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(azr_cache.time, "monotonic", lambda: now[0])
+    cache = ResultCache(ttls={"analysis": 10})
+    cache.put("k", "analysis", {"value": 1})
+    assert cache.get("k") == {"value": 1}
+    now[0] += 11
+    assert cache.get("k") is None
+    assert cache.stats()["entries"] == 0
+
+def test_zero_ttl_is_not_stored():
+    cache = ResultCache()
+    cache.put("k", "batch", {"value": 1})
+    assert cache.get("k") is None
+
+def test_lru_eviction_by_count():
+    cache = ResultCache(max_entries=2)
+    cache.put("a", "analysis", {"v": "a"})
+    cache.put("b", "analysis", {"v": "b"})
+    assert cache.get("a") is not None
+    cache.put("c", "analysis", {"v": "c"})
+    assert cache.get("b") is None
+    assert cache.get("a") == {"v": "a"} and cache.get("c") == {"v": "c"}
+    assert cache.stats()["evictions"] == 1
+
+def test_lru_eviction_by_size():
+    cache = ResultCache(max_bytes=100)
+    cache.put("a", "analysis", {"v": "x" * 60})
+    cache.put("b", "analysis", {"v": "y" * 60})
+    assert cache.get("a") is None
+    assert cache.get("b") is not None
+    cache.put("big", "analysis", {"v": "z" * 200})
+    assert cache.get("big") is None
+
+def test_sqlite_backend_shared_between_versions(tmp_path):
+    path = str(tmp_path / "cache.db")
+    old = SQLiteCacheBackend(path, version="old", evict_every=1)
+    old.put("k", {"v": "old"}, 100)
+    new = SQLiteCacheBackend(path, version="new", evict_every=1)
+    assert new.get("k") is None
+    new.put("k", {"v": "new"}, 100)
+    # Otevření a zápisy nové verze nemažou položky starší verze, dokud se používají
+    assert old.get("k")[0] == {"v": "old"}
+    assert new.get("k")[0] == {"v": "new"}
+
+    new.stale_after = 0
+    new.put("other", {}, 100)
+    assert old.get("k") is None
+
+def test_sqlite_backend_fills_memory(tmp_path):
+    path = str(tmp_path / "cache.db")
+    ResultCache(backend=SQLiteCacheBackend(path, version="v")).put("k", "analysis", {"v": 1})
+    cache = ResultCache(backend=SQLiteCacheBackend(path, version="v"))
+    assert cache.get("k") == {"v": 1}
+    assert cache.stats()["entries"] == 1
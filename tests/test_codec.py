@@ -0,0 +1,52 @@
+"""
+Testy kodeků spojení: zakódování a dekódování zpráv a rámcování proudu
+"""
+
+import io
+
+import numpy as np
+import pytest
+
+from azr_codec import BinaryData, available_codecs, frame, get_codec, read_messages
+
+MESSAGE = {
+    "id": 7,
+    "type": "token_analysis",
+    "data": {"userId": "uživatel-1", "amounts": [1, 2.5, -3], "nested": {"ok": True, "none": None}},
+    "text": "Příliš žluťoučký kůň 🐎"
+}
+
+CODECS = [pytest.param(name, marks=pytest.mark.skipif(name not in available_codecs(),
+                                                      reason=f"{name} není nainstalován"))
+          for name in ("json", "orjson", "msgpack")]
+
+@pytest.mark.parametrize("name", CODECS)
+def test_round_trip(name):
+    codec = get_codec(name)
+    assert codec.decode(codec.encode(MESSAGE)) == MESSAGE
+
+@pytest.mark.parametrize("name", CODECS)
+def test_numpy_values_become_builtin(name):
+    codec = get_codec(name)
+    message = {"count": np.int64(3), "mean": np.float64(1.5), "values": np.arange(3)}
+    assert codec.decode(codec.encode(message)) == {"count": 3, "mean": 1.5, "values": [0, 1, 2]}
+
+@pytest.mark.parametrize("name", CODECS)
+def test_binary_data(name):
+    codec = get_codec(name)
+    decoded = codec.decode(codec.encode({"data": BinaryData(b"\x00\x01\xff")}))
+    if codec.binary:
+        assert decoded["data"] == b"\x00\x01\xff"
+    else:
+        assert decoded["data"] == "AAH/"
+
+@pytest.mark.parametrize("name", CODECS)
+def test_framed_stream(name):
+    codec = get_codec(name)
+    messages = [MESSAGE, {"id": 8, "type": "metrics"}]
+    stream = io.BytesIO(b"".join(frame(codec, codec.encode(message)) for message in messages))
+    assert [codec.decode(payload) for payload in read_messages(stream, codec)] == messages
+
+def test_unknown_codec():
+    with pytest.raises(ValueError):
+        get_codec("xml")
@@ -0,0 +1,67 @@
+"""
+Testy sloupcových vstupů ve zprávě a sloupcového formátu výstupu
+"""
+
+import base64
+import datetime
+
+import pytest
+
+from conftest import make_transactions, normalize
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("pandas")
+
+from azr_columnar import InlineColumns
+
+TYPES = ["earned", "spent", "bonus"]
+
+def typed(values, dtype):
+    """Typované pole jako v textovém kodeku (data v base64)"""
+    return {"dtype": dtype, "data": base64.b64encode(np.asarray(values, dtype=dtype).tobytes()).decode("ascii")}
+
+def analyze(processor, data, options=None):
+    response = processor.process_query({"type": "token_analysis", "data": data, "options": options or {}})
+    assert response["success"], response.get("error")
+    return normalize(response["data"])
+
+def table(encoded):
+    """Tabulka z odpovědi jako sloupce seznamů"""
+    with InlineColumns(encoded) as columns:
+        return {name: values.tolist() for name, values in columns.columns.items()}
+
+def test_typed_columns_match_rows(processor):
+    transactions = make_transactions(300, seed=21, floaty=True)
+    epoch = datetime.datetime(1970, 1, 1)
+    columns = {
+        "timestamp": typed([(datetime.datetime.fromisoformat(t["transactionDate"]) - epoch)
+                            // datetime.timedelta(milliseconds=1) for t in transactions], "int64"),
+        "amount": typed([t["amount"] for t in transactions], "float64"),
+        "type": typed([TYPES.index(t["type"]) for t in transactions], "int8"),
+        "category": [t["category"] for t in transactions]
+    }
+    from_columns = analyze(processor, {"columnar": {"length": len(transactions), "columns": columns,
+                                                    "typeCodes": TYPES}})
+    from_rows = analyze(processor, {"transactions": transactions})
+    assert from_columns["summary"] == from_rows["summary"]
+    assert from_columns["patterns"] == from_rows["patterns"]
+
+def test_columns_output_matches_rows(processor):
+    transactions = make_transactions(400, seed=22)
+    rows = analyze(processor, {"transactions": transactions})["patterns"]
+    columns = analyze(processor, {"transactions": transactions}, {"format": "columns"})["patterns"]
+
+    assert columns["categoryDistribution"] == rows["categoryDistribution"]
+    hourly = table(columns["columns"]["hourly"])
+    assert {str(hour): amount for hour, (amount, count) in enumerate(zip(hourly["amount"], hourly["count"]))
+            if count} == rows["hourlyDistribution"]
+    monthly = table(columns["columns"]["monthly"])
+    assert [dict(zip(monthly, values)) for values in zip(*monthly.values())] == rows["monthlyTrend"]
+
+def test_invalid_columnar_input(processor):
+    response = processor.process_query({"type": "token_analysis",
+                                        "data": {"columnar": {"columns": {"amount": [1, 2], "type": ["earned"]}}}})
+    assert response["success"] is False and "stejnou délku" in response["error"]
+    response = processor.process_query({"type": "token_analysis", "data": {"transactions": make_transactions(5)},
+                                        "options": {"format": "xml"}})
+    assert response["success"] is False and "Neznámý formát" in response["error"]
@@ -0,0 +1,54 @@
+"""
+Testy předpočítané kostky: analýza z kostky proti token_analysis nad transakcemi uživatele
+"""
+
+import pytest
+
+from conftest import make_transactions, normalize
+
+pytest.importorskip("pandas")
+
+def user_transactions():
+    return {user: [{**t, "userId": user} for t in make_transactions(count, seed=seed, floaty=floaty)]
+            for user, count, seed, floaty in [("u1", 400, 41, False), ("u2", 150, 42, True), ("u3", 1, 43, False)]}
+
+def refresh(processor, path, transactions, rebuild=False):
+    response = processor.process_query({"type": "token_cube_refresh",
+                                        "data": {"path": path, "transactions": transactions, "rebuild": rebuild}})
+    assert response["success"], response.get("error")
+    return response["data"]
+
+def analyze(processor, data):
+    response = processor.process_query({"type": "token_analysis", "data": data})
+    assert response["success"], response.get("error")
+    return normalize(response["data"])
+
+def test_cube_matches_transactions(processor, tmp_path):
+    path = str(tmp_path / "cube")
+    users = user_transactions()
+    refresh(processor, path, [t for transactions in users.values() for t in transactions])
+    for user, transactions in users.items():
+        assert analyze(processor, {"cube": {"path": path, "userId": user}}) == \
+            analyze(processor, {"transactions": transactions}), user
+
+def test_refresh_by_days(processor, tmp_path):
+    path = str(tmp_path / "cube")
+    transactions = user_transactions()["u1"]
+    first = [t for t in transactions if t["transactionDate"] < "2024-07"]
+    second = [t for t in transactions if t["transactionDate"] >= "2024-07"]
+    refresh(processor, path, first)
+    assert refresh(processor, path, second)["addedRows"] == len(second)
+    assert analyze(processor, {"cube": {"path": path, "userId": "u1"}}) == \
+        analyze(processor, {"transactions": transactions})
+
+    # Den, který už v kostce je, se odmítne a kostka zůstane beze změny
+    response = processor.process_query({"type": "token_cube_refresh",
+                                        "data": {"path": path, "transactions": second[:1]}})
+    assert response["success"] is False and "započítány" in response["error"]
+    assert analyze(processor, {"cube": {"path": path, "userId": "u1"}})["summary"]["transactionCount"] == \
+        len(transactions)
+
+def test_unknown_user_is_empty(processor, tmp_path):
+    path = str(tmp_path / "cube")
+    refresh(processor, path, user_transactions()["u3"])
+    assert analyze(processor, {"cube": {"path": path, "userId": "chybí"}})["summary"]["transactionCount"] == 0
@@ -0,0 +1,70 @@
+"""
+Testy generátoru syntetických dat
+"""
+
+import io
+import json
+import os
+import re
+
+import pytest
+
+from conftest import normalize
+
+pytest.importorskip("numpy")
+
+import azr_datagen
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def records(entity, count, **options):
+    return [record for chunk in azr_datagen.record_chunks(entity, count, **options) for record in chunk]
+
+def sql_columns(table):
+    """Sloupce tabulky z final_supabase_script.sql"""
+    with open(os.path.join(ROOT, "final_supabase_script.sql"), encoding="utf-8") as f:
+        script = f.read()
+    body = re.search(rf'CREATE TABLE "{table}" \((.*?)\n\);', script, re.S).group(1)
+    return {line.strip().split('"')[1] for line in body.splitlines() if line.strip().startswith('"')}
+
+@pytest.mark.parametrize("entity", azr_datagen.ENTITIES)
+def test_deterministic_and_chunked(entity):
+    first = records(entity, 250, seed=7, users=50, chunk_size=100)
+    assert len(first) == 250
+    assert first == records(entity, 250, seed=7, users=50, chunk_size=100)
+    assert first != records(entity, 250, seed=8, users=50, chunk_size=100)
+
+def test_transaction_shapes():
+    bridge = records("transactions", 100, users=20)
+    assert all(set(record) == {"userId", "amount", "type", "transactionDate", "category"} for record in bridge)
+    assert {record["type"] for record in bridge} <= {"earned", "spent"}
+    sql = records("transactions", 100, users=20, shape="sql")
+    assert all(set(record) == sql_columns("token_transactions") for record in sql)
+
+def test_realistic_skew():
+    transactions = records("transactions", 20000, users=1000)
+    per_user = {}
+    for record in transactions:
+        per_user[record["userId"]] = per_user.get(record["userId"], 0) + 1
+    # Několik velmi aktivních uživatelů a večerní špička
+    assert max(per_user.values()) > 20 * len(transactions) / 1000
+    hours = [int(record["transactionDate"][11:13]) for record in transactions]
+    assert sum(17 <= hour <= 20 for hour in hours) > 4 * sum(1 <= hour <= 4 for hour in hours)
+
+def test_jsonl_and_columnar_outputs_agree(processor, tmp_path):
+    pytest.importorskip("pandas")
+
+    stream = io.BytesIO()
+    written = azr_datagen.write_jsonl(azr_datagen.record_chunks("transactions", 3000, users=30, chunk_size=1000),
+                                      stream)
+    rows = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert written == len(rows) == 3000
+
+    descriptor = azr_datagen.write_columnar_transactions(str(tmp_path / "tx.bin"), 3000, users=30, chunk_size=1000)
+    from_rows = processor.process_query({"type": "token_analysis", "data": {"transactions": rows}})
+    from_columns = processor.process_query({"type": "token_analysis", "data": {"columnar": descriptor}})
+    assert from_rows["success"] and from_columns["success"], from_columns.get("error")
+    expected, actual = normalize(from_rows["data"]), normalize(from_columns["data"])
+    for key in ("totalEarned", "totalSpent", "transactionCount", "highestSingleTransaction"):
+        assert actual["summary"][key] == expected["summary"][key]
+    assert actual["patterns"]["categoryDistribution"] == expected["patterns"]["categoryDistribution"]
@@ -0,0 +1,88 @@
+"""
+Testy modelů predikce: token_analysis s options.forecast proti výchozí analýze,
+hromadný fit proti jednotlivým uživatelům, řady z kostky proti agregacím
+"""
+
+import pytest
+
+from conftest import make_transactions, normalize
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("pandas")
+
+import azr_forecast
+
+def analyze(processor, data, options=None):
+    response = processor.process_query({"type": "token_analysis", "data": data, "options": options or {}})
+    assert response["success"], response.get("error")
+    return normalize(response["data"])
+
+def monthly(values, start=1):
+    """Jedna příjmová transakce měsíčně s danými částkami"""
+    return [{"transactionDate": f"2024-{month:02d}-15T10:00:00", "type": "earned", "amount": amount,
+             "category": "sports"} for month, amount in enumerate(values, start)]
+
+@pytest.mark.parametrize("method", ["ets", "trend"])
+def test_model_keeps_analysis_and_adds_intervals(processor, method):
+    transactions = make_transactions(600, seed=61)
+    default = analyze(processor, {"transactions": transactions})
+    result = analyze(processor, {"transactions": transactions}, {"forecast": method, "forecastLevel": 0.8})
+
+    assert result["summary"] == default["summary"] and result["patterns"] == default["patterns"]
+    predictions = result["predictions"]
+    assert predictions["model"] == method
+    assert predictions["intervals"]["level"] == 0.8
+    for key in ("estimatedNextMonthEarnings", "estimatedNextMonthSpendings", "predictedBalance"):
+        interval = predictions["intervals"][key]
+        assert interval["lower"] <= predictions[key] <= interval["upper"]
+
+def test_baseline_and_short_history_match_default(processor):
+    transactions = make_transactions(300, seed=62)
+    default = analyze(processor, {"transactions": transactions})
+    assert analyze(processor, {"transactions": transactions}, {"forecast": "baseline"}) == default
+
+    short = monthly([10, 20])
+    result = analyze(processor, {"transactions": short}, {"forecast": "ets"})
+    assert result["predictions"].pop("model") == "baseline"
+    assert result == analyze(processor, {"transactions": short})
+
+def test_trend_follows_linear_series(processor):
+    predictions = analyze(processor, {"transactions": monthly([10, 20, 30, 40, 50])},
+                          {"forecast": "trend"})["predictions"]
+    assert predictions["estimatedNextMonthEarnings"] == pytest.approx(60)
+    assert predictions["estimatedNextMonthSpendings"] == pytest.approx(0)
+
+def test_bulk_matches_single(processor):
+    users = {f"user-{index}": make_transactions(count, seed=60 + index)
+             for index, count in enumerate([2, 40, 300])}
+    users["linear"] = monthly([5, 7, 9, 11])
+    response = processor.process_query({"type": "token_analysis_bulk", "data": {"users": users},
+                                        "options": {"forecast": "ets"}})
+    assert response["success"], response.get("error")
+    for item in response["data"]["results"]:
+        single = analyze(processor, {"transactions": users[item["userId"]]}, {"forecast": "ets"})
+        assert normalize(item["data"]) == single, item["userId"]
+
+def test_cube_series_match_rollups(processor, tmp_path):
+    from azr_cube import open_cube
+
+    transactions = [{**t, "userId": user} for user, seed in (("a", 63), ("b", 64))
+                    for t in make_transactions(200, seed=seed)]
+    transactions += [{**t, "userId": "c"} for t in monthly([1, 2, 3], start=3)]
+    path = str(tmp_path / "cube")
+    response = processor.process_query({"type": "token_cube_refresh",
+                                        "data": {"path": path, "transactions": transactions}})
+    assert response["success"], response.get("error")
+
+    cube = open_cube(path)
+    earned, spent, _ = azr_forecast.series_from_cube(cube, max_months=12)
+    expected_earned, expected_spent = azr_forecast.series_from_rollups([cube.rollup(user) for user in cube.users],
+                                                                       max_months=12)
+    np.testing.assert_allclose(earned, expected_earned)
+    np.testing.assert_allclose(spent, expected_spent)
+
+def test_invalid_forecast_options(processor):
+    for options in ({"forecast": "arima"}, {"forecast": "ets", "forecastLevel": 1.5}):
+        response = processor.process_query({"type": "token_analysis",
+                                            "data": {"transactions": make_transactions(5)}, "options": options})
+        assert response["success"] is False and response["error"], options
@@ -0,0 +1,49 @@
+"""
+Testy jednorázového dotazu z argumentu, stdin, souboru a sdílené paměti
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+QUERY = {"type": "reservation_analysis",
+         "data": {"suggestion": {"startTime": "18:00", "date": "sobota", "price": 400, "tokenPrice": 4}}}
+
+def run_bridge(*args, stdin=None):
+    """Jednorázové spuštění azr_bridge.py, vrací dekódovanou odpověď"""
+    env = {**os.environ, "AZR_CODEC": "json"}
+    env.pop("AZR_CACHE_PATH", None)
+    completed = subprocess.run([sys.executable, os.path.join(ROOT, "azr_bridge.py"), *args], input=stdin,
+                               capture_output=True, cwd=ROOT, env=env, timeout=120)
+    return json.loads(completed.stdout)
+
+def test_sources_give_same_response(tmp_path):
+    from multiprocessing import shared_memory
+
+    payload = json.dumps(QUERY).encode("utf-8")
+    path = tmp_path / "query.json"
+    path.write_bytes(payload)
+
+    expected = run_bridge(payload.decode("utf-8"))
+    assert expected["success"] is True
+    assert run_bridge("-", stdin=payload)["data"] == expected["data"]
+    assert run_bridge("--input", str(path))["data"] == expected["data"]
+
+    segment = shared_memory.SharedMemory(create=True, size=len(payload) + 100)
+    try:
+        segment.buf[:len(payload)] = payload
+        # Bez velikosti se odříznou koncové nulové bajty, s ní se čte přesně
+        assert run_bridge("--input-shm", segment.name)["data"] == expected["data"]
+        assert run_bridge("--input-shm", segment.name, "--input-size", str(len(payload)))["data"] == expected["data"]
+    finally:
+        segment.close()
+        segment.unlink()
+
+def test_invalid_input_is_reported(tmp_path):
+    missing = run_bridge("--input", str(tmp_path / "chybí.json"))
+    assert missing["success"] is False and "nelze načíst" in missing["error"]
+    invalid = run_bridge("-", stdin=b"{neplatny")
+    assert invalid["success"] is False and "Neplatný JSON" in invalid["error"]
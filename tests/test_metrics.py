@@ -0,0 +1,32 @@
+"""
+Testy metrik zpracování dotazů
+"""
+
+from azr_metrics import MAX_QUERY_TYPES, MetricsRegistry, label_value
+
+def test_label_value_escaping():
+    assert label_value('a\\b"c\nd') == 'a\\\\b\\"c\\nd'
+
+def test_prometheus_text_escapes_query_type():
+    metrics = MetricsRegistry()
+    metrics.observe_handler('x"} 1\nazr_fake 2', 1.0, True)
+    text = metrics.prometheus_text()
+    assert 'azr_requests_total{type="x\\"} 1\\nazr_fake 2"} 1' in text
+    assert not any(line.startswith("azr_fake") for line in text.splitlines())
+
+def test_query_types_are_capped():
+    metrics = MetricsRegistry()
+    for index in range(MAX_QUERY_TYPES + 10):
+        metrics.observe_handler(f"type-{index}", 1.0, True)
+    types = metrics.snapshot()["types"]
+    assert len(types) == MAX_QUERY_TYPES + 1
+    assert types["other"]["requests"] == 10
+
+def test_warm_up_leaves_metrics_and_cache_untouched():
+    from azr_processor import AZRProcessor
+
+    processor = AZRProcessor()
+    warmup = processor.warm_up()
+    assert warmup["warmupMs"] >= 0
+    assert processor.metrics.snapshot()["types"] == {}
+    assert processor.cache.stats()["entries"] == 0
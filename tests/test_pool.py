@@ -0,0 +1,63 @@
+"""
+Testy poolu pracovních procesů
+"""
+
+import pytest
+
+from azr_pool import AZRWorkerPool
+
+SUGGESTION = {"suggestion": {"startTime": "18:00", "date": "sobota", "price": 400, "tokenPrice": 4}}
+
+@pytest.fixture(scope="module")
+def pool():
+    # Bez předem importovaných modulů, procesy se zahřejí rychle
+    with AZRWorkerPool(2, queue_depth=8, preload=[]) as pool:
+        yield pool
+
+def test_round_trip_matches_processor(pool, processor):
+    query = {"type": "reservation_analysis", "data": SUGGESTION}
+    response = pool.process_query(query)
+    assert response["success"] is True
+    assert response["data"] == processor.process_query(query)["data"]
+
+def test_concurrent_queries_all_answered(pool):
+    futures = [pool.submit({"type": "reservation_analysis", "data": SUGGESTION}) for _ in range(6)]
+    assert all(future.result(timeout=60)["success"] for future in futures)
+    stats = pool.stats()
+    assert stats["alive"] == 2 and stats["rejected"] == 0
+
+def test_worker_errors_are_answered(pool):
+    response = pool.process_query({"type": "neznámý"})
+    assert response["success"] is False and response["error"]
+
+def test_unexpected_dispatch_error_keeps_pool_running(pool):
+    # Dotaz, který nelze předat procesu, nesmí ukončit dispečerské vlákno
+    response = pool.process_query({"type": "azr_capabilities", "data": {"callback": lambda: None}})
+    assert response["success"] is False and "selhal" in response["error"]
+    for _ in range(4):
+        assert pool.process_query({"type": "azr_capabilities"})["success"] is True
+
+def test_full_queue_answers_busy():
+    # Pool bez spuštěných procesů: první dotaz zůstane ve frontě, druhý se nevejde
+    pool = AZRWorkerPool(1, queue_depth=1)
+    pool.submit({"type": "azr_capabilities"})
+    response = pool.submit({"type": "azr_capabilities"}).result(timeout=1)
+    assert response["busy"] is True and response["success"] is False
+    assert pool.stats()["rejected"] == 1
+
+def test_stateful_queries_stay_in_parent(monkeypatch):
+    monkeypatch.delenv("AZR_ROLLUP_PATH", raising=False)
+    pool = AZRWorkerPool(1)
+    incremental = {"type": "token_analysis", "options": {"incremental": True}}
+    assert pool.runs_in_parent({"type": "metrics"})
+    assert pool.runs_in_parent({"type": "token_anomaly"})
+    assert pool.runs_in_parent(incremental)
+    assert not pool.runs_in_parent({"type": "token_analysis"})
+    assert pool.runs_in_parent({"type": "batch", "data": {"queries": [{"type": "azr_capabilities"},
+                                                                      {"type": "token_anomaly"}]}})
+    assert pool.runs_in_parent({"type": "batch", "data": {"queries": [incremental]}})
+    assert not pool.runs_in_parent({"type": "batch", "data": {"queries": [{"type": "token_analysis"}, "x"]}})
+
+    monkeypatch.setenv("AZR_ROLLUP_PATH", "/tmp/rollups.db")
+    assert not pool.runs_in_parent(incremental)
+    assert not pool.runs_in_parent({"type": "batch", "data": {"queries": [incremental]}})
@@ -0,0 +1,65 @@
+"""
+Testy odsouhlasení zůstatků peněženek s transakcemi tokenů
+"""
+
+import json
+
+TRANSACTIONS = [
+    {"id": "t1", "from_wallet_id": None, "to_wallet_id": "a", "amount": 100, "type": "mint",
+     "created_at": "2024-01-01T00:00:00"},
+    {"id": "t2", "from_wallet_id": "a", "to_wallet_id": "b", "amount": 30, "type": "payment",
+     "created_at": "2024-01-02T00:00:00"},
+    {"id": "t3", "from_wallet_id": "b", "to_wallet_id": "a", "amount": 5, "type": "payment",
+     "created_at": "2024-01-02T00:00:00"},
+    {"id": "t4", "from_wallet_id": "a", "to_wallet_id": "c", "amount": 10, "type": "payment",
+     "created_at": "2024-01-03T00:00:00"}
+]
+
+WALLETS = [{"id": "a", "balance": 65}, {"id": "b", "balance": 20}, {"id": "c", "balance": 10},
+           {"id": "d", "balance": 3}]
+
+def reconcile(processor, data, options=None):
+    response = processor.process_query({"type": "token_reconcile", "data": data, "options": options or {}})
+    assert response["success"], response.get("error")
+    return response["data"]
+
+def test_mismatches(processor, tmp_path):
+    result = reconcile(processor, {"ledger": str(tmp_path / "ledger.db"), "transactions": TRANSACTIONS,
+                                   "wallets": WALLETS})
+    assert result["ledger"]["applied"] == 4
+    assert result["mismatchCount"] == 2
+    by_wallet = {item["walletId"]: item for item in result["mismatches"]}
+    assert by_wallet["b"]["expected"] == 25 and by_wallet["b"]["difference"] == -5
+    assert by_wallet["d"]["expected"] == 0 and by_wallet["d"]["difference"] == 3
+    assert result["netDifference"] == -2
+
+def test_incremental_equals_full(processor, tmp_path):
+    # Dávky dělí transakce se stejným časem, hraniční se posílají znovu
+    ledger = str(tmp_path / "incremental.db")
+    reconcile(processor, {"ledger": ledger, "transactions": TRANSACTIONS[:2]})
+    rerun = reconcile(processor, {"ledger": ledger, "transactions": TRANSACTIONS[1:], "wallets": WALLETS})
+    assert rerun["ledger"]["applied"] == 2 and rerun["ledger"]["skipped"] == 1
+
+    full = reconcile(processor, {"ledger": str(tmp_path / "full.db"), "transactions": TRANSACTIONS,
+                                 "wallets": WALLETS})
+    assert rerun["mismatches"] == full["mismatches"]
+    assert rerun["ledger"]["transactionCount"] == full["ledger"]["transactionCount"] == 4
+
+def test_file_source_matches_inline(processor, tmp_path):
+    path = tmp_path / "transactions.jsonl"
+    path.write_text("".join(json.dumps(transaction) + "\n" for transaction in TRANSACTIONS), encoding="utf-8")
+    from_file = reconcile(processor, {"ledger": str(tmp_path / "file.db"), "file": {"path": str(path)},
+                                      "wallets": WALLETS})
+    inline = reconcile(processor, {"ledger": str(tmp_path / "inline.db"), "transactions": TRANSACTIONS,
+                                   "wallets": WALLETS})
+    assert from_file["mismatches"] == inline["mismatches"]
+
+def test_invalid_input(processor, tmp_path):
+    ledger = str(tmp_path / "ledger.db")
+    fractional = [{"id": 1, "to_wallet_id": "a", "amount": 1.5, "created_at": "2024-01-01"}]
+    duplicates = [{"id": "a", "balance": 1}, {"id": "a", "balance": 2}]
+    for data in ({"transactions": TRANSACTIONS},
+                 {"ledger": ledger, "transactions": fractional},
+                 {"ledger": ledger, "transactions": [], "wallets": duplicates}):
+        response = processor.process_query({"type": "token_reconcile", "data": data})
+        assert response["success"] is False and response["error"]
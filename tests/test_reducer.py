@@ -0,0 +1,80 @@
+"""
+Testy proudové analýzy exportů: výsledek po blocích proti token_analysis nad všemi transakcemi
+"""
+
+import csv
+import json
+
+import pytest
+
+from conftest import make_transactions, normalize
+
+pytest.importorskip("pandas")
+
+import azr_reducer
+
+FIELDS = ["transactionDate", "amount", "type", "category"]
+
+def analyze(processor, data):
+    response = processor.process_query({"type": "token_analysis", "data": data})
+    assert response["success"], response.get("error")
+    return normalize(response["data"])
+
+def write_jsonl(path, records):
+    with open(path, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+    return str(path)
+
+def write_csv(path, records, fields):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows(records)
+    return str(path)
+
+def sql_row(transaction, index, description):
+    """Transakce ve tvaru tabulky token_transactions"""
+    return {"id": index, "created_at": transaction["transactionDate"], "amount": transaction["amount"],
+            "type": {"earned": "reward", "spent": "payment"}[transaction["type"]],
+            "description": description, "from_wallet_id": "w1", "to_wallet_id": "w2"}
+
+@pytest.mark.parametrize("fmt", ["jsonl", "csv"])
+def test_file_matches_rows(processor, tmp_path, fmt):
+    transactions = make_transactions(500, seed=31, floaty=True, categories=["sports", "rewards", None])
+    if fmt == "csv":
+        path = write_csv(tmp_path / "export.csv", transactions, ["id"] + FIELDS)
+    else:
+        path = write_jsonl(tmp_path / "export.jsonl", transactions)
+    from_file = analyze(processor, {"file": {"path": path, "chunkRows": 64}})
+    assert from_file == analyze(processor, {"transactions": transactions})
+
+def test_sql_shape_matches_rows(processor, tmp_path):
+    transactions = make_transactions(300, seed=32, categories=["sports", "events"])
+    transactions = [t for t in transactions if t["type"] != "bonus"]
+    path = write_jsonl(tmp_path / "export.jsonl",
+                       [sql_row(t, index, t["category"]) for index, t in enumerate(transactions)])
+    from_file = analyze(processor, {"file": {"path": path, "shape": "sql", "chunkRows": 50}})
+    assert from_file == analyze(processor, {"transactions": transactions})
+
+def test_sql_descriptions_are_capped(tmp_path):
+    # Každá transakce má jiný popis; agregace nesmí mít kategorii pro každý řádek
+    transactions = [t for t in make_transactions(3000, seed=33) if t["type"] != "bonus"]
+    path = write_jsonl(tmp_path / "export.jsonl",
+                       [sql_row(t, index, f"Platba č. {index}") for index, t in enumerate(transactions)])
+    rollup, summary = azr_reducer.rollup_from_file(path, shape="sql", chunk_rows=100)
+    distribution = rollup.category_distribution()
+
+    assert summary["rows"] == len(transactions)
+    assert len(distribution) == azr_reducer.MAX_DESCRIPTION_CATEGORIES + 1
+    assert azr_reducer.OTHER_CATEGORY in distribution
+    assert sum(distribution.values()) == pytest.approx(sum(t["amount"] for t in transactions))
+
+def test_invalid_export(processor, tmp_path):
+    path = tmp_path / "export.jsonl"
+    path.write_text('{"amount": 1}\n{neplatny\n', encoding="utf-8")
+    response = processor.process_query({"type": "token_analysis", "data": {"file": {"path": str(path)}}})
+    assert response["success"] is False and "řádku 2" in response["error"]
+    response = processor.process_query({"type": "token_analysis",
+                                        "data": {"file": {"path": str(path), "shape": "xml"}}})
+    assert response["success"] is False and "Neznámý tvar" in response["error"]
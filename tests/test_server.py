@@ -0,0 +1,122 @@
+"""
+Testy asyncio serveru: rámcování, párování odpovědí a chybové rámce
+"""
+
+import asyncio
+
+from azr_codec import get_codec
+from azr_server import AZRAsyncServer, encode_frame, read_frame
+
+SUGGESTION = {"suggestion": {"startTime": "18:00", "date": "sobota", "price": 400, "tokenPrice": 4}}
+
+def run_with_server(tmp_path, client, **options):
+    """Spuštění serveru na Unix socketu, klient dostane (reader, writer, codec) po handshake"""
+    codec = get_codec("json")
+    socket_path = str(tmp_path / "azr.sock")
+
+    async def main():
+        server = AZRAsyncServer(codec=codec, **options)
+        await server.start(socket_path, preload=[])
+        reader, writer = await asyncio.open_unix_connection(socket_path)
+        try:
+            ready = codec.decode(await read_frame(reader, server.max_frame_size))
+            assert ready["ready"] is True
+            return await client(reader, writer, codec)
+        finally:
+            writer.close()
+            await server.drain()
+
+    return asyncio.run(main())
+
+async def exchange(reader, writer, codec, queries):
+    """Odeslání dotazů najednou, odpovědi seřazené podle id"""
+    for query in queries:
+        writer.write(encode_frame(query, codec))
+    await writer.drain()
+    responses = {}
+    while len(responses) < len(queries):
+        response = codec.decode(await read_frame(reader, 1 << 20))
+        responses[response["id"]] = response
+    return [responses[query["id"]] for query in queries]
+
+def test_round_trip_matches_processor(tmp_path, processor):
+    query = {"type": "reservation_analysis", "data": SUGGESTION}
+
+    async def client(reader, writer, codec):
+        return await exchange(reader, writer, codec, [{"id": "a", **query},
+                                                      {"id": "b", "type": "azr_capabilities"},
+                                                      {"id": "c", "type": "neznámý"}])
+
+    first, second, third = run_with_server(tmp_path, client, processor=processor)
+    assert first["success"] is True and first["data"] == processor.process_query(query)["data"]
+    assert second["success"] is True
+    assert third["success"] is False and third["error"]
+
+def test_invalid_frame_keeps_connection(tmp_path):
+    async def client(reader, writer, codec):
+        body = b"{neplatny"
+        writer.write(len(body).to_bytes(4, "big") + body)
+        invalid = codec.decode(await read_frame(reader, 1 << 20))
+        valid = await exchange(reader, writer, codec, [{"id": 1, "type": "azr_capabilities"}])
+        return invalid, valid[0]
+
+    invalid, valid = run_with_server(tmp_path, client)
+    assert invalid["success"] is False and invalid["id"] is None
+    assert valid["success"] is True
+
+def test_failed_request_gets_error_frame(tmp_path, processor):
+    original = processor.process_query
+
+    def failing(query):
+        if query.get("type") == "rozbitý":
+            raise RuntimeError("rozbitý procesor")
+        return original(query)
+
+    processor.process_query = failing
+
+    async def client(reader, writer, codec):
+        return await exchange(reader, writer, codec, [{"id": "a", "type": "rozbitý"},
+                                                      {"id": "b", "type": "azr_capabilities"}])
+
+    failed, valid = run_with_server(tmp_path, client, processor=processor)
+    assert failed["success"] is False and "rozbitý procesor" in failed["error"]
+    assert valid["success"] is True
+
+def test_anomaly_queries_apply_in_arrival_order(tmp_path, processor):
+    # Každý dotaz přidá jednu transakci; při souběžném zpracování by počty v odpovědích nerostly po jedné
+    queries = [{"id": index, "type": "token_anomaly",
+                "data": {"transactions": [{"id": index, "from_wallet_id": "a", "to_wallet_id": "b",
+                                           "amount": 10, "created_at": index * 1000}]}}
+               for index in range(200)]
+
+    async def client(reader, writer, codec):
+        return await exchange(reader, writer, codec, queries)
+
+    responses = run_with_server(tmp_path, client, processor=processor, threads=4)
+    assert [response["data"]["detector"]["processed"] for response in responses] == list(range(1, 201))
+
+def test_shared_processor_creates_rollups_once(monkeypatch, processor):
+    import threading
+    import time
+
+    import azr_rollups
+
+    created = []
+    original = azr_rollups.RollupStore.from_env.__func__
+
+    def slow_from_env(cls):
+        # Pomalé vytvoření úložiště rozšíří okno, ve kterém se vlákna mohou předběhnout
+        time.sleep(0.05)
+        store = original(cls)
+        created.append(store)
+        return store
+
+    monkeypatch.setattr(azr_rollups.RollupStore, "from_env", classmethod(slow_from_env))
+    stores = []
+    threads = [threading.Thread(target=lambda: stores.append(processor.rollups)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(created) == 1
+    assert all(store is created[0] for store in stores)
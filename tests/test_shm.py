@@ -0,0 +1,65 @@
+"""
+Testy sloupcových dat v mapovaném souboru (popisovač oblasti jako u sdílené paměti)
+"""
+
+import datetime
+
+import pytest
+
+from conftest import make_transactions, normalize
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("pandas")
+
+TYPES = ["earned", "spent", "bonus"]
+CATEGORIES = ["sports", "challenges", "rewards", "events"]
+
+def transaction_columns(transactions):
+    """Transakce jako typované sloupce: čas v ms, částka, kódy typu a kategorie (-1 = bez kategorie)"""
+    epoch = datetime.datetime(1970, 1, 1)
+    return {
+        "timestamp": np.array([(datetime.datetime.fromisoformat(t["transactionDate"]) - epoch)
+                               // datetime.timedelta(milliseconds=1) for t in transactions], dtype=np.int64),
+        "amount": np.array([t["amount"] for t in transactions], dtype=np.float64),
+        "type": np.array([TYPES.index(t["type"]) for t in transactions], dtype=np.int8),
+        "category": np.array([CATEGORIES.index(t["category"]) if t["category"] else -1 for t in transactions],
+                             dtype=np.int16)
+    }
+
+def region(target, transactions):
+    from azr_shm import write_columns
+
+    descriptor = write_columns(target, transaction_columns(transactions))
+    return {**descriptor, "length": len(transactions), "typeCodes": TYPES, "categoryCodes": CATEGORIES}
+
+def analyze(processor, data):
+    response = processor.process_query({"type": "token_analysis", "data": data})
+    assert response["success"], response.get("error")
+    return normalize(response["data"])
+
+def test_region_matches_rows(processor, tmp_path):
+    transactions = make_transactions(400, seed=11, floaty=True)
+    descriptor = region({"path": str(tmp_path / "columns.bin")}, transactions)
+    from_region = analyze(processor, {"columnar": descriptor})
+    from_rows = analyze(processor, {"transactions": transactions})
+    assert from_region["summary"] == from_rows["summary"]
+    assert from_region["patterns"] == from_rows["patterns"]
+
+def test_array_output(processor, tmp_path):
+    from azr_shm import ColumnarRegion
+
+    transactions = make_transactions(300, seed=12)
+    result = analyze(processor, {"transactions": transactions, "output": {"path": str(tmp_path / "out.bin")}})
+    arrays = result["patterns"]["arrays"]
+    with ColumnarRegion({**arrays, "length": 0}) as columns:
+        hourly = columns.columns["hourly"].tolist()
+        weekday = columns.columns["weekday"].tolist()
+    expected = result["patterns"]["hourlyDistribution"]
+    assert {str(hour): value for hour, value in enumerate(hourly) if str(hour) in expected} == expected
+    assert sum(weekday) == sum(result["patterns"]["weekdayDistribution"].values())
+
+def test_region_out_of_bounds(processor, tmp_path):
+    descriptor = region({"path": str(tmp_path / "columns.bin")}, make_transactions(10))
+    descriptor["columns"]["amount"]["offset"] = 1 << 20
+    response = processor.process_query({"type": "token_analysis", "data": {"columnar": descriptor}})
+    assert response["success"] is False and "přesahuje" in response["error"]
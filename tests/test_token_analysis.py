@@ -0,0 +1,146 @@
+"""
+Testy token_analysis: jádro nad numpy proti původnímu výpočtu v pandas,
+inkrementální a hromadná analýza proti úplnému přepočtu
+"""
+
+import math
+
+import pytest
+
+from conftest import make_transactions, normalize
+
+# Analýza tokenů vyžaduje pandas (načtení dat), bez něj se testy přeskočí
+pd = pytest.importorskip("pandas")
+
+def pandas_reference(transactions):
+    """Souhrn a vzory spočtené původním postupem přes pandas DataFrame"""
+    df = pd.DataFrame(transactions)
+    df["transactionDate"] = pd.to_datetime(df["transactionDate"])
+    df["day"] = df["transactionDate"].dt.day_name()
+    df["hour"] = df["transactionDate"].dt.hour
+    df["month"] = df["transactionDate"].dt.strftime("%Y-%m")
+
+    earned = df[df["type"] == "earned"]
+    spent = df[df["type"] == "spent"]
+    has_categories = "category" in df.columns and not df["category"].isna().all()
+    if has_categories:
+        earning = earned.groupby("category")["amount"].sum()
+        spending = spent.groupby("category")["amount"].sum()
+        favorite_earning = earning.idxmax() if not earning.empty else None
+        favorite_spending = spending.idxmax() if not spending.empty else None
+        categories = df.groupby("category")["amount"].sum().to_dict()
+    else:
+        favorite_earning = favorite_spending = None
+        categories = {"Uncategorized": df["amount"].sum()}
+
+    return normalize({
+        "summary": {
+            "totalEarned": earned["amount"].sum(),
+            "totalSpent": spent["amount"].sum(),
+            "netChange": earned["amount"].sum() - spent["amount"].sum(),
+            "averageTransaction": df["amount"].mean(),
+            "transactionCount": len(df),
+            "favoriteEarningCategory": favorite_earning,
+            "favoriteSpendingCategory": favorite_spending,
+            "highestSingleTransaction": df["amount"].max(),
+            "mostRecentTransaction": df["transactionDate"].max().isoformat()
+        },
+        "patterns": {
+            "weekdayDistribution": df.groupby("day")["amount"].sum().to_dict(),
+            "hourlyDistribution": {str(k): v for k, v in df.groupby("hour")["amount"].sum().items()},
+            "categoryDistribution": categories,
+            "monthlyTrend": [
+                {"month": month, "earned": group[group["type"] == "earned"]["amount"].sum(),
+                 "spent": group[group["type"] == "spent"]["amount"].sum()}
+                for month, group in df.groupby("month")
+            ]
+        }
+    })
+
+def assert_close(actual, expected, path="$"):
+    """Rekurzivní porovnání se shodou čísel na relativní přesnost 1e-9"""
+    if isinstance(expected, dict):
+        assert isinstance(actual, dict) and list(actual) == list(expected), path
+        for key in expected:
+            assert_close(actual[key], expected[key], f"{path}.{key}")
+    elif isinstance(expected, list):
+        assert isinstance(actual, list) and len(actual) == len(expected), path
+        for index, (left, right) in enumerate(zip(actual, expected)):
+            assert_close(left, right, f"{path}[{index}]")
+    elif isinstance(expected, float) or isinstance(actual, float):
+        assert math.isclose(actual, expected, rel_tol=1e-9), path
+    else:
+        assert actual == expected, path
+
+def analyze(processor, data, options=None):
+    response = processor.process_query({"type": "token_analysis", "data": data, "options": options or {}})
+    assert response["success"], response.get("error")
+    return normalize(response["data"])
+
+@pytest.mark.parametrize("transactions", [
+    make_transactions(500, seed=1),
+    make_transactions(500, seed=2, floaty=True),
+    make_transactions(200, seed=3, tz="+02:00"),
+    make_transactions(100, seed=4, categories=None),
+    make_transactions(50, seed=5, categories=[None]),
+    make_transactions(1, seed=6),
+    [
+        {"transactionDate": "2024-03-01T10:00:00", "type": "earned", "amount": 5, "category": "b"},
+        {"transactionDate": "2024-03-01T11:00:00", "type": "earned", "amount": 5, "category": "a"},
+        {"transactionDate": "2024-03-01T12:00:00", "type": "spent", "amount": 5, "category": "c"}
+    ]
+], ids=["int", "float", "tz", "nocategory", "nullcategory", "one", "ties"])
+def test_kernel_matches_pandas(processor, transactions):
+    result = analyze(processor, {"transactions": transactions})
+    expected = pandas_reference(transactions)
+    assert_close(result["summary"], expected["summary"])
+    assert_close(result["patterns"], expected["patterns"])
+
+def test_columnar_matches_rows(processor):
+    transactions = make_transactions(300, seed=7)
+    columns = {key: [t.get(key) for t in transactions] for key in ("transactionDate", "amount", "type", "category")}
+    assert analyze(processor, {"columnar": {"columns": columns}}) == analyze(processor, {"transactions": transactions})
+
+def test_incremental_matches_full(processor):
+    transactions = sorted(make_transactions(400, seed=8), key=lambda t: t["transactionDate"])
+    full = analyze(processor, {"userId": "u1", "transactions": transactions})
+
+    watermark = None
+    for start in range(0, len(transactions), 70):
+        # Jako Node.js: transakce s časem >= vodoznak, hraniční se posílají znovu
+        batch = [t for t in transactions[:start + 70] if watermark is None or t["transactionDate"] >= watermark]
+        result = analyze(processor, {"userId": "u1", "transactions": batch, "watermark": watermark},
+                         {"incremental": True})
+        watermark = result.pop("rollup")["watermark"]
+    assert result == full
+
+def test_incremental_requires_rebuild_for_unknown_watermark(processor):
+    response = processor.process_query({
+        "type": "token_analysis",
+        "data": {"userId": "missing", "transactions": [], "watermark": "2024-05-01T00:00:00"},
+        "options": {"incremental": True}
+    })
+    assert response["success"] is False
+    assert response["rebuildRequired"] is True
+
+def test_bulk_matches_single(processor):
+    users = {f"user-{index}": make_transactions(count, seed=index)
+             for index, count in enumerate([0, 1, 2, 5, 50, 200])}
+    response = processor.process_query({"type": "token_analysis_bulk", "data": {"users": users}})
+    assert response["success"], response.get("error")
+    bulk = response["data"]
+    assert bulk["failed"] == 0
+    assert {item["userId"] for item in bulk["results"]} == set(users)
+    for item in bulk["results"]:
+        single = analyze(processor, {"transactions": users[item["userId"]]})
+        assert normalize(item["data"]) == single, item["userId"]
+
+def test_bulk_stream_sends_each_user_before_the_response(processor):
+    users = {f"user-{index}": make_transactions(20, seed=index) for index in range(3)}
+    partials = []
+    response = processor.process_query({"type": "token_analysis_bulk", "data": {"users": users},
+                                        "options": {"stream": True}}, partials.append)
+    assert response["success"], response.get("error")
+    assert response["data"] == {"count": 3, "failed": 0, "streamed": 3}
+    assert all(message["partial"] is True and message["success"] for message in partials)
+    assert {message["userId"] for message in partials} == set(users)
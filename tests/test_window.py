@@ -0,0 +1,72 @@
+"""
+Testy časového okna analýzy: výsledek v okně proti token_analysis nad předem vybranými transakcemi
+"""
+
+import json
+
+import pytest
+
+from conftest import make_transactions, normalize
+
+pytest.importorskip("pandas")
+
+def analyze(processor, data, options=None):
+    response = processor.process_query({"type": "token_analysis", "data": data, "options": options or {}})
+    assert response["success"], response.get("error")
+    return normalize(response["data"])
+
+def inside(transactions, start, end):
+    return [t for t in transactions if start <= t["transactionDate"] < end]
+
+@pytest.mark.parametrize("ordered", [False, True], ids=["unsorted", "sorted"])
+@pytest.mark.parametrize("options, start, end", [
+    ({"from": "2024-03-10T00:00:00", "to": "2024-08-01T00:00:00"}, "2024-03-10", "2024-08-01"),
+    ({"timeframe": "month", "from": "2024-05-01T00:00:00"}, "2024-05-01", "2024-06-01"),
+    ({"timeframe": "quarter", "to": "2024-10-01T00:00:00"}, "2024-07-01", "2024-10-01"),
+    ({"from": "2024-11-15T00:00:00"}, "2024-11-15", "9999")
+], ids=["from-to", "timeframe-from", "timeframe-to", "from"])
+def test_window_matches_filtered(processor, options, start, end, ordered):
+    transactions = make_transactions(600, seed=51)
+    if ordered:
+        transactions.sort(key=lambda t: t["transactionDate"])
+    result = analyze(processor, {"transactions": transactions}, options)
+    window = result.pop("window")
+    assert window["from"] == (options.get("from") or f"{start}T00:00:00")
+    assert result == analyze(processor, {"transactions": inside(transactions, start, end)})
+
+def test_file_window_matches_filtered(processor, tmp_path):
+    transactions = make_transactions(500, seed=52, floaty=True)
+    path = tmp_path / "export.jsonl"
+    path.write_text("".join(json.dumps(t) + "\n" for t in transactions), encoding="utf-8")
+    options = {"from": "2024-02-01T12:00:00", "to": "2024-06-20T00:00:00"}
+    result = analyze(processor, {"file": {"path": str(path), "chunkRows": 70}}, options)
+    result.pop("window")
+    assert result == analyze(processor, {"transactions": inside(transactions, "2024-02-01T12", "2024-06-20")})
+
+def test_cube_window_uses_whole_months(processor, tmp_path):
+    transactions = [{**t, "userId": "u1"} for t in make_transactions(500, seed=53)]
+    cube = str(tmp_path / "cube")
+    refresh = processor.process_query({"type": "token_cube_refresh",
+                                       "data": {"path": cube, "transactions": transactions}})
+    assert refresh["success"], refresh.get("error")
+
+    result = analyze(processor, {"cube": {"path": cube, "userId": "u1"}},
+                     {"from": "2024-04-15T00:00:00", "to": "2024-06-10T00:00:00"})
+    assert result.pop("window") == {"timeframe": "all", "from": "2024-04-01T00:00:00",
+                                    "to": "2024-07-01T00:00:00", "granularity": "month"}
+    assert result == analyze(processor, {"transactions": inside(transactions, "2024-04", "2024-07")})
+
+def test_prediction_window_scales_estimates(processor):
+    transactions = make_transactions(300, seed=54)
+    month = analyze(processor, {"transactions": transactions})["predictions"]
+    quarter = analyze(processor, {"transactions": transactions}, {"predictionWindow": "quarter"})["predictions"]
+    assert quarter["predictionWindow"] == "quarter"
+    assert quarter["estimatedNextMonthEarnings"] == month["estimatedNextMonthEarnings"]
+    assert quarter["estimatedWindowEarnings"] == pytest.approx(3 * month["estimatedNextMonthEarnings"])
+
+def test_invalid_window(processor):
+    for options in ({"timeframe": "decade"}, {"from": "včera"},
+                    {"from": "2024-05-01T00:00:00", "to": "2024-04-01T00:00:00"}):
+        response = processor.process_query({"type": "token_analysis",
+                                            "data": {"transactions": make_transactions(5)}, "options": options})
+        assert response["success"] is False and response["error"], options